@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+from array import array
+from collections import deque
+
+
+def _option_targets(action: dict):
+    """Yields the next_action (or None) of every player option in an action, in display order."""
+    for dialog in action.get("dialogs", []):
+        if dialog.get("type") == "option" and isinstance(dialog.get("content"), list):
+            for option in dialog["content"]:
+                yield option.get("next_action")
+
+
+class DialogueGraph:
+    """
+    Branch graph of every flow in a dialogs_{lang}.jsonl file, stored in CSR form.
+
+    Nodes are the actions of a flow in file order; flow f owns nodes
+    flow_start[f] .. flow_start[f + 1] - 1 and its entry point is flow_start[f].
+    The successors of node n are targets[offsets[n]:offsets[n + 1]], and labels holds the
+    option index that leads along each edge (-1 for plain sequential flow).
+
+    Edge rules:
+      - an action without options continues with the next action of the flow
+      - each option jumps to its next_action when that action belongs to the flow,
+        otherwise (option sub-actions that are not top-level actions) it falls through
+        to the next action
+    """
+
+    def __init__(self):
+        self.titles = []
+        self.title_index = {}
+        self.flow_start = array("I", [0])
+        self.action_ids = array("q")
+        self.offsets = array("I", [0])
+        self.targets = array("I")
+        self.labels = array("i")
+        self.flows = None  # original flow dicts, only kept when built from a dialogs file
+
+    # ---------- build ----------
+
+    @classmethod
+    def from_flows(cls, flows, keep_flows: bool = True) -> "DialogueGraph":
+        graph = cls()
+        for flow in flows:
+            graph._add_flow(flow)
+        if keep_flows:
+            graph.flows = flows
+        return graph
+
+    @classmethod
+    def from_jsonl(cls, dialogs_file: str, keep_flows: bool = True) -> "DialogueGraph":
+        with open(dialogs_file, "r", encoding="utf-8") as f:
+            flows = [json.loads(line) for line in f if line.strip()]
+        return cls.from_flows(flows, keep_flows)
+
+    def _add_flow(self, flow: dict):
+        actions = flow.get("actions", [])
+        base = len(self.action_ids)
+        local_index = {}
+        for i, action in enumerate(actions):
+            local_index.setdefault(action.get("id"), i)
+            self.action_ids.append(action.get("id") or 0)
+
+        for i, action in enumerate(actions):
+            fallthrough = i + 1 if i + 1 < len(actions) else None
+            edges = {}
+            options = list(_option_targets(action))
+            if options:
+                for option_idx, next_action in enumerate(options):
+                    target = local_index.get(next_action, fallthrough) if next_action is not None else fallthrough
+                    if target is not None and target not in edges:
+                        edges[target] = option_idx
+            elif fallthrough is not None:
+                edges[fallthrough] = -1
+
+            for target, label in edges.items():
+                self.targets.append(base + target)
+                self.labels.append(label)
+            self.offsets.append(len(self.targets))
+
+        self.title_index[flow.get("title", "")] = len(self.titles)
+        self.titles.append(flow.get("title", ""))
+        self.flow_start.append(len(self.action_ids))
+
+    # ---------- persistence ----------
+
+    def save(self, graph_dir: str):
+        os.makedirs(graph_dir, exist_ok=True)
+        with open(os.path.join(graph_dir, "flows.json"), "w", encoding="utf-8") as f:
+            json.dump({"titles": self.titles}, f, ensure_ascii=False)
+        for name in ("flow_start", "action_ids", "offsets", "targets", "labels"):
+            with open(os.path.join(graph_dir, f"{name}.bin"), "wb") as f:
+                getattr(self, name).tofile(f)
+
+    @classmethod
+    def load(cls, graph_dir: str) -> "DialogueGraph":
+        graph = cls()
+        with open(os.path.join(graph_dir, "flows.json"), "r", encoding="utf-8") as f:
+            graph.titles = json.load(f)["titles"]
+        graph.title_index = {title: i for i, title in enumerate(graph.titles)}
+        for name in ("flow_start", "action_ids", "offsets", "targets", "labels"):
+            arr = array(getattr(graph, name).typecode)
+            path = os.path.join(graph_dir, f"{name}.bin")
+            with open(path, "rb") as f:
+                arr.fromfile(f, os.path.getsize(path) // arr.itemsize)
+            setattr(graph, name, arr)
+        return graph
+
+    # ---------- traversal ----------
+
+    def flow_range(self, title: str) -> range:
+        f = self.title_index[title]
+        return range(self.flow_start[f], self.flow_start[f + 1])
+
+    def successors(self, node: int):
+        """[(target node, option index)] of a node"""
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return list(zip(self.targets[start:end], self.labels[start:end]))
+
+    def all_paths(self, title: str, max_paths: int = 1000):
+        """
+        Every route from the entry action to an end action, as lists of (action_id, option index).
+        The option index is the option chosen to leave that action (-1 when there was no choice).
+        Loops back to an action already on the route end the route.
+        """
+        nodes = self.flow_range(title)
+        if not nodes:
+            return []
+        paths = []
+        stack = [(nodes.start, [])]
+        while stack and len(paths) < max_paths:
+            node, prefix = stack.pop()
+            on_path = {step[0] for step in prefix}
+            on_path.add(node)
+            edges = [(t, l) for t, l in self.successors(node) if t not in on_path]
+            if not edges:
+                paths.append([(self.action_ids[n], l) for n, l in prefix] + [(self.action_ids[node], -1)])
+                continue
+            for target, label in reversed(edges):
+                stack.append((target, prefix + [(node, label)]))
+        return paths
+
+    def unreachable(self, title: str):
+        """Action ids that cannot be reached from the entry action of the flow."""
+        nodes = self.flow_range(title)
+        if not nodes:
+            return []
+        seen = {nodes.start}
+        queue = deque([nodes.start])
+        while queue:
+            node = queue.popleft()
+            for target, _ in self.successors(node):
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return [self.action_ids[n] for n in nodes if n not in seen]
+
+    def canonical_route(self, title: str):
+        """The linear route taken when the first option is always chosen."""
+        nodes = self.flow_range(title)
+        route = []
+        seen = set()
+        node = nodes.start if nodes else None
+        while node is not None and node not in seen:
+            seen.add(node)
+            route.append(self.action_ids[node])
+            edges = self.successors(node)
+            node = min(edges, key=lambda e: e[1])[0] if edges else None
+        return route
+
+    # ---------- rendering ----------
+
+    def render_path(self, title: str, path) -> str:
+        """Renders one route from all_paths as dialogue text, keeping only the chosen option."""
+        if self.flows is None:
+            raise ValueError("render_path needs a graph built from a dialogs file")
+        f = self.title_index[title]
+        actions = {a.get("id"): a for a in self.flows[f].get("actions", [])}
+        lines = []
+        for action_id, option_idx in path:
+            offset = 0
+            for dialog in actions.get(action_id, {}).get("dialogs", []):
+                content = dialog.get("content")
+                if dialog.get("type") == "option" and isinstance(content, list):
+                    if 0 <= option_idx - offset < len(content):
+                        lines.append(f"[玩家选项: {content[option_idx - offset].get('content') or ''}]")
+                    offset += len(content)
+                elif content:
+                    role = (dialog.get("role") or "").strip()
+                    lines.append(f"{role}: {content}" if role else content)
+        return "\n".join(lines)
+
+    def stats(self):
+        branching = sum(1 for n in range(len(self.action_ids)) if self.offsets[n + 1] - self.offsets[n] > 1)
+        return {"flows": len(self.titles), "actions": len(self.action_ids),
+                "edges": len(self.targets), "branching_actions": branching}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build and query the branch graph of extracted dialogs")
+    parser.add_argument('command', choices=['build', 'paths', 'unreachable', 'route'])
+    parser.add_argument('title', nargs='?', help="flow title (StateKey) for paths/unreachable/route")
+    parser.add_argument('--lang', default='zh-Hans')
+    parser.add_argument('--max-paths', type=int, default=20)
+    args = parser.parse_args()
+
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    dialogs_file = os.path.join(data_dir, f"dialogs_{args.lang}.jsonl")
+    graph_dir = os.path.join(data_dir, f"dialogs_{args.lang}.graph")
+
+    if args.command == 'build':
+        graph = DialogueGraph.from_jsonl(dialogs_file, keep_flows=False)
+        graph.save(graph_dir)
+        print(f"graph saved to {graph_dir}: {graph.stats()}")
+    elif not args.title:
+        parser.error(f"{args.command} needs a flow title")
+    elif args.command == 'paths':
+        graph = DialogueGraph.from_jsonl(dialogs_file)
+        for i, path in enumerate(graph.all_paths(args.title, args.max_paths), 1):
+            print(f"--- path {i} ---")
+            print(graph.render_path(args.title, path))
+    else:
+        graph = DialogueGraph.load(graph_dir) if os.path.exists(graph_dir) else DialogueGraph.from_jsonl(dialogs_file)
+        if args.command == 'unreachable':
+            print(graph.unreachable(args.title))
+        else:
+            print(graph.canonical_route(args.title))
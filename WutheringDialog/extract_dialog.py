@@ -1,7 +1,9 @@
 import argparse
 import json
 import os.path
+import sys
 
+from dialogue_graph import DialogueGraph
 from util import load_json
 
 
@@ -12,14 +14,33 @@ def get_speaker_text(speaker_id, text_map: dict):
     return speaker
 
 
+def load_flow_registry(repo):
+    # flow_registry.py lives in the repo root, next to ConfigDB
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from flow_registry import FlowRegistry
+    return FlowRegistry.load_or_build(os.path.join(repo, "ConfigDB"),
+                                      os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "flow_registry.bin"))
+
+
+def load_gender_expander(repo):
+    # gender_text.py lives in the repo root, next to ConfigDB
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from gender_text import GenderTextExpander
+    return GenderTextExpander.from_config(os.path.join(repo, "ConfigDB"))
+
+
 def load_data(args):
     # text map
     text_map = load_json(os.path.join(args.repo, f"TextMap/{args.lang}/MultiText.json"))
+    expander = load_gender_expander(args.repo) if args.gender else None
 
     flow_states = load_json(os.path.join(args.repo, "ConfigDB/FlowState.json"))
+    flow_registry = load_flow_registry(args.repo) if args.flow else None
     dialogs = []
     for flow in flow_states:
         flow_dict = {"title": flow["StateKey"], "actions": []}
+        if flow_registry is not None:
+            flow_dict["flow"] = flow_registry.flow_of(flow["StateKey"])
         actions = json.loads(flow["Actions"])
         for action in actions:
             if "Params" not in action or "TalkItems" not in action["Params"]:
@@ -36,7 +57,12 @@ def load_data(args):
                     else:
                         speaker = ""
                         type_ = "plot"
-                    action_dialog["dialogs"].append({"role": speaker, "content": text_map.get(talk["TidTalk"]), "type": type_})
+                    content = text_map.get(talk["TidTalk"])
+                    if expander is not None:
+                        content = expander.render(content, args.gender)
+                    # "tid" keeps the TextMap key so later stages can record what each line depends on
+                    action_dialog["dialogs"].append({"role": speaker, "content": content, "type": type_,
+                                                     "tid": talk["TidTalk"]})
                 elif "Options" in talk:
                     options = []
                     for option in talk["Options"]:
@@ -44,7 +70,8 @@ def load_data(args):
                         if option_actions := option.get("Actions"):
                             option_dict["next_action"] = option_actions[0].get("ActionId")
                         options.append(option_dict)
-                    action_dialog["dialogs"].append({"role": "player", "content": options, "type": "option"})
+                    action_dialog["dialogs"].append({"role": "player", "content": options, "type": "option",
+                                                     "tid": [option["TidTalkOption"] for option in talk["Options"]]})
                 else:
                     print(f"warning: Unknown talk type: {talk}")
             if action_dialog["dialogs"]:
@@ -59,11 +86,20 @@ def load_data(args):
         for d in dialogs:
             print(json.dumps(d, ensure_ascii=False), file=f)
 
+    if args.graph:
+        graph = DialogueGraph.from_flows(dialogs, keep_flows=False)
+        graph.save(os.path.join(output_dir, f"dialogs_{args.lang}.graph"))
+        print(f"dialogue graph: {graph.stats()}")
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--repo', default='D:\code\github\WutheringData')
     parser.add_argument('--lang', default='zh-Hans')
+    parser.add_argument('--graph', action='store_true', help='also build the branch graph (dialogue_graph.py)')
+    parser.add_argument('--flow', action='store_true', help='add the parent flow Id of each StateKey (flow_registry.py)')
+    parser.add_argument('--gender', choices=['male', 'female', 'both'],
+                        help='expand Rover gender placeholders such as {TA} (gender_text.py)')
     args = parser.parse_args()
 
     load_data(args)
\ No newline at end of file
@@ -4,6 +4,8 @@
 import json
 from collections import defaultdict
 
+from jsonl_blocks import open_jsonl
+
 def check_comprehensive_quality():
     print("Checking COMPREHENSIVE data quality...")
     
@@ -13,7 +15,7 @@ def check_comprehensive_quality():
     mapped_count = 0
     ecological_count = 0
     
-    with open('WutheringDialog/data/dialogs_zh-Hans.comprehensive_final.jsonl', 'r', encoding='utf-8') as f:
+    with open_jsonl('WutheringDialog/data/dialogs_zh-Hans.comprehensive_final.jsonl') as f:
         for line in f:
             try:
                 data = json.loads(line.strip())
@@ -48,7 +50,7 @@ def check_comprehensive_quality():
     
     # 检查一些样本
     print("\nSample records:")
-    with open('WutheringDialog/data/dialogs_zh-Hans.comprehensive_final.jsonl', 'r', encoding='utf-8') as f:
+    with open_jsonl('WutheringDialog/data/dialogs_zh-Hans.comprehensive_final.jsonl') as f:
         for i, line in enumerate(f):
             if i >= 5:
                 break
@@ -3,10 +3,12 @@
 
 import json
 
+from jsonl_blocks import open_jsonl
+
 def check_sample_data():
     print("Checking sample data...")
     
-    with open('WutheringDialog/data/dialogs_zh-Hans.fixed_final.jsonl', 'r', encoding='utf-8') as f:
+    with open_jsonl('WutheringDialog/data/dialogs_zh-Hans.fixed_final.jsonl') as f:
         for i, line in enumerate(f):
             if i >= 20:
                 break
@@ -4,11 +4,13 @@
 import json
 import os
 
+from jsonl_blocks import open_jsonl, resolve_path
+
 def check_split_file():
     """检查拆分后的文件格式和内容"""
     
     # 检查文件是否存在
-    split_file = "WutheringDialog/data/rag_input_split.jsonl"
+    split_file = resolve_path("WutheringDialog/data/rag_input_split.jsonl")
     if not os.path.exists(split_file):
         print(f"文件不存在: {split_file}")
         return
@@ -16,7 +18,7 @@ def check_split_file():
     print("=== 检查拆分后的文件 ===")
     
     # 读取并分析文件
-    with open(split_file, 'r', encoding='utf-8') as f:
+    with open_jsonl(split_file) as f:
         lines = f.readlines()
     
     print(f"总行数: {len(lines)}")
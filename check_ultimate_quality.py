@@ -3,6 +3,8 @@
 
 import json
 
+from jsonl_blocks import open_jsonl
+
 def check_ultimate_quality():
     print("Checking ULTIMATE data quality...")
     
@@ -11,7 +13,7 @@ def check_ultimate_quality():
     chapter_count = 0
     mapped_count = 0
     
-    with open('WutheringDialog/data/dialogs_zh-Hans.ultimate_final.jsonl', 'r', encoding='utf-8') as f:
+    with open_jsonl('WutheringDialog/data/dialogs_zh-Hans.ultimate_final.jsonl') as f:
         for line in f:
             try:
                 data = json.loads(line.strip())
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from typing import List
+
+# 连续的中日韩字符 或 连续的字母数字
+TOKEN_REGEX = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+"
+    r"|[0-9A-Za-z\u00c0-\u024f\u0400-\u04ff]+"
+)
+CJK_REGEX = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    CJK感知分词：中日韩文字按二元组(bigram)切分，单字片段保留为单字；
+    拉丁字母/数字按词切分并转为小写。
+    例: "今州令尹Jinhsi" -> ["今州", "州令", "令尹", "jinhsi"]
+    """
+    if not isinstance(text, str):
+        return []
+
+    tokens = []
+    for match in TOKEN_REGEX.finditer(text):
+        run = match.group(0)
+        if CJK_REGEX.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+if __name__ == "__main__":
+    import sys
+
+    sample = " ".join(sys.argv[1:]) or "今州令尹今汐与Jinhsi的对话"
+    print(tokenize(sample))
@@ -1,176 +1,193 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+_IMPORT_START = time.perf_counter()
+
 import json
 import re
+import sys
+from functools import cached_property
 from typing import Dict, List, Tuple, Optional, Set
 from collections import defaultdict
 
+from dependency_index import TrackingTextMap, config_key, record_stage
+from game_data import load_config, load_text_map
+from jsonl_blocks import open_jsonl
+
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
 class CompleteDialogueProcessor:
     """
     完整版对话处理器 - 修复所有映射问题包括所有生态区域
     """
     
+    # 下面的分类表都是常量，定义在类上由所有实例共用，创建处理器时不再逐个构建
+    
+    # 对话内容到正确描述的映射（使用部分匹配）
+    dialogue_content_patterns = [
+        {
+            'pattern': r'.*何昌他也是夜归的士兵.*没能救回来.*',
+            'description': '你了解到晋陆在归魂互助会再次见到了自己去世的战友何昌，所以选择留在了这里。'
+        }
+    ]
+    
+    # 全面的生态NPC对话分类（基于自动扫描结果）
+    # ⚠️ 为什么需要这么多手动分类？
+    # 因为游戏公司的flow_name设计极其混乱，没有任何统一规则
+    # 比如："剧情_七丘生态_NPC"、"中曲生态"、"NPC对话" 等等都是不同的命名风格
+    # 无法通过任何算法自动匹配，只能手动枚举
+    # 未来如有新的flow_name，运行 auto_scan_categories.py 扫描后手动添加
+    ecological_categories = {
+        # 瑝珑第二章生态对话
+        '剧情_七丘生态_NPC': {'chapter': '瑝珑 第二章', 'section': '七丘生态对话'},
+        '剧情_1_1_乘宵山生态_NPC_配音': {'chapter': '瑝珑 第二章', 'section': '乘宵山生态对话'},
+        '剧情_2_4_巴别塔演出_上1': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
+        '剧情_中曲台_NPC对话和冒泡': {'chapter': '瑝珑 第二章', 'section': '中曲台生态对话'},
+        '剧情_2_4_巴别塔演出_上2': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
+        '剧情_2_4_巴别塔演出_下': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
+        '剧情_2_4_活动_要塞生态': {'chapter': '瑝珑 第二章', 'section': '要塞生态对话'},
+        '剧情_2_5_巴别塔演出_下篇': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
+        '剧情_2_7支线_重建桑古伊斯水城': {'chapter': '瑝珑 第二章', 'section': '重建水城生态'},
+        '剧情_七丘_浴场生态': {'chapter': '瑝珑 第二章', 'section': '浴场生态对话'},
+        '剧情_七丘_要塞生态': {'chapter': '瑝珑 第二章', 'section': '要塞生态对话'},
+        '剧情_2_7生态替换JXY': {'chapter': '瑝珑 第二章', 'section': '生态替换对话'},
+        '剧情_七丘生态_NPC_研究院': {'chapter': '瑝珑 第二章', 'section': '研究院生态对话'},
+        '剧情_V1.2版本更新生态对话': {'chapter': '瑝珑 第二章', 'section': '版本更新生态'},
+        '剧情_七丘要塞生态2_0': {'chapter': '瑝珑 第二章', 'section': '七丘要塞生态'},
+        '剧情_七丘_列奥尼达广场生态': {'chapter': '瑝珑 第二章', 'section': '列奥尼达广场生态'},
+        '剧情_七丘_列奥尼达广场生态': {'chapter': '瑝珑 第二章', 'section': '列奥尼达广场生态'},
+        '剧情_桑原_建设狮鹫营地': {'chapter': '瑝珑 第二章', 'section': '狮鹫营地生态'},
+        '剧情_旧贵族宅邸_人文生态对话和冒泡': {'chapter': '瑝珑 第二章', 'section': '旧贵族宅邸生态'},
+        '剧情_中曲台地建设狮鹫营地POI': {'chapter': '瑝珑 第二章', 'section': '中曲台地生态'},
+        
+        # 瑝珑第一章生态对话
+        '中曲生态': {'chapter': '瑝珑 第一章', 'section': '中曲台地生态'},
+        '虎口生态': {'chapter': '瑝珑 第一章', 'section': '虎口矿场生态'},
+        '荒石生态': {'chapter': '瑝珑 第一章', 'section': '荒石高地生态'},
+        '天城生态': {'chapter': '瑝珑 第一章', 'section': '今州城生态'},
+        '北落野生态': {'chapter': '瑝珑 第一章', 'section': '北落野生态'},
+        '乘宵山': {'chapter': '瑝珑 第一章', 'section': '乘宵山虹镇生态'},
+        '金库下层': {'chapter': '瑝珑 第一章', 'section': '金库下层生态'},
+        '旧贵族宅邸': {'chapter': '瑝珑 第一章', 'section': '旧贵族宅邸生态'},
+        '人文生态': {'chapter': '瑝珑 第一章', 'section': '人文生态对话'},
+        'NPC对话': {'chapter': '瑝珑 第一章', 'section': 'NPC生态对话'},
+        '生态对话': {'chapter': '瑝珑 第一章', 'section': '生态对话'},
+        '生态冒泡': {'chapter': '瑝珑 第一章', 'section': '生态冒泡对话'},
+        '回魂夜氛围': {'chapter': '瑝珑 第一章', 'section': '回魂夜氛围对话'},
+        '氛围NPC': {'chapter': '瑝珑 第一章', 'section': '氛围NPC对话'},
+        'NPC冒泡': {'chapter': '瑝珑 第一章', 'section': 'NPC冒泡对话'},
+        '配音生态': {'chapter': '瑝珑 第一章', 'section': '配音生态对话'},
+        '配音生态冒泡': {'chapter': '瑝珑 第一章', 'section': '配音生态冒泡'},
+    }
+    
+    # 角色任务对话的分类（基于自动扫描结果）
+    # 同上，也是手动枚举的无奈之举
+    # 现在优先使用 role_quest_index，这张表只用于索引里没有任务关联的Flow
+    character_categories = {
+        # 瑝珑第二章角色线
+        '剧情_2_2_维奥拉角色线': {'chapter': '瑝珑 第二章', 'section': '维奥拉角色线'},
+        '剧情_1_3_吟霖角色线': {'chapter': '瑝珑 第二章', 'section': '吟霖角色线'},
+        '剧情_2_7_狄斯台地主线_上半_巡游者': {'chapter': '瑝珑 第二章', 'section': '巡游者角色线'},
+        '剧情_1_2_角色_寸草心': {'chapter': '瑝珑 第二章', 'section': '寸草心角色线'},
+        '剧情_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
+        '剧情_1_1_乘宵山角色线': {'chapter': '瑝珑 第二章', 'section': '乘宵山角色线'},
+        '剧情_2_0_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
+        '剧情_2_7_桑古伊斯水城_上半_1': {'chapter': '瑝珑 第二章', 'section': '桑古伊斯水城角色线'},
+        '剧情_吟霖_吟霖线1': {'chapter': '瑝珑 第二章', 'section': '吟霖线角色线'},
+        '剧情_1_3_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
+        '剧情_V1.2版本更新角色线': {'chapter': '瑝珑 第二章', 'section': '版本更新角色线'},
+        '剧情_七丘_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
+        '剧情_吟霖_吟霖线': {'chapter': '瑝珑 第二章', 'section': '吟霖线角色线'},
+        '剧情_2_0_桑古伊斯水城_第一幕': {'chapter': '瑝珑 第二章', 'section': '桑古伊斯水城角色线'},
+        '剧情_1.2同版本更新支线': {'chapter': '瑝珑 第二章', 'section': '版本更新支线'},
+        
+        # 瑝珑第一章角色线
+        '余果': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
+        '刘梦蝶': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
+        '寸草心': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
+        '忌炎线': {'chapter': '瑝珑 第一章', 'section': '忌炎角色线'},
+        '吟霖线': {'chapter': '瑝珑 第一章', 'section': '吟霖角色线'},
+        '散华线': {'chapter': '瑝珑 第一章', 'section': '散华角色线'},
+        '白芷线': {'chapter': '瑝珑 第一章', 'section': '白芷角色线'},
+        '赞妮副本': {'chapter': '瑝珑 第一章', 'section': '赞妮角色副本'},
+        '夏空线': {'chapter': '瑝珑 第一章', 'section': '夏空角色线'},
+        'V2.3': {'chapter': '瑝珑 第一章', 'section': '版本更新角色线'},
+    }
+    
+    # 支线任务的分类
+    side_quest_categories = {
+        '支线': {'chapter': '瑝珑 第一章', 'section': '支线任务'},
+        '布偶小队历险记': {'chapter': '瑝珑 第一章', 'section': '布偶小队历险记'},
+        '猫猫咖啡厅': {'chapter': '瑝珑 第一章', 'section': '猫猫咖啡厅'},
+        '灯塔迷航': {'chapter': '瑝珑 第一章', 'section': '灯塔迷航'},
+        '沉没的历史': {'chapter': '瑝珑 第一章', 'section': '沉没的历史'},
+        
+        # 团团转系列
+        '团团团团转': {'chapter': '瑝珑 第一章', 'section': '团团团团转支线'},
+        '团团转': {'chapter': '瑝珑 第一章', 'section': '团团转支线'},
+        
+        # 记忆手册系列
+        '团子记忆手册': {'chapter': '瑝珑 第一章', 'section': '团子记忆手册'},
+        '记忆手册': {'chapter': '瑝珑 第一章', 'section': '记忆手册任务'},
+    }
+    
+    # 主线剧情分类（基于自动扫描结果）
+    main_story_categories = {
+        # 瑝珑第二章主线剧情
+        '剧情_POI_瑝珑台': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
+        '剧情_桑原_一阶POI剧情对话': {'chapter': '瑝珑 第二章', 'section': '桑原主线'},
+        '剧情_七丘_乘宵山_剧情对话': {'chapter': '瑝珑 第二章', 'section': '乘宵山主线'},
+        '剧情_2_4_活动_瑝珑之战': {'chapter': '瑝珑 第二章', 'section': '瑝珑之战主线'},
+        '剧情_2_1_七丘_瑝珑要塞_下篇_POI对话': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
+        '剧情_桑原_剧场_瑝珑POI对话': {'chapter': '瑝珑 第二章', 'section': '剧场主线'},
+        '剧情_2.4_瑝珑渊碎片': {'chapter': '瑝珑 第二章', 'section': '瑝珑渊主线'},
+        '剧情_七丘_瑝珑要塞_无光之森林危机': {'chapter': '瑝珑 第二章', 'section': '无光森林主线'},
+        '剧情_七丘_瑝珑台': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
+        '剧情_荒石高地_瑝珑要塞': {'chapter': '瑝珑 第二章', 'section': '荒石高地主线'},
+        '剧情_2_0_七丘_瑝珑要塞_POI对话': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
+        '剧情_瑝珑要塞旋转': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
+        '剧情_2_0_瑝珑台_瑝珑要塞': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
+        '剧情_乘宵山_瑝珑要塞_瑝珑式': {'chapter': '瑝珑 第二章', 'section': '瑝珑式主线'},
+        '剧情_活动_V1.0瑝珑活动': {'chapter': '瑝珑 第二章', 'section': '瑝珑活动主线'},
+        
+        # 巴别塔相关
+        '2_6_狄斯台地主线': {'chapter': '瑝珑 第二章', 'section': '狄斯台地主线'},
+        '2_4_巴别塔': {'chapter': '瑝珑 第二章', 'section': '巴别塔剧情'},
+        '巴别塔演出': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出'},
+        '巴别塔领主': {'chapter': '瑝珑 第二章', 'section': '巴别塔领主'},
+        '狄斯台地': {'chapter': '瑝珑 第二章', 'section': '狄斯台地剧情'},
+        '赤林台地': {'chapter': '瑝珑 第二章', 'section': '赤林台地剧情'},
+        '主线': {'chapter': '瑝珑 第二章', 'section': '主线剧情'},
+        '剧情': {'chapter': '瑝珑 第二章', 'section': '剧情对话'},
+    }
+    
+    # 其他特殊分类
+    special_categories = {
+        '测试': {'chapter': '测试内容', 'section': '测试对话'},
+        '玩法': {'chapter': '游戏玩法', 'section': '玩法对话'},
+        '活动': {'chapter': '限时活动', 'section': '活动对话'},
+        '副本': {'chapter': '副本内容', 'section': '副本对话'},
+        '任务专用冒泡': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
+    }
+    
     def __init__(self):
-        # 配置文件数据
-        self.plot_handbook_config = []
-        self.quest_node_data = []
-        self.textmap_data = {}
+        # 配置文件数据在第一次访问时才加载（见下面的 cached_property），各数据源的加载耗时记在这里
+        self.load_timings = {}
         
         # 映射缓存
         self.flow_to_quest_mapping = {}
         self.quest_info_cache = {}
         self.chapter_info_cache = {}
+        self.quest_info_keys = {}
+        self.chapter_info_keys = {}
+        
+        # doc_id -> 依赖的TextMap/ConfigDB key（dependency_index.py）
+        self.dependencies = {}
         
         # 精确的FlowId+StateId到ChildQuestTip的映射
         self.flow_state_to_tip_mapping = {}
         
-        # 对话内容到正确描述的映射（使用部分匹配）
-        self.dialogue_content_patterns = [
-            {
-                'pattern': r'.*何昌他也是夜归的士兵.*没能救回来.*',
-                'description': '你了解到晋陆在归魂互助会再次见到了自己去世的战友何昌，所以选择留在了这里。'
-            }
-        ]
-        
-        # 全面的生态NPC对话分类（基于自动扫描结果）
-        # ⚠️ 为什么需要这么多手动分类？
-        # 因为游戏公司的flow_name设计极其混乱，没有任何统一规则
-        # 比如："剧情_七丘生态_NPC"、"中曲生态"、"NPC对话" 等等都是不同的命名风格
-        # 无法通过任何算法自动匹配，只能手动枚举
-        # 未来如有新的flow_name，运行 auto_scan_categories.py 扫描后手动添加
-        self.ecological_categories = {
-            # 瑝珑第二章生态对话
-            '剧情_七丘生态_NPC': {'chapter': '瑝珑 第二章', 'section': '七丘生态对话'},
-            '剧情_1_1_乘宵山生态_NPC_配音': {'chapter': '瑝珑 第二章', 'section': '乘宵山生态对话'},
-            '剧情_2_4_巴别塔演出_上1': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
-            '剧情_中曲台_NPC对话和冒泡': {'chapter': '瑝珑 第二章', 'section': '中曲台生态对话'},
-            '剧情_2_4_巴别塔演出_上2': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
-            '剧情_2_4_巴别塔演出_下': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
-            '剧情_2_4_活动_要塞生态': {'chapter': '瑝珑 第二章', 'section': '要塞生态对话'},
-            '剧情_2_5_巴别塔演出_下篇': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出对话'},
-            '剧情_2_7支线_重建桑古伊斯水城': {'chapter': '瑝珑 第二章', 'section': '重建水城生态'},
-            '剧情_七丘_浴场生态': {'chapter': '瑝珑 第二章', 'section': '浴场生态对话'},
-            '剧情_七丘_要塞生态': {'chapter': '瑝珑 第二章', 'section': '要塞生态对话'},
-            '剧情_2_7生态替换JXY': {'chapter': '瑝珑 第二章', 'section': '生态替换对话'},
-            '剧情_七丘生态_NPC_研究院': {'chapter': '瑝珑 第二章', 'section': '研究院生态对话'},
-            '剧情_V1.2版本更新生态对话': {'chapter': '瑝珑 第二章', 'section': '版本更新生态'},
-            '剧情_七丘要塞生态2_0': {'chapter': '瑝珑 第二章', 'section': '七丘要塞生态'},
-            '剧情_七丘_列奥尼达广场生态': {'chapter': '瑝珑 第二章', 'section': '列奥尼达广场生态'},
-            '剧情_七丘_列奥尼达广场生态': {'chapter': '瑝珑 第二章', 'section': '列奥尼达广场生态'},
-            '剧情_桑原_建设狮鹫营地': {'chapter': '瑝珑 第二章', 'section': '狮鹫营地生态'},
-            '剧情_旧贵族宅邸_人文生态对话和冒泡': {'chapter': '瑝珑 第二章', 'section': '旧贵族宅邸生态'},
-            '剧情_中曲台地建设狮鹫营地POI': {'chapter': '瑝珑 第二章', 'section': '中曲台地生态'},
-            
-            # 瑝珑第一章生态对话
-            '中曲生态': {'chapter': '瑝珑 第一章', 'section': '中曲台地生态'},
-            '虎口生态': {'chapter': '瑝珑 第一章', 'section': '虎口矿场生态'},
-            '荒石生态': {'chapter': '瑝珑 第一章', 'section': '荒石高地生态'},
-            '天城生态': {'chapter': '瑝珑 第一章', 'section': '今州城生态'},
-            '北落野生态': {'chapter': '瑝珑 第一章', 'section': '北落野生态'},
-            '乘宵山': {'chapter': '瑝珑 第一章', 'section': '乘宵山虹镇生态'},
-            '金库下层': {'chapter': '瑝珑 第一章', 'section': '金库下层生态'},
-            '旧贵族宅邸': {'chapter': '瑝珑 第一章', 'section': '旧贵族宅邸生态'},
-            '人文生态': {'chapter': '瑝珑 第一章', 'section': '人文生态对话'},
-            'NPC对话': {'chapter': '瑝珑 第一章', 'section': 'NPC生态对话'},
-            '生态对话': {'chapter': '瑝珑 第一章', 'section': '生态对话'},
-            '生态冒泡': {'chapter': '瑝珑 第一章', 'section': '生态冒泡对话'},
-            '回魂夜氛围': {'chapter': '瑝珑 第一章', 'section': '回魂夜氛围对话'},
-            '氛围NPC': {'chapter': '瑝珑 第一章', 'section': '氛围NPC对话'},
-            'NPC冒泡': {'chapter': '瑝珑 第一章', 'section': 'NPC冒泡对话'},
-            '配音生态': {'chapter': '瑝珑 第一章', 'section': '配音生态对话'},
-            '配音生态冒泡': {'chapter': '瑝珑 第一章', 'section': '配音生态冒泡'},
-        }
-        
-        # 角色任务对话的分类（基于自动扫描结果）
-        # 同上，也是手动枚举的无奈之举
-        self.character_categories = {
-            # 瑝珑第二章角色线
-            '剧情_2_2_维奥拉角色线': {'chapter': '瑝珑 第二章', 'section': '维奥拉角色线'},
-            '剧情_1_3_吟霖角色线': {'chapter': '瑝珑 第二章', 'section': '吟霖角色线'},
-            '剧情_2_7_狄斯台地主线_上半_巡游者': {'chapter': '瑝珑 第二章', 'section': '巡游者角色线'},
-            '剧情_1_2_角色_寸草心': {'chapter': '瑝珑 第二章', 'section': '寸草心角色线'},
-            '剧情_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
-            '剧情_1_1_乘宵山角色线': {'chapter': '瑝珑 第二章', 'section': '乘宵山角色线'},
-            '剧情_2_0_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
-            '剧情_2_7_桑古伊斯水城_上半_1': {'chapter': '瑝珑 第二章', 'section': '桑古伊斯水城角色线'},
-            '剧情_吟霖_吟霖线1': {'chapter': '瑝珑 第二章', 'section': '吟霖线角色线'},
-            '剧情_1_3_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
-            '剧情_V1.2版本更新角色线': {'chapter': '瑝珑 第二章', 'section': '版本更新角色线'},
-            '剧情_七丘_角色_吟霖线新': {'chapter': '瑝珑 第二章', 'section': '吟霖线新角色线'},
-            '剧情_吟霖_吟霖线': {'chapter': '瑝珑 第二章', 'section': '吟霖线角色线'},
-            '剧情_2_0_桑古伊斯水城_第一幕': {'chapter': '瑝珑 第二章', 'section': '桑古伊斯水城角色线'},
-            '剧情_1.2同版本更新支线': {'chapter': '瑝珑 第二章', 'section': '版本更新支线'},
-            
-            # 瑝珑第一章角色线
-            '余果': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
-            '刘梦蝶': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
-            '寸草心': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
-            '忌炎线': {'chapter': '瑝珑 第一章', 'section': '忌炎角色线'},
-            '吟霖线': {'chapter': '瑝珑 第一章', 'section': '吟霖角色线'},
-            '散华线': {'chapter': '瑝珑 第一章', 'section': '散华角色线'},
-            '白芷线': {'chapter': '瑝珑 第一章', 'section': '白芷角色线'},
-            '赞妮副本': {'chapter': '瑝珑 第一章', 'section': '赞妮角色副本'},
-            '夏空线': {'chapter': '瑝珑 第一章', 'section': '夏空角色线'},
-            'V2.3': {'chapter': '瑝珑 第一章', 'section': '版本更新角色线'},
-        }
-        
-        # 支线任务的分类
-        self.side_quest_categories = {
-            '支线': {'chapter': '瑝珑 第一章', 'section': '支线任务'},
-            '布偶小队历险记': {'chapter': '瑝珑 第一章', 'section': '布偶小队历险记'},
-            '猫猫咖啡厅': {'chapter': '瑝珑 第一章', 'section': '猫猫咖啡厅'},
-            '灯塔迷航': {'chapter': '瑝珑 第一章', 'section': '灯塔迷航'},
-            '沉没的历史': {'chapter': '瑝珑 第一章', 'section': '沉没的历史'},
-            
-            # 团团转系列
-            '团团团团转': {'chapter': '瑝珑 第一章', 'section': '团团团团转支线'},
-            '团团转': {'chapter': '瑝珑 第一章', 'section': '团团转支线'},
-            
-            # 记忆手册系列
-            '团子记忆手册': {'chapter': '瑝珑 第一章', 'section': '团子记忆手册'},
-            '记忆手册': {'chapter': '瑝珑 第一章', 'section': '记忆手册任务'},
-        }
-        
-        # 主线剧情分类（基于自动扫描结果）
-        self.main_story_categories = {
-            # 瑝珑第二章主线剧情
-            '剧情_POI_瑝珑台': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
-            '剧情_桑原_一阶POI剧情对话': {'chapter': '瑝珑 第二章', 'section': '桑原主线'},
-            '剧情_七丘_乘宵山_剧情对话': {'chapter': '瑝珑 第二章', 'section': '乘宵山主线'},
-            '剧情_2_4_活动_瑝珑之战': {'chapter': '瑝珑 第二章', 'section': '瑝珑之战主线'},
-            '剧情_2_1_七丘_瑝珑要塞_下篇_POI对话': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
-            '剧情_桑原_剧场_瑝珑POI对话': {'chapter': '瑝珑 第二章', 'section': '剧场主线'},
-            '剧情_2.4_瑝珑渊碎片': {'chapter': '瑝珑 第二章', 'section': '瑝珑渊主线'},
-            '剧情_七丘_瑝珑要塞_无光之森林危机': {'chapter': '瑝珑 第二章', 'section': '无光森林主线'},
-            '剧情_七丘_瑝珑台': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
-            '剧情_荒石高地_瑝珑要塞': {'chapter': '瑝珑 第二章', 'section': '荒石高地主线'},
-            '剧情_2_0_七丘_瑝珑要塞_POI对话': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
-            '剧情_瑝珑要塞旋转': {'chapter': '瑝珑 第二章', 'section': '瑝珑要塞主线'},
-            '剧情_2_0_瑝珑台_瑝珑要塞': {'chapter': '瑝珑 第二章', 'section': '瑝珑台主线'},
-            '剧情_乘宵山_瑝珑要塞_瑝珑式': {'chapter': '瑝珑 第二章', 'section': '瑝珑式主线'},
-            '剧情_活动_V1.0瑝珑活动': {'chapter': '瑝珑 第二章', 'section': '瑝珑活动主线'},
-            
-            # 巴别塔相关
-            '2_6_狄斯台地主线': {'chapter': '瑝珑 第二章', 'section': '狄斯台地主线'},
-            '2_4_巴别塔': {'chapter': '瑝珑 第二章', 'section': '巴别塔剧情'},
-            '巴别塔演出': {'chapter': '瑝珑 第二章', 'section': '巴别塔演出'},
-            '巴别塔领主': {'chapter': '瑝珑 第二章', 'section': '巴别塔领主'},
-            '狄斯台地': {'chapter': '瑝珑 第二章', 'section': '狄斯台地剧情'},
-            '赤林台地': {'chapter': '瑝珑 第二章', 'section': '赤林台地剧情'},
-            '主线': {'chapter': '瑝珑 第二章', 'section': '主线剧情'},
-            '剧情': {'chapter': '瑝珑 第二章', 'section': '剧情对话'},
-        }
-        
-        # 其他特殊分类
-        self.special_categories = {
-            '测试': {'chapter': '测试内容', 'section': '测试对话'},
-            '玩法': {'chapter': '游戏玩法', 'section': '玩法对话'},
-            '活动': {'chapter': '限时活动', 'section': '活动对话'},
-            '副本': {'chapter': '副本内容', 'section': '副本对话'},
-            '任务专用冒泡': {'chapter': '瑝珑 第一章', 'section': '角色任务对话'},
-        }
-        
         # 统计信息
         self.stats = {
             'total_dialogues': 0,
@@ -188,18 +205,50 @@ class CompleteDialogueProcessor:
             'special_mapped': 0
         }
     
+    # 延迟加载的数据源，按完整处理时的加载顺序排列
+    DATA_SOURCES = ("plot_handbook_config", "quest_node_data", "textmap_data", "quest_hierarchy", "role_quest_index")
+    
+    def _timed_load(self, name: str, loader):
+        start = time.perf_counter()
+        value = loader()
+        self.load_timings[name] = time.perf_counter() - start
+        return value
+    
+    @cached_property
+    def plot_handbook_config(self) -> list:
+        return self._timed_load("PlotHandBookConfig", lambda: load_config("PlotHandBookConfig"))
+    
+    @cached_property
+    def quest_node_data(self) -> list:
+        return self._timed_load("QuestNodeData", lambda: load_config("QuestNodeData"))
+    
+    @cached_property
+    def textmap_data(self) -> TrackingTextMap:
+        """记录每条对话读取了哪些key"""
+        return self._timed_load("MultiText", lambda: TrackingTextMap(load_text_map()))
+    
+    @cached_property
+    def quest_hierarchy(self):
+        """任务层级索引（quest_hierarchy.py），提供任务名和章节"""
+        from quest_hierarchy import QuestHierarchy
+        return self._timed_load("QuestHierarchy", QuestHierarchy.load_or_build)
+    
+    @cached_property
+    def role_quest_index(self):
+        """角色任务索引（role_quest_index.py）；不可用时为None"""
+        from role_quest_index import RoleQuestIndex
+        try:
+            return self._timed_load("RoleQuestIndex", RoleQuestIndex.load_or_build)
+        except FileNotFoundError as e:
+            print(f"Role quest index unavailable, falling back to character_categories: {e}")
+            return None
+    
     def load_configurations(self):
-        """加载所有必要的配置文件"""
+        """加载所有必要的配置文件（完整处理时一次性触发全部数据源）"""
         print("Loading configuration files...")
         
-        with open("ConfigDB/PlotHandBookConfig.json", 'r', encoding='utf-8') as f:
-            self.plot_handbook_config = json.load(f)
-        
-        with open("ConfigDB/QuestNodeData.json", 'r', encoding='utf-8') as f:
-            self.quest_node_data = json.load(f)
-        
-        with open("TextMap/zh-Hans/MultiText.json", 'r', encoding='utf-8') as f:
-            self.textmap_data = json.load(f)
+        for source in self.DATA_SOURCES:
+            getattr(self, source)
         
         print(f"Loaded {len(self.plot_handbook_config)} PlotHandBook records")
         print(f"Loaded {len(self.quest_node_data)} QuestNodeData records")
@@ -305,8 +354,10 @@ class CompleteDialogueProcessor:
     def get_comprehensive_quest_info(self, quest_id: int) -> Dict[str, str]:
         """获取全面的任务信息（支持多种后缀格式）"""
         if quest_id in self.quest_info_cache:
+            self.textmap_data.touch(self.quest_info_keys[quest_id])
             return self.quest_info_cache[quest_id]
         
+        used_keys = self.textmap_data.start_capture()
         quest_info = {
             'quest_name': '',
             'quest_desc': '',
@@ -316,19 +367,17 @@ class CompleteDialogueProcessor:
             'section_desc': ''
         }
         
-        # 动态查找QuestName（支持多种后缀）
-        quest_name_keys = [k for k in self.textmap_data.keys() 
-                          if k.startswith(f"Quest_{quest_id}_QuestName_")]
-        if quest_name_keys:
-            quest_info['quest_name'] = self.textmap_data[quest_name_keys[0]]
+        # QuestName / QuestDesc 的key（后缀各不相同）直接取自QuestData的TidName / TidDesc
+        quest = self.quest_hierarchy.quest(quest_id) or {}
+        quest_name = self.textmap_data.get(quest.get('name') or '')
+        if quest_name:
+            quest_info['quest_name'] = quest_name
             quest_info['section_title'] = quest_info['quest_name']  # section_title应该是quest_name
             self.stats['quest_name_found'] += 1
         
-        # 动态查找QuestDesc（支持多种后缀）
-        quest_desc_keys = [k for k in self.textmap_data.keys() 
-                          if k.startswith(f"Quest_{quest_id}_QuestDesc_")]
-        if quest_desc_keys:
-            quest_info['quest_desc'] = self.textmap_data[quest_desc_keys[0]]
+        quest_desc = self.textmap_data.get(quest.get('desc') or '')
+        if quest_desc:
+            quest_info['quest_desc'] = quest_desc
             self.stats['quest_desc_found'] += 1
         
         # 查找章节信息
@@ -336,7 +385,9 @@ class CompleteDialogueProcessor:
         quest_info.update(chapter_info)
         
         # 缓存结果
+        self.textmap_data.stop_capture(used_keys)
         self.quest_info_cache[quest_id] = quest_info
+        self.quest_info_keys[quest_id] = used_keys
         return quest_info
     
     def get_comprehensive_chapter_info(self, quest_id: int) -> Dict[str, str]:
@@ -346,42 +397,44 @@ class CompleteDialogueProcessor:
             'chapter_desc': ''
         }
         
-        # 根据QuestId模式推断章节
         chapter_id = self.infer_chapter_id(quest_id)
         if chapter_id:
             chapter_info = self.get_chapter_by_id(chapter_id)
             self.stats['chapter_info_found'] += 1
+        else:
+            # 没有QuestChapter的任务，用任务树章节（QuestTreeChapter）
+            quest_path = self.quest_hierarchy.path(quest_id) or {}
+            chapter_title = self.textmap_data.get(quest_path.get('chapter') or '')
+            if chapter_title:
+                chapter_info = {
+                    'chapter_title': chapter_title,
+                    'chapter_desc': self.textmap_data.get(quest_path.get('act') or '') or ''
+                }
+                self.stats['chapter_info_found'] += 1
         
         return chapter_info
     
     def infer_chapter_id(self, quest_id: int) -> Optional[int]:
-        """根据QuestId推断ChapterId"""
-        # 基于分析的模式
-        if quest_id >= 139000000 and quest_id < 140000000:
-            return 1  # 世界之初
-        elif quest_id >= 135000000 and quest_id < 136000000:
-            return 2  # 瑝珑第一章
-        elif quest_id >= 140000000 and quest_id < 141000000:
-            return 3  # 其他章节
-        elif quest_id >= 114000000 and quest_id < 115000000:
-            return 2  # 瑝珑第一章（吟霖线等）
-        else:
-            return None
+        """任务所属的ChapterId（QuestData配置，没有时沿任务树 / 上级任务 / QuestId区间回退，见 quest_hierarchy.py）"""
+        return self.quest_hierarchy.chapter_of(quest_id)
     
     def get_chapter_by_id(self, chapter_id: int) -> Dict[str, str]:
         """根据ChapterId获取章节信息"""
         if chapter_id in self.chapter_info_cache:
+            self.textmap_data.touch(self.chapter_info_keys[chapter_id])
             return self.chapter_info_cache[chapter_id]
         
+        used_keys = self.textmap_data.start_capture()
         chapter_info = {
             'chapter_title': '',
             'chapter_desc': ''
         }
         
-        # 查找章节信息
-        chapter_num_key = f"QuestChapter_{chapter_id}_ChapterNum"
-        section_num_key = f"QuestChapter_{chapter_id}_SectionNum"
-        chapter_name_key = f"QuestChapter_{chapter_id}_ChapterName"
+        # 章节文本key来自QuestChapter配置（个别章节带 _new 等后缀）
+        chapter = self.quest_hierarchy.chapter(chapter_id) or {}
+        chapter_num_key = chapter.get('chapternum')
+        section_num_key = chapter.get('sectionnum')
+        chapter_name_key = chapter.get('chaptername')
         
         if chapter_num_key in self.textmap_data:
             chapter_info['chapter_title'] = self.textmap_data[chapter_num_key]
@@ -393,7 +446,9 @@ class CompleteDialogueProcessor:
             chapter_info['chapter_desc'] = self.textmap_data[chapter_name_key]
         
         # 缓存结果
+        self.textmap_data.stop_capture(used_keys)
         self.chapter_info_cache[chapter_id] = chapter_info
+        self.chapter_info_keys[chapter_id] = used_keys
         return chapter_info
     
     def get_ecological_info(self, flow_name: str) -> Dict[str, str]:
@@ -415,8 +470,23 @@ class CompleteDialogueProcessor:
             'section_desc': ''
         }
     
-    def get_character_info(self, flow_name: str) -> Dict[str, str]:
+    def get_character_info(self, flow_name: str, quest_id: Optional[int] = None) -> Dict[str, str]:
         """获取角色任务对话的分类信息"""
+        entry = self.role_quest_index.lookup(flow_name, quest_id) if self.role_quest_index else None
+        if entry:
+            self.stats['character_mapped'] += 1
+            role_name = self.textmap_data.get(entry['role_name_key'] or '') or ''
+            quest_name = self.textmap_data.get(entry['quest_name_key'] or '') or ''
+            chapter_info = self.get_chapter_by_id(entry['chapter_id']) if entry['chapter_id'] else {}
+            section = f'{role_name}角色线' if role_name else (quest_name or '角色任务对话')
+            return {
+                'chapter_title': chapter_info.get('chapter_title') or '角色任务',
+                'chapter_desc': chapter_info.get('chapter_desc') or quest_name,
+                'section_title': section,
+                'section_desc': f'{role_name or quest_name}角色专属任务对话',
+                'quest_id': entry['quest_id']
+            }
+        
         for character, info in self.character_categories.items():
             if character in flow_name:
                 self.stats['character_mapped'] += 1
@@ -617,7 +687,7 @@ class CompleteDialogueProcessor:
         processed_count = 0
         mapped_count = 0
         
-        with open(input_file, 'r', encoding='utf-8') as f:
+        with open_jsonl(input_file) as f:
             lines = f.readlines()
         
         print(f"Reading {len(lines)} dialogue lines...")
@@ -639,6 +709,8 @@ class CompleteDialogueProcessor:
                     
                     flow_name = doc_info['flow_name']
                     quest_id = self.flow_to_quest_mapping.get(flow_name)
+                    used_keys = self.textmap_data.start_capture()
+                    role_quest_id = None
                     
                     if quest_id:
                         mapped_count += 1
@@ -694,9 +766,10 @@ class CompleteDialogueProcessor:
                             }
                         elif character_info['chapter_title']:
                             # 角色任务对话
+                            role_quest_id = character_info.get('quest_id')
                             final_item = {
                                 'doc_id': doc_id,
-                                'quest_id': None,
+                                'quest_id': role_quest_id,
                                 'quest_name': '角色任务对话',
                                 'quest_desc': f'{flow_name}角色专属任务对话',
                                 'chapter_title': character_info['chapter_title'],
@@ -773,6 +846,23 @@ class CompleteDialogueProcessor:
                                 'text': text
                             }
                     
+                    # split_dialogue.py 生成的男/女主变体（doc_id 带 #male / #female）保留 gender 字段
+                    if data.get('gender'):
+                        final_item['gender'] = data['gender']
+                    
+                    self.textmap_data.stop_capture(used_keys)
+                    if quest_id:
+                        # 通配符覆盖以后新增的 Quest_<id>_ChildQuestTip_... 等文本
+                        used_keys.update((f"Quest_{quest_id}_*", config_key("QuestData", quest_id),
+                                          config_key("PlotHandBookConfig", quest_id)))
+                    elif role_quest_id:
+                        used_keys.update((f"Quest_{role_quest_id}_*", config_key("QuestData", role_quest_id)))
+                    # 对话本身: 所在的FlowState行和台词的TidTalk（split_dialogue.py 带过来的）
+                    state_key = data.get('state_key') or doc_id[len("dialogue_"):].rsplit('_', 1)[0]
+                    used_keys.add(config_key("FlowState", state_key))
+                    used_keys.update(data.get('text_keys') or ())
+                    self.dependencies[doc_id] = used_keys
+                    
                     f.write(json.dumps(final_item, ensure_ascii=False) + '\n')
                     processed_count += 1
                     
@@ -846,11 +936,35 @@ class CompleteDialogueProcessor:
         
         self.process_dialogue_data(input_file, output_file)
         
-        # 4. 打印统计
+        # 4. 更新反向依赖索引
+        record_stage("dialogue", self.dependencies)
+        
+        # 5. 打印统计
         self.print_final_statistics()
         
         print(f"\nComplete final dataset saved to: {output_file}")
 
-if __name__ == "__main__":
+def measure_startup(load_sources: bool = True):
+    """启动耗时: 模块导入、创建处理器，以及（可选）每个数据源第一次访问的加载时间"""
+    start = time.perf_counter()
     processor = CompleteDialogueProcessor()
-    processor.run()
+    init_time = time.perf_counter() - start
+    print("=== STARTUP TIMING ===")
+    print(f"Module imports:      {_IMPORT_TIME * 1000:8.1f} ms")
+    print(f"Processor __init__:  {init_time * 1000:8.1f} ms")
+    if not load_sources:
+        return
+    for name in CompleteDialogueProcessor.DATA_SOURCES:
+        try:
+            getattr(processor, name)
+        except FileNotFoundError as e:
+            print(f"{name:20s} unavailable: {e}")
+    for source, seconds in processor.load_timings.items():
+        print(f"{source + ':':20s} {seconds * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    if "--startup-time" in sys.argv[1:]:
+        measure_startup(load_sources="--no-load" not in sys.argv[1:])
+    else:
+        processor = CompleteDialogueProcessor()
+        processor.run()
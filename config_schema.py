@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ConfigDB 表结构推断与带类型的行对象
+
+infer 扫描 ConfigDB 下每张表一次，记录每列的名称、出现顺序和取值类型，保存为 config_schema.json:
+  {"InstanceDungeon": {"rows": 1131, "fields": {"Id": ["int"], "MapName": ["str"], "SubLevels": ["list", "null"], ...}}}
+
+load_typed 按表结构生成带 __slots__ 的行类，JSON 解析时直接构造行对象，不再为每一行保留一个dict。
+行对象兼容原来的写法（row.get("Key")、row["Key"]、"Key" in row，缺列时的行为也与dict相同），
+也可以直接用 row.Key；
+列很多、行很多的表（InstanceDungeon、ModelConfigPreload 等）内存占用明显下降。
+
+用法:
+  python config_schema.py infer
+  python config_schema.py show <表名>
+  python config_schema.py measure <表名> [...]
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, Optional
+
+from game_data import CONFIG_DIR, load_config
+
+DEFAULT_SCHEMA = "WutheringDialog/data/config_schema.json"
+TYPE_NAMES = {bool: "bool", int: "int", float: "float", str: "str", list: "list", dict: "dict", type(None): "null"}
+
+
+def infer_table_schema(rows: Iterable[dict]) -> dict:
+    """一张表的结构：列按首次出现的顺序排列，类型按出现顺序去重；不是每行都有的列带 "missing" """
+    fields: Dict[str, List[str]] = {}
+    counts: Dict[str, int] = {}
+    row_count = 0
+    for row in rows:
+        row_count += 1
+        for name, value in row.items():
+            types = fields.setdefault(name, [])
+            type_name = TYPE_NAMES.get(type(value), type(value).__name__)
+            if type_name not in types:
+                types.append(type_name)
+            counts[name] = counts.get(name, 0) + 1
+    for name, count in counts.items():
+        if count < row_count:
+            fields[name].append("missing")
+    return {"rows": row_count, "fields": fields}
+
+
+def infer_schemas(config_dir: str = CONFIG_DIR, output_path: str = DEFAULT_SCHEMA) -> Dict[str, dict]:
+    print("=== 推断 ConfigDB 表结构 ===")
+    start = time.time()
+    schemas = {}
+    skipped = 0
+    for file_name in sorted(os.listdir(config_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        table = file_name[:-len(".json")]
+        try:
+            rows = load_config(table, config_dir)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            skipped += 1
+            continue
+        if isinstance(rows, list) and all(isinstance(row, dict) for row in rows):
+            schemas[table] = infer_table_schema(rows)
+        else:
+            skipped += 1
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(schemas, f, ensure_ascii=False, indent=1)
+    print(f"表: {len(schemas)}，跳过: {skipped}，列: {sum(len(s['fields']) for s in schemas.values())}")
+    print(f"✅ 已保存: {output_path} ({time.time() - start:.1f}s)")
+    return schemas
+
+
+_schemas: Optional[Dict[str, dict]] = None
+
+
+def load_schemas(path: str = DEFAULT_SCHEMA) -> Dict[str, dict]:
+    """进程内只读一次；文件不存在时返回空字典（load_typed 会现场推断）"""
+    global _schemas
+    if _schemas is None:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                _schemas = json.load(f)
+        else:
+            _schemas = {}
+    return _schemas
+
+
+_MISSING = object()  # 行里没有的列：对应的slot不赋值
+
+
+class ConfigRow:
+    """
+    所有行类的基类，提供与dict相同的只读接口。行里没有的列不赋值，
+    get() 返回默认值、in 为 False、[] 抛出 KeyError，keys()/items() 也不包含它。
+    """
+    __slots__ = ()
+    _field_set = frozenset()  # 行类的列名集合，成员判断不用线性扫描 __slots__
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in self._field_set else default
+
+    def __getitem__(self, name):
+        value = getattr(self, name, _MISSING) if name in self._field_set else _MISSING
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name) -> bool:
+        return name in self._field_set and hasattr(self, name)
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def items(self):
+        for name in self.__slots__:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                yield name, value
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "ConfigRow":
+        return cls(*(row.get(name, _MISSING) for name in cls.__slots__))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+
+_row_classes: Dict[str, type] = {}
+
+
+def row_class(table: str, fields: Iterable[str]) -> type:
+    """为一张表生成（并缓存）带 __slots__ 的行类，构造参数按列顺序排列，缺的列（或传入 _MISSING）不赋值"""
+    fields = tuple(fields)
+    cls = _row_classes.get(table)
+    if cls is not None and cls.__slots__ == fields:
+        return cls
+
+    def __init__(self, *values):
+        for name, value in zip(fields, values):
+            if value is not _MISSING:
+                setattr(self, name, value)
+
+    cls = type(f"{table}Row", (ConfigRow,), {"__slots__": fields, "_field_set": frozenset(fields),
+                                             "__init__": __init__})
+    _row_classes[table] = cls
+    return cls
+
+
+def class_source(table: str, schema: dict) -> str:
+    """行类的等价源码，方便查看某张表有哪些列"""
+    lines = [f"class {table}Row(ConfigRow):", f"    __slots__ = {tuple(schema['fields'])!r}", ""]
+    for name, types in schema["fields"].items():
+        lines.append(f"    # {name}: {' | '.join(types)}")
+    return "\n".join(lines)
+
+
+def load_typed(table: str, config_dir: str = CONFIG_DIR, schema_path: str = DEFAULT_SCHEMA) -> List[ConfigRow]:
+    """
+    与 load_config 相同，但返回行对象。列顺序与表结构一致的行在解析时直接构造，
+    其余（缺列或顺序不同的行）解析完再转换；config_schema.json 里没有的表先现场推断。
+
+    同一张表里重复出现的字符串和列表（资源路径、[0, 0, 0] 之类）只保留一份，
+    所以行对象要当作只读使用。
+    """
+    schema = load_schemas(schema_path).get(table)
+    if schema is None:
+        rows = load_config(table, config_dir)
+        cls = row_class(table, infer_table_schema(rows)["fields"])
+        return [cls.from_dict(row) for row in rows]
+
+    cls = row_class(table, schema["fields"])
+    fields = cls.__slots__
+    shared = {}
+
+    def share(value):
+        if isinstance(value, str):
+            return shared.setdefault(value, value)
+        if isinstance(value, list):
+            value[:] = [share(item) for item in value]
+            try:
+                # 带上类型，避免 [1] 和 [True] 被当成同一个值
+                return shared.setdefault((list, tuple((type(item), item) for item in value)), value)
+            except TypeError:
+                return value
+        return value
+
+    def object_pairs_hook(pairs):
+        values = [share(value) for _, value in pairs]
+        if len(pairs) == len(fields) and all(pair[0] == name for pair, name in zip(pairs, fields)):
+            return cls(*values)
+        return {name: value for (name, _), value in zip(pairs, values)}
+
+    with open(os.path.join(config_dir, f"{table}.json"), "r", encoding="utf-8") as f:
+        rows = json.load(f, object_pairs_hook=object_pairs_hook)
+    return [row if isinstance(row, ConfigRow) else cls.from_dict(row) for row in rows]
+
+
+def measure(table: str, config_dir: str = CONFIG_DIR):
+    """比较 dict 行与行对象的内存占用（tracemalloc 统计的常驻大小）"""
+    results = {}
+    load_schemas()  # 表结构缓存是一次性开销，不计入
+    for label, loader in (("dict", load_config), ("typed", load_typed)):
+        tracemalloc.start()
+        start = time.time()
+        rows = loader(table, config_dir)
+        elapsed = time.time() - start
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = size
+        print(f"  {label:6s} {len(rows):>7,} 行  常驻 {size / 1024 / 1024:7.2f} MB  峰值 {peak / 1024 / 1024:7.2f} MB"
+              f"  {elapsed:.2f}s")
+        del rows
+    print(f"  {table}: 内存降到 {results['typed'] / results['dict']:.0%}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "infer":
+        infer_schemas()
+    elif command == "show" and len(sys.argv) > 2:
+        table_schema = load_schemas().get(sys.argv[2]) or infer_table_schema(load_config(sys.argv[2]))
+        print(class_source(sys.argv[2], table_schema))
+    elif command == "measure" and len(sys.argv) > 2:
+        for table_name in sys.argv[2:]:
+            measure(table_name)
+    else:
+        print("用法: python config_schema.py [infer|show <表名>|measure <表名> ...]")
@@ -2,10 +2,13 @@
 import json
 import os
 
-def create_flow_map(config_dir, output_path):
+from flow_registry import DEFAULT_REGISTRY, FlowRegistry
+
+def create_flow_map(config_dir, output_path, registry_path=DEFAULT_REGISTRY):
     """
     Creates a mapping from a dialogue StateKey to its parent FlowId.
     Example: {"剧情_新剧本测试_1_1": "剧情_新剧本测试_1"}
+    The same data is also saved as a compact binary FlowRegistry (see flow_registry.py).
     """
     flow_file_path = os.path.join(config_dir, "Flow.json")
     print(f"Reading {flow_file_path} to create flow map...")
@@ -17,23 +20,17 @@ def create_flow_map(config_dir, output_path):
         print(f"ERROR: {flow_file_path} not found.")
         return
 
-    state_to_flow_map = {}
-    for flow in flow_data:
-        flow_id = flow.get("Id")
-        states = flow.get("States")
-        if not all([flow_id, states]):
-            continue
-        
-        for state in states:
-            # Construct the StateKey, e.g., "剧情_新剧本测试_1" + "_" + 1 -> "剧情_新剧本测试_1_1"
-            state_key = f"{flow_id}_{state}"
-            state_to_flow_map[state_key] = flow_id
+    registry = FlowRegistry.from_flow_config(flow_data)
+    # StateKeys are "剧情_新剧本测试_1" + "_" + 1 -> "剧情_新剧本测试_1_1"
+    state_to_flow_map = registry.to_state_map()
 
     try:
         with open(output_path, 'w', encoding='utf-8') as outfile:
             json.dump(state_to_flow_map, outfile, ensure_ascii=False, indent=2)
         print(f"Successfully created flow map with {len(state_to_flow_map)} entries.")
         print(f"Map saved to: {output_path}")
+        registry.save(registry_path)
+        print(f"Flow registry ({len(registry)} flows, {len(registry.list_names)} flow lists) saved to: {registry_path}")
     except Exception as e:
         print(f"ERROR: Failed to write to output file {output_path}: {e}")
 
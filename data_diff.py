@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+跨版本数据比对 - 逐key / 逐行比较两个版本的 TextMap 和 ConfigDB
+
+每次游戏更新都会整体替换 TextMap/* 和 ConfigDB/*。本脚本比较新旧两个数据快照:
+  1. 文件大小相同且内容哈希一致的文件直接跳过（绝大多数表）
+  2. 有变化的文件逐个流式读取（不整体 json.load，只保留每个key/每行的哈希）:
+       TextMap（字典）   按 key 比较文本
+       ConfigDB（列表）  按主键（Id / QuestId / ItemId / StateKey ...）比较每一行的哈希；
+                         没有主键的表（BubbleData 等）把行哈希当作多重集合比较，key 记为 #digest
+  3. 输出紧凑的变更集 changeset.json，只记录 新增/删除/修改 的key和主键，不保存内容
+
+下游可以根据变更集决定需要重新计算的部分（dependency_index.py invalidate <changeset.json>）。
+
+用法:
+  python data_diff.py <旧版本根目录> [新版本根目录=.] [--output changeset.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DATA_DIRS = ("ConfigDB", "TextMap")
+DEFAULT_CHANGESET = "WutheringDialog/data/changeset.json"
+# ConfigDB 表常见的主键列，按优先级尝试
+PRIMARY_KEY_CANDIDATES = ("Id", "QuestId", "ItemId", "Key", "CaptionId", "CgId", "RoleId", "StateKey")
+
+
+def file_digest(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def row_digest(row) -> str:
+    return hashlib.md5(json.dumps(row, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def list_data_files(root: str) -> Dict[str, str]:
+    """相对路径 -> 绝对路径，只包含 ConfigDB/ 和 TextMap/ 下的json文件"""
+    files = {}
+    for data_dir in DATA_DIRS:
+        base = os.path.join(root, data_dir)
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.endswith(".json"):
+                    path = os.path.join(dirpath, filename)
+                    files[os.path.relpath(path, root).replace(os.sep, "/")] = path
+    return files
+
+
+SEPARATORS = re.compile(r"[\s,]*")
+COLON = re.compile(r"\s*:\s*")
+
+
+def iter_json_entries(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[Optional[str], object]]:
+    """
+    流式读取顶层为对象或数组的JSON文件，逐个产出 (key, 值)；数组元素的key为None。
+    按块读取，只在内存里保留当前块，不要求一行一条，也容忍多余的逗号。
+    顶层不是对象/数组时整体解析，产出一次 (None, 值)。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip("\ufeff \t\r\n")
+        if not buffer or buffer[0] not in "[{":
+            yield None, json.loads(buffer + f.read())
+            return
+        is_object = buffer[0] == "{"
+        closing = "}" if is_object else "]"
+        pos, eof = 1, False
+        while True:
+            pos = SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == closing:
+                return
+            try:
+                key = None
+                end = pos
+                if is_object:
+                    key, end = decoder.raw_decode(buffer, pos)
+                    colon = COLON.match(buffer, end)
+                    if colon is None or colon.end() >= len(buffer):
+                        raise json.JSONDecodeError("Expecting ':' delimiter", buffer, end)
+                    end = colon.end()
+                value, end = decoder.raw_decode(buffer, end)
+                if end >= len(buffer) and not eof:
+                    # 数字可能在块边界被截断，读到下一块再解析
+                    raise json.JSONDecodeError("Unterminated value", buffer, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield key, value
+            pos = end
+            if pos > chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def scan_file(path: str):
+    """
+    流式扫描一个文件，只保留比较需要的信息:
+      对象（TextMap）  -> ("key", {key: 文本或哈希})
+      数组（ConfigDB） -> ("rows", [(各候选主键列的值, 行哈希), ...])
+    """
+    entries = iter_json_entries(path)
+    texts, rows = {}, []
+    for key, value in entries:
+        if key is not None:
+            # TextMap 的值是短字符串，直接比较文本比算哈希更快
+            texts[str(key)] = value if isinstance(value, str) else row_digest(value)
+            continue
+        candidates = tuple(value.get(column) if isinstance(value, dict) else None
+                           for column in PRIMARY_KEY_CANDIDATES)
+        rows.append((candidates, row_digest(value)))
+    if texts or not rows:
+        return "key", texts
+    return "rows", rows
+
+
+def detect_primary_key(*row_lists) -> Optional[int]:
+    """在所有版本的所有行中都存在且唯一的主键列，返回其在 PRIMARY_KEY_CANDIDATES 中的下标"""
+    if not any(row_lists):
+        return None
+    for i in range(len(PRIMARY_KEY_CANDIDATES)):
+        for rows in row_lists:
+            values = [str(candidates[i]) for candidates, _ in rows if candidates[i] is not None]
+            if len(values) < len(rows) or len(set(values)) < len(values):
+                break
+        else:
+            return i
+    return None
+
+
+def multiset_diff(old_digests: List[str], new_digests: List[str]) -> Tuple[List[str], List[str]]:
+    """没有主键的表按行哈希的多重集合比较，插入一行不会让后面的行都算作修改"""
+    old_counts, new_counts = Counter(old_digests), Counter(new_digests)
+    return sorted((new_counts - old_counts).elements()), sorted((old_counts - new_counts).elements())
+
+
+def diff_file(old_path: str, new_path: str) -> Optional[dict]:
+    """比较同一个表的两个版本，没有变化时返回None"""
+    old_kind, old_data = scan_file(old_path)
+    new_kind, new_data = scan_file(new_path)
+
+    if old_kind == new_kind == "key":
+        key = "key"
+        old_digests, new_digests = old_data, new_data
+    elif old_kind == new_kind == "rows":
+        column = detect_primary_key(old_data, new_data)
+        if column is None:
+            added, removed = multiset_diff([digest for _, digest in old_data], [digest for _, digest in new_data])
+            if not (added or removed):
+                return None
+            return {"key": "#digest", "added": added, "removed": removed, "changed": []}
+        key = PRIMARY_KEY_CANDIDATES[column]
+        old_digests = {str(candidates[column]): digest for candidates, digest in old_data}
+        new_digests = {str(candidates[column]): digest for candidates, digest in new_data}
+    else:
+        # 顶层结构变了（对象 <-> 数组），整表视为替换
+        return {"key": f"{old_kind}->{new_kind}", "added": sorted(map(str, range(len(new_data)))),
+                "removed": sorted(map(str, range(len(old_data)))), "changed": []}
+
+    added = [k for k in new_digests if k not in old_digests]
+    removed = [k for k in old_digests if k not in new_digests]
+    changed = [k for k, digest in new_digests.items() if k in old_digests and old_digests[k] != digest]
+    if not (added or removed or changed):
+        return None
+    return {"key": key, "added": added, "removed": removed, "changed": changed}
+
+
+def diff_snapshots(old_root: str, new_root: str = ".", output_path: str = DEFAULT_CHANGESET) -> dict:
+    """比较两个数据快照，写出变更集"""
+    print("=== 跨版本数据比对 ===")
+    print(f"旧版本: {old_root}")
+    print(f"新版本: {new_root}")
+    start = time.time()
+
+    old_files = list_data_files(old_root)
+    new_files = list_data_files(new_root)
+    changeset = {
+        "old_root": os.path.abspath(old_root),
+        "new_root": os.path.abspath(new_root),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "files_added": sorted(f for f in new_files if f not in old_files),
+        "files_removed": sorted(f for f in old_files if f not in new_files),
+        "tables": {},
+    }
+
+    skipped = 0
+    for rel_path in sorted(new_files):
+        old_path = old_files.get(rel_path)
+        if old_path is None:
+            continue
+        new_path = new_files[rel_path]
+        if (os.path.getsize(old_path) == os.path.getsize(new_path)
+                and file_digest(old_path) == file_digest(new_path)):
+            skipped += 1
+            continue
+        try:
+            table_diff = diff_file(old_path, new_path)
+        except json.JSONDecodeError as e:
+            print(f"⚠️  {rel_path} JSON解析失败: {e}")
+            continue
+        if table_diff:
+            changeset["tables"][rel_path] = table_diff
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(changeset, f, ensure_ascii=False, indent=1)
+
+    print(f"未变化的文件: {skipped:,}")
+    print(f"新增文件: {len(changeset['files_added'])}，删除文件: {len(changeset['files_removed'])}")
+    print(f"有变化的表: {len(changeset['tables'])}")
+    for rel_path, table_diff in changeset["tables"].items():
+        print(f"  {rel_path} [{table_diff['key']}]: +{len(table_diff['added'])} "
+              f"-{len(table_diff['removed'])} ~{len(table_diff['changed'])}")
+    print(f"✅ 变更集: {output_path} ({time.time() - start:.2f}s)")
+    return changeset
+
+
+def load_changeset(path: str = DEFAULT_CHANGESET) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def changed_keys(changeset: dict, prefix: str = "") -> List[str]:
+    """
+    变更集中所有新增/删除/修改的key，形如 "TextMap/zh-Hans/MultiText.json:RoleInfo_1102_Name"
+    或 "ConfigDB/ItemInfo.json:10001"。prefix 可用于只取 TextMap 或 ConfigDB 的部分。
+    """
+    keys = []
+    for rel_path, table_diff in changeset.get("tables", {}).items():
+        if not rel_path.startswith(prefix):
+            continue
+        for kind in ("added", "removed", "changed"):
+            keys.extend(f"{rel_path}:{key}" for key in table_diff[kind])
+    return keys
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="跨版本 TextMap / ConfigDB 比对")
+    parser.add_argument("old_root")
+    parser.add_argument("new_root", nargs="?", default=".")
+    parser.add_argument("--output", default=DEFAULT_CHANGESET)
+    args = parser.parse_args()
+
+    diff_snapshots(args.old_root, args.new_root, args.output)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+反向依赖索引 - 记录每个输出文档读取了哪些 TextMap / ConfigDB 的key，
+数据更新后只重新生成真正受影响的文档
+
+依赖key的写法:
+  TextMap      直接用文本key，例如 "FavorStory_110201_Content"
+  ConfigDB     "ConfigDB/<表名>.json:<主键>"，例如 "ConfigDB/ItemInfo.json:10001"
+  前缀通配     以 * 结尾，例如 "FavorStory_110201_*"，用来覆盖以后新增的字段
+
+变化key同样可以带 * ：没有主键的表（BubbleData 等，data_diff 记为 #digest）整表记为
+"ConfigDB/<表名>.json:*"，匹配这张表下记录的所有key。
+
+每个提取阶段（characters / items / dialogue ...）的依赖单独保存，某个阶段重新运行时
+只替换它自己的那一部分。存储格式为gzip压缩的JSON，key字符串只存一份:
+  {"keys": [...], "stages": {stage: {"docs": [...], "offsets": [...], "targets": [...]}}}
+
+用法:
+  python dependency_index.py stats
+  python dependency_index.py invalidate <changeset.json>   根据 data_diff.py 的变更集列出需要重建的doc_id
+  python dependency_index.py invalidate-keys <key> [<key> ...]
+  python dependency_index.py self-check                    用临时快照验证 data_diff 变更集能命中依赖
+"""
+
+import bisect
+import gzip
+import json
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Set
+
+DEFAULT_INDEX = "WutheringDialog/data/dependency_index.json.gz"
+
+
+def config_key(table: str, primary_key) -> str:
+    return f"ConfigDB/{table}.json:{primary_key}"
+
+
+def keys_from_changeset(changeset: dict) -> List[str]:
+    """
+    把 data_diff.py 的变更集转换成依赖key（TextMap 去掉文件路径，各语言合并）。
+    没有主键的表只有行哈希，对应不到具体的行，整表记为 "ConfigDB/<表名>.json:*"。
+    """
+    keys = set()
+    for rel_path, table_diff in changeset.get("tables", {}).items():
+        changed = table_diff["added"] + table_diff["removed"] + table_diff["changed"]
+        if rel_path.startswith("TextMap/"):
+            keys.update(changed)
+        elif table_diff.get("key") == "#digest":
+            keys.add(f"{rel_path}:*")
+        else:
+            keys.update(f"{rel_path}:{key}" for key in changed)
+    return sorted(keys)
+
+
+class TrackingTextMap(dict):
+    """
+    记录读取行为的TextMap。在 capture() 范围内，通过 [] 或 get() 成功读到的key都会被记下来，
+    嵌套的 capture() 各自得到一份。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._captures: List[Set[str]] = []
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        for keys in self._captures:
+            keys.add(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def touch(self, keys: Iterable[str]):
+        """把缓存结果对应的key补记到当前所有capture里"""
+        for captured in self._captures:
+            captured.update(keys)
+
+    def start_capture(self) -> Set[str]:
+        keys: Set[str] = set()
+        self._captures.append(keys)
+        return keys
+
+    def stop_capture(self, keys: Set[str]):
+        # 按对象身份移除，内容相同的两个capture不能互相顶替
+        for i in range(len(self._captures) - 1, -1, -1):
+            if self._captures[i] is keys:
+                del self._captures[i]
+                return
+
+    @contextmanager
+    def capture(self):
+        keys = self.start_capture()
+        try:
+            yield keys
+        finally:
+            self.stop_capture(keys)
+
+
+class DependencyIndex:
+    """doc_id -> 依赖key 的持久化索引，以及反向的 key -> doc_id 查询"""
+
+    def __init__(self, path: str = DEFAULT_INDEX):
+        self.path = path
+        self.stages: Dict[str, Dict[str, List[str]]] = {}
+        self._reverse = None
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        keys = data["keys"]
+        for stage, packed in data["stages"].items():
+            offsets, targets = packed["offsets"], packed["targets"]
+            self.stages[stage] = {
+                doc_id: [keys[t] for t in targets[offsets[i]:offsets[i + 1]]]
+                for i, doc_id in enumerate(packed["docs"])
+            }
+
+    def save(self):
+        key_index: Dict[str, int] = {}
+        stages = {}
+        for stage, docs in self.stages.items():
+            offsets, targets = [0], []
+            for doc_keys in docs.values():
+                targets.extend(key_index.setdefault(key, len(key_index)) for key in doc_keys)
+                offsets.append(len(targets))
+            stages[stage] = {"docs": list(docs), "offsets": offsets, "targets": targets}
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "keys": list(key_index), "stages": stages},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def update_stage(self, stage: str, dependencies: Dict[str, Iterable[str]]):
+        """用某个阶段本次运行的依赖整体替换旧记录"""
+        self.stages[stage] = {doc_id: sorted(set(keys)) for doc_id, keys in dependencies.items()}
+        self._reverse = None
+
+    def _build_reverse(self):
+        exact = defaultdict(set)
+        prefixes = defaultdict(set)
+        for docs in self.stages.values():
+            for doc_id, keys in docs.items():
+                for key in keys:
+                    if key.endswith("*"):
+                        prefixes[key[:-1]].add(doc_id)
+                    else:
+                        exact[key].add(doc_id)
+        prefix_lengths = sorted({len(p) for p in prefixes})
+        self._reverse = (exact, prefixes, prefix_lengths, sorted(exact))
+
+    def invalidate(self, changed_keys: Iterable[str]) -> List[str]:
+        """返回依赖了任一变化key的doc_id；以 * 结尾的变化key按前缀匹配所有记录的key"""
+        if self._reverse is None:
+            self._build_reverse()
+        exact, prefixes, prefix_lengths, sorted_keys = self._reverse
+        affected = set()
+        for key in changed_keys:
+            if key.endswith("*"):
+                prefix = key[:-1]
+                i = bisect.bisect_left(sorted_keys, prefix)
+                while i < len(sorted_keys) and sorted_keys[i].startswith(prefix):
+                    affected.update(exact[sorted_keys[i]])
+                    i += 1
+                # 两个通配互相覆盖时（"FavorStory_*" 与 "FavorStory_110201_*"）也算命中
+                for recorded, doc_ids in prefixes.items():
+                    if recorded.startswith(prefix) or prefix.startswith(recorded):
+                        affected.update(doc_ids)
+                continue
+            affected.update(exact.get(key, ()))
+            for length in prefix_lengths:
+                if length > len(key):
+                    break
+                affected.update(prefixes.get(key[:length], ()))
+        return sorted(affected)
+
+    def dependencies_of(self, doc_id: str) -> List[str]:
+        for docs in self.stages.values():
+            if doc_id in docs:
+                return docs[doc_id]
+        return []
+
+
+def record_stage(stage: str, dependencies: Dict[str, Iterable[str]], path: str = DEFAULT_INDEX):
+    """提取脚本调用的便捷函数: 更新一个阶段并保存"""
+    index = DependencyIndex(path)
+    index.update_stage(stage, dependencies)
+    index.save()
+    print(f"依赖索引已更新: {stage} ({len(dependencies):,} 个文档) -> {path}")
+
+
+def self_check() -> bool:
+    """
+    往返验证: 在临时目录里造新旧两版 FlowState（主键 StateKey）和 BubbleData（无主键），
+    各改一行后用 data_diff 生成变更集，确认两边的依赖文档都被判定为需要重建
+    """
+    from data_diff import diff_snapshots
+
+    def write_table(root, table, rows):
+        os.makedirs(os.path.join(root, "ConfigDB"), exist_ok=True)
+        with open(os.path.join(root, "ConfigDB", f"{table}.json"), "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+
+    flow_states = [{"StateKey": "1_1_1", "Actions": "[]"}, {"StateKey": "1_1_2", "Actions": "[]"}]
+    bubbles = [{"ActionGuid": "a", "Params": "{}"}, {"ActionGuid": "b", "Params": "{}"}]
+    with tempfile.TemporaryDirectory() as tmp:
+        old_root, new_root = os.path.join(tmp, "old"), os.path.join(tmp, "new")
+        write_table(old_root, "FlowState", flow_states)
+        write_table(old_root, "BubbleData", bubbles)
+        write_table(new_root, "FlowState", [flow_states[0], dict(flow_states[1], Actions="[{}]")])
+        write_table(new_root, "BubbleData", [bubbles[0], dict(bubbles[1], Params='{"x":1}')])
+        changeset = diff_snapshots(old_root, new_root, os.path.join(tmp, "changeset.json"))
+
+        index = DependencyIndex(os.path.join(tmp, "index.json.gz"))
+        index.update_stage("dialogue", {
+            "dialogue_1_1_1": [config_key("FlowState", "1_1_1")],
+            "dialogue_1_1_2": [config_key("FlowState", "1_1_2")],
+            "bubble_b": [config_key("BubbleData", "b")],
+        })
+        changed = keys_from_changeset(changeset)
+        affected = index.invalidate(changed)
+
+    expected = ["bubble_b", "dialogue_1_1_2"]
+    print(f"变化的key: {changed}")
+    print(f"需要重建: {affected}")
+    ok = affected == expected
+    print("✅ 往返验证通过" if ok else f"❌ 往返验证失败，期望 {expected}")
+    return ok
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "stats":
+        index = DependencyIndex()
+        print(f"=== 依赖索引: {index.path} ===")
+        for stage, docs in index.stages.items():
+            print(f"  {stage}: {len(docs):,} 个文档, {sum(len(k) for k in docs.values()):,} 条依赖")
+    elif command == "invalidate" and len(sys.argv) > 2:
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            changed = keys_from_changeset(json.load(f))
+        affected = DependencyIndex().invalidate(changed)
+        print(f"{len(changed):,} 个变化的key 影响 {len(affected):,} 个文档:")
+        for doc_id in affected:
+            print(doc_id)
+    elif command == "invalidate-keys" and len(sys.argv) > 2:
+        for doc_id in DependencyIndex().invalidate(sys.argv[2:]):
+            print(doc_id)
+    elif command == "self-check":
+        sys.exit(0 if self_check() else 1)
+    else:
+        print("用法: python dependency_index.py [stats|invalidate <changeset.json>|invalidate-keys <key> ...|self-check]")
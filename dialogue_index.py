@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对话倒排索引 - 为 dialogs_zh-Hans.complete_final.jsonl 建立倒排索引
+
+索引目录结构:
+  postings.json  字段倒排表 (quest_id / flow_name / chapter_title / role) + 文本词项倒排表
+  offsets.bin    每一行在JSONL中的字节偏移 (uint64数组)
+
+查询时只加载倒排表，命中的行通过偏移量直接seek读取，不需要重新扫描整个数据集。
+
+用法:
+  python dialogue_index.py build [输入文件] [索引目录]
+  python dialogue_index.py query --quest-id 139000025 --role 秧秧 --text 今州 --limit 20
+"""
+
+import argparse
+import json
+import os
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from cjk_tokenizer import tokenize
+
+DEFAULT_INPUT = "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+DEFAULT_INDEX_DIR = "WutheringDialog/data/dialogs_zh-Hans.complete_final.index"
+
+INDEX_VERSION = 1
+FIELD_NAMES = ("quest_id", "flow_name", "chapter_title", "role")
+
+
+def parse_flow_name(doc_id: str) -> str:
+    """从 dialogue_{flow_name}_{flow_id}_{state_id}_{dialogue_id} 中取出flow_name"""
+    if not doc_id.startswith("dialogue_"):
+        return ""
+    parts = doc_id[9:].rsplit("_", 3)
+    if len(parts) < 4:
+        return ""
+    return parts[0]
+
+
+def split_role(text: str):
+    """把 "角色: 内容" 拆成 (角色, 内容)"""
+    if ": " in text:
+        role, content = text.split(": ", 1)
+        return role.strip(), content
+    return "", text
+
+
+def build_dialogue_index(input_file: str = DEFAULT_INPUT, index_dir: str = DEFAULT_INDEX_DIR) -> bool:
+    """扫描一次JSONL，建立字段倒排表、词项倒排表和行偏移表"""
+    print("=== 建立对话倒排索引 ===")
+
+    if not os.path.exists(input_file):
+        print(f"❌ 输入文件不存在: {input_file}")
+        return False
+
+    start = time.time()
+    offsets = array("Q")
+    fields = {name: defaultdict(list) for name in FIELD_NAMES}
+    terms = defaultdict(list)
+
+    line_no = 0
+    with open(input_file, "rb") as f:
+        offset = 0
+        for raw_line in f:
+            line_offset = offset
+            offset += len(raw_line)
+
+            try:
+                data = json.loads(raw_line)
+            except json.JSONDecodeError:
+                continue
+
+            offsets.append(line_offset)
+            doc_id = data.get("doc_id", "")
+            role, content = split_role(data.get("text", ""))
+
+            values = {
+                "quest_id": data.get("quest_id"),
+                "flow_name": parse_flow_name(doc_id),
+                "chapter_title": data.get("chapter_title"),
+                "role": role,
+            }
+            for name, value in values.items():
+                if value is not None and value != "":
+                    fields[name][str(value)].append(line_no)
+
+            # 同一行的重复词项只记录一次
+            for term in set(tokenize(content)):
+                terms[term].append(line_no)
+
+            line_no += 1
+            if line_no % 10000 == 0:
+                print(f"  已索引 {line_no:,} 行...")
+
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, "offsets.bin"), "wb") as f:
+        offsets.tofile(f)
+
+    postings = {
+        "version": INDEX_VERSION,
+        "source": os.path.abspath(input_file),
+        "source_size": os.path.getsize(input_file),
+        "source_mtime": os.path.getmtime(input_file),
+        "count": line_no,
+        "fields": fields,
+        "terms": terms,
+    }
+    with open(os.path.join(index_dir, "postings.json"), "w", encoding="utf-8") as f:
+        json.dump(postings, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"✅ 已索引 {line_no:,} 行对话，{len(terms):,} 个词项")
+    for name in FIELD_NAMES:
+        print(f"  {name}: {len(fields[name]):,} 个取值")
+    print(f"索引目录: {index_dir}")
+    print(f"耗时: {time.time() - start:.2f}s")
+    return True
+
+
+class DialogueIndex:
+    """倒排索引查询器 - 字段过滤与关键词检索取交集，按偏移量读取命中的行"""
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        with open(os.path.join(index_dir, "postings.json"), "r", encoding="utf-8") as f:
+            postings = json.load(f)
+
+        if postings.get("version") != INDEX_VERSION:
+            raise ValueError(f"索引版本不匹配: {postings.get('version')}，请重新运行 build")
+
+        self.source = postings["source"]
+        self.count = postings["count"]
+        self.fields = postings["fields"]
+        self.terms = postings["terms"]
+
+        self.offsets = array("Q")
+        with open(os.path.join(index_dir, "offsets.bin"), "rb") as f:
+            self.offsets.frombytes(f.read())
+
+        if os.path.exists(self.source) and os.path.getsize(self.source) != postings["source_size"]:
+            print(f"⚠️  源文件已变化，索引可能过期: {self.source}")
+
+    def match_lines(self, quest_id=None, flow_name: Optional[str] = None,
+                    chapter_title: Optional[str] = None, role: Optional[str] = None,
+                    text: Optional[str] = None) -> List[int]:
+        """返回满足全部条件的行号（升序）"""
+        candidates = []
+        for name, value in (("quest_id", quest_id), ("flow_name", flow_name),
+                            ("chapter_title", chapter_title), ("role", role)):
+            if value is not None:
+                candidates.append(self.fields[name].get(str(value), []))
+
+        if text:
+            query_terms = set(tokenize(text))
+            if not query_terms:
+                return []
+            for term in query_terms:
+                candidates.append(self.terms.get(term, []))
+
+        if not candidates:
+            return list(range(self.count))
+
+        # 从最短的倒排表开始求交集
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for posting in candidates[1:]:
+            if not result:
+                break
+            result.intersection_update(posting)
+        return sorted(result)
+
+    def read_lines(self, line_numbers: List[int]) -> List[Dict]:
+        """按偏移量读取指定行"""
+        records = []
+        with open(self.source, "rb") as f:
+            for line_no in line_numbers:
+                f.seek(self.offsets[line_no])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def query(self, quest_id=None, flow_name: Optional[str] = None,
+              chapter_title: Optional[str] = None, role: Optional[str] = None,
+              text: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """过滤查询，返回对话记录"""
+        lines = self.match_lines(quest_id, flow_name, chapter_title, role, text)
+        phrases = text.lower().split() if text else []
+
+        records = []
+        with open(self.source, "rb") as f:
+            for line_no in lines:
+                if limit is not None and len(records) >= limit:
+                    break
+                f.seek(self.offsets[line_no])
+                record = json.loads(f.readline())
+
+                # 二元组命中不保证原文连续出现，用原文校验一次
+                if phrases:
+                    content = split_role(record.get("text", ""))[1].lower()
+                    if not all(phrase in content for phrase in phrases):
+                        continue
+                records.append(record)
+        return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话倒排索引")
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_parser = subparsers.add_parser("build", help="建立索引")
+    build_parser.add_argument("input", nargs="?", default=DEFAULT_INPUT)
+    build_parser.add_argument("index_dir", nargs="?", default=DEFAULT_INDEX_DIR)
+
+    query_parser = subparsers.add_parser("query", help="查询索引")
+    query_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    query_parser.add_argument("--quest-id")
+    query_parser.add_argument("--flow-name")
+    query_parser.add_argument("--chapter-title")
+    query_parser.add_argument("--role")
+    query_parser.add_argument("--text")
+    query_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_dialogue_index(args.input, args.index_dir)
+    elif args.command == "query":
+        load_start = time.time()
+        index = DialogueIndex(args.index_dir)
+        load_time = time.time() - load_start
+
+        query_start = time.time()
+        records = index.query(args.quest_id, args.flow_name, args.chapter_title,
+                              args.role, args.text, args.limit)
+        query_time = time.time() - query_start
+
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
+        print(f"\n命中 {len(records)} 条 (索引加载 {load_time * 1000:.1f}ms, 查询 {query_time * 1000:.1f}ms)")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+doc_id 注册表 - 跨类型、跨版本检测doc_id冲突，并保证同一实体的doc_id稳定
+
+每条记录: doc_id -> 归属键(owner) + 首次出现的版本
+  owner 是实体的稳定标识（例如 "character_1102/角色故事"），名字变了owner不变，
+  因此同一实体在不同游戏版本中始终拿到第一次分配的doc_id。
+
+存储格式: gzip压缩的TSV (doc_id \t owner \t first_seen)，加载后在内存中是两个哈希表，
+查询、分配、冲突检测都是O(1)，不需要重新读取以前的输出文件。
+
+用法:
+  首次出现的版本来自提取时传入的游戏版本（extract_all.py --game-version 等），没有传入时为空（"未标注"）。
+
+  python doc_id_registry.py report [注册表路径]
+  python doc_id_registry.py check <doc_id> [注册表路径]
+"""
+
+import gzip
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_REGISTRY = "WutheringDialog/data/doc_id_registry.tsv.gz"
+
+
+class DocIdRegistry:
+    """持久化的 doc_id 注册表"""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY, version: str = ""):
+        self.path = path
+        self.version = version
+        self.owner_by_doc_id: Dict[str, str] = {}
+        self.doc_id_by_owner: Dict[str, str] = {}
+        self.first_seen: Dict[str, str] = {}
+        self.collisions: List[Tuple[str, str, str]] = []
+        self.new_count = 0
+        self._dirty = False
+
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) < 2:
+                    continue
+                doc_id, owner = parts[0], parts[1]
+                self.owner_by_doc_id[doc_id] = owner
+                self.doc_id_by_owner[owner] = doc_id
+                self.first_seen[doc_id] = parts[2] if len(parts) > 2 else ""
+
+    def save(self):
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for doc_id, owner in self.owner_by_doc_id.items():
+                f.write(f"{doc_id}\t{owner}\t{self.first_seen.get(doc_id, '')}\n")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.owner_by_doc_id
+
+    def __len__(self) -> int:
+        return len(self.owner_by_doc_id)
+
+    def owner_of(self, doc_id: str) -> Optional[str]:
+        return self.owner_by_doc_id.get(doc_id)
+
+    def lookup(self, owner: str) -> Optional[str]:
+        return self.doc_id_by_owner.get(owner)
+
+    def rename_owner(self, old_owner: str, new_owner: str) -> bool:
+        """把旧归属键登记的doc_id转给新归属键（归属键规则变化时迁移用），成功返回True"""
+        doc_id = self.doc_id_by_owner.get(old_owner)
+        if doc_id is None or new_owner in self.doc_id_by_owner:
+            return False
+        del self.doc_id_by_owner[old_owner]
+        self.doc_id_by_owner[new_owner] = doc_id
+        self.owner_by_doc_id[doc_id] = new_owner
+        self._dirty = True
+        return True
+
+    def assign(self, owner: str, proposed_doc_id: str) -> str:
+        """
+        为owner分配doc_id:
+          1. owner已登记过 -> 返回之前分配的doc_id（跨版本稳定）
+          2. proposed_doc_id 未被占用 -> 登记并返回
+          3. 已被其他owner占用 -> 记录冲突，追加 _2/_3... 后缀
+        """
+        existing = self.doc_id_by_owner.get(owner)
+        if existing is not None:
+            return existing
+
+        doc_id = proposed_doc_id
+        holder = self.owner_by_doc_id.get(doc_id)
+        if holder is not None:
+            self.collisions.append((proposed_doc_id, holder, owner))
+            suffix = 2
+            while f"{proposed_doc_id}_{suffix}" in self.owner_by_doc_id:
+                suffix += 1
+            doc_id = f"{proposed_doc_id}_{suffix}"
+
+        self.owner_by_doc_id[doc_id] = owner
+        self.doc_id_by_owner[owner] = doc_id
+        self.first_seen[doc_id] = self.version
+        self.new_count += 1
+        self._dirty = True
+        return doc_id
+
+    def print_collisions(self, limit: int = 20):
+        if not self.collisions:
+            print("✅ 没有发现doc_id冲突")
+            return
+        print(f"⚠️  发现 {len(self.collisions)} 个doc_id冲突:")
+        for doc_id, holder, owner in self.collisions[:limit]:
+            print(f"  {doc_id}: 已属于 {holder}，{owner} 改用带后缀的doc_id")
+        if len(self.collisions) > limit:
+            print(f"  ... 还有 {len(self.collisions) - limit} 个")
+
+
+def report(path: str = DEFAULT_REGISTRY):
+    """打印注册表概况"""
+    if not os.path.exists(path):
+        print(f"❌ 注册表不存在: {path}")
+        return
+
+    registry = DocIdRegistry(path)
+    print(f"=== doc_id 注册表: {path} ===")
+    print(f"已登记 {len(registry):,} 个doc_id，文件大小 {os.path.getsize(path):,} bytes")
+
+    by_type = {}
+    by_version = {}
+    for doc_id in registry.owner_by_doc_id:
+        doc_type = doc_id.split("_", 1)[0]
+        by_type[doc_type] = by_type.get(doc_type, 0) + 1
+        version = registry.first_seen.get(doc_id) or "未标注"
+        by_version[version] = by_version.get(version, 0) + 1
+
+    print("\n按类型:")
+    for doc_type, count in sorted(by_type.items(), key=lambda x: -x[1]):
+        print(f"  {doc_type}: {count:,}")
+    print("\n按首次出现版本:")
+    for version, count in sorted(by_version.items()):
+        print(f"  {version}: {count:,}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "report":
+        report(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REGISTRY)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "check":
+        registry = DocIdRegistry(sys.argv[3] if len(sys.argv) > 3 else DEFAULT_REGISTRY)
+        owner = registry.owner_of(sys.argv[2])
+        if owner is None:
+            print(f"{sys.argv[2]}: 未登记")
+        else:
+            print(f"{sys.argv[2]}: {owner} (首次出现: {registry.first_seen.get(sys.argv[2]) or '未标注'})")
+    else:
+        print("用法: python doc_id_registry.py [report|check <doc_id>] [注册表路径]")
@@ -4,6 +4,8 @@ import os
 import re
 from collections import defaultdict
 
+from flow_registry import FlowRegistry
+
 def find_playflow_actions(node_data):
     """Recursively finds all PlayFlow actions within a node's actions."""
     playflows = []
@@ -40,6 +42,8 @@ def enrich_dialogues(config_dir, text_map_path, dialog_path, output_path):
             level_play_nodes = json.load(f)
         with open(text_map_path, 'r', encoding='utf-8') as f:
             text_map = json.load(f)
+        # Only PlayFlow targets that exist in Flow.json can match a dialogue title
+        flow_registry = FlowRegistry.load_or_build(config_dir)
     except FileNotFoundError as e:
         print(f"ERROR: Required file not found - {e}")
         return
@@ -73,8 +77,9 @@ def enrich_dialogues(config_dir, text_map_path, dialog_path, output_path):
                 state_id = params.get('StateId')
 
                 if all([flow_list_name, flow_id is not None, state_id is not None]):
-                    dialogue_title = f"{flow_list_name}_{flow_id}_{state_id}"
-                    dialogue_to_subtitle[dialogue_title] = subtitle_text
+                    dialogue_title = flow_registry.state_key(flow_list_name, flow_id, state_id)
+                    if dialogue_title:
+                        dialogue_to_subtitle[dialogue_title] = subtitle_text
     
     print(f"Map built. Found {len(dialogue_to_subtitle)} subtitle-to-dialogue mappings.")
 
@@ -2,13 +2,70 @@ import json
 import os
 from collections import defaultdict
 
+from dependency_index import DEFAULT_INDEX, config_key, record_stage
+from game_data import write_jsonl
+
+KEY_PREFIXES = ("Achievement", "AchievementGroup") # TextMap namespaces used by this extractor
+
 def get_text(text_map, key, default=""):
     """Safely retrieves text from the text map."""
     return text_map.get(key, default)
 
-def extract_achievements_individual(config_dir, text_map_path, output_path):
+def build_achievement_records(achievements, achievement_groups, text_map, deps=None):
+    """
+    Builds one document per achievement from the ConfigDB rows and the text map.
+    If deps is a dict, it receives doc_id -> the ConfigDB rows and text keys each document depends on.
+    """
+    group_name_keys = {group['Id']: group['Name'] for group in achievement_groups}
+    # --- Create a map of Group ID to Group Name ---
+    group_id_to_name = {
+        group['Id']: get_text(text_map, group['Name'])
+        for group in achievement_groups
+    }
+
+    # --- Process each achievement individually ---
+    records = []
+    for ach in achievements:
+        ach_name = get_text(text_map, ach.get('Name'))
+        ach_desc = get_text(text_map, ach.get('Desc'))
+
+        # Filter out invalid or test achievements
+        if not all([ach_name, ach_desc]) or "test" in ach_name.lower() or "dnt" in ach_name.lower():
+            continue
+
+        group_id = ach.get('GroupId')
+        group_name = group_id_to_name.get(group_id, "未知组别")
+
+        # Assemble the document text for the single achievement
+        doc_text = f"成就组: {group_name}\n\n"
+        doc_text += f"成就: {ach_name}\n"
+        doc_text += f"描述: {ach_desc}"
+
+        # Create the JSONL record
+        record = {
+            "doc_id": f"achievement_{ach['Id']}",
+            "text": doc_text.strip(),
+            "metadata": {
+                "source": "Achievement",
+                "type": "成就",
+                "name": ach_name,
+                "group": group_name,
+                "id": ach['Id']
+            }
+        }
+        records.append(record)
+        if deps is not None:
+            text_keys = [ach.get('Name'), ach.get('Desc'), group_name_keys.get(group_id)]
+            deps[record['doc_id']] = [key for key in text_keys if key] + [
+                config_key("Achievement", ach['Id']), config_key("AchievementGroup", group_id)
+            ]
+
+    return records
+
+def extract_achievements_individual(config_dir, text_map_path, output_path, dependency_path=DEFAULT_INDEX):
     """
     Extracts each achievement as a separate document.
+    The keys each document read are recorded as the 'achievements' stage of the dependency index.
     """
     print(f"Starting to extract individual achievements...")
     try:
@@ -22,47 +79,12 @@ def extract_achievements_individual(config_dir, text_map_path, output_path):
         print(f"ERROR: Required file not found - {e}")
         return
 
-    # --- Create a map of Group ID to Group Name ---
-    group_id_to_name = {
-        group['Id']: get_text(text_map, group['Name'])
-        for group in achievement_groups
-    }
-
-    # --- Process and write each achievement individually ---
-    processed_count = 0
-    with open(output_path, 'w', encoding='utf-8') as outfile:
-        for ach in achievements:
-            ach_name = get_text(text_map, ach.get('Name'))
-            ach_desc = get_text(text_map, ach.get('Desc'))
-
-            # Filter out invalid or test achievements
-            if not all([ach_name, ach_desc]) or "test" in ach_name.lower() or "dnt" in ach_name.lower():
-                continue
-
-            group_id = ach.get('GroupId')
-            group_name = group_id_to_name.get(group_id, "未知组别")
-
-            # Assemble the document text for the single achievement
-            doc_text = f"成就组: {group_name}\n\n"
-            doc_text += f"成就: {ach_name}\n"
-            doc_text += f"描述: {ach_desc}"
-
-            # Create the JSONL record
-            record = {
-                "doc_id": f"achievement_{ach['Id']}",
-                "text": doc_text.strip(),
-                "metadata": {
-                    "source": "Achievement",
-                    "type": "成就",
-                    "name": ach_name,
-                    "group": group_name,
-                    "id": ach['Id']
-                }
-            }
-            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
-            processed_count += 1
-
-    print(f"Successfully extracted and wrote {processed_count} individual achievements to {output_path}")
+    deps = {}
+    records = build_achievement_records(achievements, achievement_groups, text_map, deps)
+    write_jsonl(records, output_path)
+    if dependency_path:
+        record_stage("achievements", deps, dependency_path)
+    print(f"Successfully extracted and wrote {len(records)} individual achievements to {output_path}")
 
 if __name__ == "__main__":
     config_directory = "ConfigDB"
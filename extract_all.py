@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+实体提取引擎 - 一次扫描TextMap，同时完成角色/物品/武器/敌人/成就五类提取
+
+原来五个 extract_* 脚本各自完整扫描一遍TextMap。这里只扫描一次：
+  1. 按key的命名空间前缀（RoleInfo_ / ItemInfo_ / WeaponConf_ ...）把每个key分发到对应实体的桶里
+  2. 各实体的文档组装和文本清洗在进程池中并行执行（每个进程只拿到自己的小桶）
+  3. 五个JSONL文件并发写出
+
+单独运行某个 extract_*.py 的行为不变，文档内容与本引擎的输出完全一致。
+
+用法:
+  python extract_all.py [--lang zh-Hans] [--output-dir WutheringDialog/data] [--workers 5] [--source configdb]
+                        [--game-version 2.4]
+
+--source configdb: 物品/武器/敌人改为遍历 ItemInfo / WeaponConf / MonsterInfo 配置表，
+直接按表中的文本key查TextMap，并在metadata中附带品质、武器类型、稀有度等结构化属性。
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import extract_achievements
+import extract_characters
+import extract_enemies
+import extract_items
+import extract_weapons
+from dependency_index import DEFAULT_INDEX, DependencyIndex
+from doc_id_registry import DEFAULT_REGISTRY
+from game_data import CONFIG_DIR, DEFAULT_LANG, TEXT_MAP_DIR, load_config, load_text_map, write_jsonl
+
+# 实体名 -> (负责的TextMap命名空间, 输出文件名)
+ENTITY_SPECS = {
+    "characters": (extract_characters.KEY_PREFIXES, "rag_input.jsonl"),
+    "items": (extract_items.KEY_PREFIXES, "items.jsonl"),
+    "weapons": (extract_weapons.KEY_PREFIXES, "weapons.jsonl"),
+    "enemies": (extract_enemies.KEY_PREFIXES, "enemies.jsonl"),
+    "achievements": (extract_achievements.KEY_PREFIXES, "achievements.jsonl"),
+}
+
+# --source configdb 时: 实体名 -> (配置表, 存放文本key的列, 基于配置表的构建函数)
+CONFIG_SOURCES = {
+    "items": ("ItemInfo", extract_items.TEXT_FIELDS, extract_items.build_item_records_from_config),
+    "weapons": ("WeaponConf", extract_weapons.TEXT_FIELDS, extract_weapons.build_weapon_records_from_config),
+    "enemies": ("MonsterInfo", extract_enemies.TEXT_FIELDS, extract_enemies.build_enemy_records_from_config),
+}
+# 需要和其他表关联筛选行的实体（MonsterInfo 没有显示开关，按 MonsterHandBook 筛选）；其余直接 load_config
+CONFIG_LOADERS = {
+    "enemies": extract_enemies.load_monster_rows,
+}
+
+
+def route_text_map(text_map: dict, entities) -> dict:
+    """单次扫描，按命名空间前缀把key分发到各实体的桶"""
+    prefix_to_entity = {}
+    for entity in entities:
+        for prefix in ENTITY_SPECS[entity][0]:
+            prefix_to_entity[prefix] = entity
+
+    buckets = {entity: {} for entity in entities}
+    for key, value in text_map.items():
+        entity = prefix_to_entity.get(key.split("_", 1)[0])
+        if entity is not None:
+            buckets[entity][key] = value
+    return buckets
+
+
+def route_config_keys(text_map: dict, bucket: dict, rows, text_fields) -> int:
+    """
+    配置表的文本列不一定指向本实体的命名空间（物品名可能是 EpithetName_ / MonsterInfo_ / RoleSkin_ 的key，
+    描述可能是 EpithetDesc_ / PhantomItem_ 的key），按前缀分桶会漏掉它们，这里把行里引用的key逐个补进桶
+    """
+    added = 0
+    for row in rows:
+        for field in text_fields:
+            key = row.get(field)
+            if key and key not in bucket and key in text_map:
+                bucket[key] = text_map[key]
+                added += 1
+    return added
+
+
+def build_with_deps(builder, *args):
+    """在子进程中运行构建函数，同时收集每个文档依赖的key（参见 dependency_index.py）"""
+    deps = {}
+    records = builder(*args, deps=deps)
+    return records, deps
+
+
+def write_entity(entity: str, records, output_path: str, registry_path, version: str = "",
+                 config_dir: str = CONFIG_DIR):
+    """返回 (写出条数, 写出的doc_id -> 来源记录的doc_id)；只有角色会多出性别变体，其余实体为 None"""
+    if entity == "characters":
+        written = extract_characters.write_character_records(records, output_path, registry_path, version, config_dir)
+        return len(written), written
+    return write_jsonl(records, output_path), None
+
+
+def extract_all(lang: str = DEFAULT_LANG, text_map_dir: str = TEXT_MAP_DIR, config_dir: str = CONFIG_DIR,
+                output_dir: str = "WutheringDialog/data", entities=None, workers: int = None,
+                registry_path=DEFAULT_REGISTRY, source: str = "textmap", dependency_path=DEFAULT_INDEX,
+                game_version: str = ""):
+    print("=== 实体提取引擎 ===")
+    entities = list(entities or ENTITY_SPECS)
+    start = time.time()
+
+    try:
+        text_map = load_text_map(lang, text_map_dir)
+    except FileNotFoundError as e:
+        print(f"❌ TextMap不存在: {e}")
+        return False
+    print(f"已加载 {len(text_map):,} 条TextMap记录 ({time.time() - start:.2f}s)")
+
+    # --- 1. 单次扫描分发 ---
+    route_start = time.time()
+    buckets = route_text_map(text_map, entities)
+    config_rows = {}
+    if source == "configdb":
+        for entity in entities:
+            if entity not in CONFIG_SOURCES:
+                continue
+            table, text_fields, _ = CONFIG_SOURCES[entity]
+            try:
+                loader = CONFIG_LOADERS.get(entity)
+                config_rows[entity] = loader(config_dir) if loader else load_config(table, config_dir)
+            except FileNotFoundError as e:
+                print(f"⚠️  跳过{entity}提取，缺少配置文件: {e}")
+                continue
+            added = route_config_keys(text_map, buckets[entity], config_rows[entity], text_fields)
+            print(f"  {entity}: 从 {table} 补充 {added:,} 个其他命名空间的key")
+    del text_map
+    print(f"分发完成 ({time.time() - route_start:.2f}s):")
+    for entity in entities:
+        print(f"  {entity}: {len(buckets[entity]):,} 个key")
+
+    # --- 2. 并行组装文档 ---
+    build_start = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers or len(entities)) as pool:
+        futures = {}
+        for entity in entities:
+            bucket = buckets[entity]
+            if entity == "characters":
+                try:
+                    role_ids, favor_owners = extract_characters.load_role_config(config_dir)
+                except FileNotFoundError as e:
+                    print(f"⚠️  跳过角色提取，缺少配置文件: {e}")
+                    continue
+                futures[entity] = pool.submit(build_with_deps, extract_characters.build_character_records,
+                                              bucket, role_ids, favor_owners)
+            elif entity in CONFIG_SOURCES and source == "configdb":
+                if entity in config_rows:
+                    builder = CONFIG_SOURCES[entity][2]
+                    futures[entity] = pool.submit(build_with_deps, builder, config_rows[entity], bucket)
+            elif entity == "items":
+                futures[entity] = pool.submit(build_with_deps, extract_items.build_item_records, bucket)
+            elif entity == "weapons":
+                futures[entity] = pool.submit(build_with_deps, extract_weapons.build_weapon_records, bucket)
+            elif entity == "enemies":
+                futures[entity] = pool.submit(build_with_deps, extract_enemies.build_enemy_records, bucket)
+            elif entity == "achievements":
+                try:
+                    achievements = load_config("Achievement", config_dir)
+                    achievement_groups = load_config("AchievementGroup", config_dir)
+                except FileNotFoundError as e:
+                    print(f"⚠️  跳过成就提取，缺少配置文件: {e}")
+                    continue
+                futures[entity] = pool.submit(build_with_deps, extract_achievements.build_achievement_records,
+                                              achievements, achievement_groups, bucket)
+        dependencies = {}
+        for entity, future in futures.items():
+            results[entity], dependencies[entity] = future.result()
+    print(f"文档组装完成 ({time.time() - build_start:.2f}s)")
+
+    # --- 3. 并发写出 ---
+    write_start = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    original_ids = {entity: [record['doc_id'] for record in records] for entity, records in results.items()}
+    with ThreadPoolExecutor(max_workers=len(results) or 1) as pool:
+        futures = {
+            entity: pool.submit(write_entity, entity, records,
+                                os.path.join(output_dir, ENTITY_SPECS[entity][1]), registry_path, game_version,
+                                config_dir)
+            for entity, records in results.items()
+        }
+        written_ids = {}
+        for entity, future in futures.items():
+            count, written_ids[entity] = future.result()
+            print(f"✅ {entity}: {count:,} 条 -> {os.path.join(output_dir, ENTITY_SPECS[entity][1])}")
+    print(f"写出完成 ({time.time() - write_start:.2f}s)")
+
+    # --- 4. 更新反向依赖索引 ---
+    if dependency_path:
+        index = DependencyIndex(dependency_path)
+        for entity, records in results.items():
+            # 依赖按构建时的doc_id记录，写出时注册表可能换成了稳定的doc_id
+            stage = {
+                record['doc_id']: dependencies[entity].get(original_id, [])
+                for original_id, record in zip(original_ids[entity], records)
+            }
+            if written_ids.get(entity):
+                # 性别变体与来源记录依赖相同的key
+                stage = {doc_id: stage[base_id] for doc_id, base_id in written_ids[entity].items()}
+            index.update_stage(entity, stage)
+        index.save()
+        print(f"依赖索引已更新: {dependency_path}")
+
+    print(f"总耗时: {time.time() - start:.2f}s")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一次扫描提取全部实体")
+    parser.add_argument("--lang", default=DEFAULT_LANG)
+    parser.add_argument("--text-map-dir", default=TEXT_MAP_DIR)
+    parser.add_argument("--config-dir", default=CONFIG_DIR)
+    parser.add_argument("--output-dir", default="WutheringDialog/data")
+    parser.add_argument("--only", nargs="+", choices=list(ENTITY_SPECS), help="只提取指定实体")
+    parser.add_argument("--workers", type=int, help="进程池大小，默认每类实体一个进程")
+    parser.add_argument("--source", choices=["textmap", "configdb"], default="textmap",
+                        help="物品/武器/敌人的实体来源: 扫描TextMap，或遍历ConfigDB配置表")
+    parser.add_argument("--game-version", default="", help="游戏版本，记为新doc_id的首次出现版本（doc_id_registry.py）")
+    args = parser.parse_args()
+
+    extract_all(args.lang, args.text_map_dir, args.config_dir, args.output_dir, args.only, args.workers,
+                source=args.source, game_version=args.game_version)
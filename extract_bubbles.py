@@ -0,0 +1,151 @@
+import json
+from collections import defaultdict
+
+from flow_registry import FlowRegistry
+from game_data import CONFIG_DIR, load_config, write_jsonl
+from split_dialogue import first_dialog_block
+
+class BubbleIndex:
+    """
+    NPC bubbles (冒泡) from ConfigDB/BubbleData.json. Params are JSON strings; each row is decoded once
+    and indexed by ActionId, by EntityId and by the StateKey of the flow the bubble plays.
+    """
+
+    def __init__(self):
+        self.bubbles = []                  # one dict per AddPlayBubble action
+        self.by_action = {}                # ActionId -> bubble
+        self.by_entity = defaultdict(list) # EntityId -> bubbles shown above that entity
+        self.by_state = defaultdict(list)  # StateKey -> bubbles playing that flow state
+        self.clears = defaultdict(list)    # EntityId -> ClearPlayBubble ActionIds
+        self.unknown_flows = 0
+
+    @classmethod
+    def from_config(cls, rows, flow_registry=None):
+        index = cls()
+        for row in rows:
+            try:
+                params = json.loads(row.get("Params") or "{}")
+            except json.JSONDecodeError:
+                continue
+            entity_ids = params.get("EntityIds") or []
+
+            if row.get("Name") == "ClearPlayBubble":
+                for entity_id in entity_ids:
+                    index.clears[entity_id].append(row.get("ActionId"))
+                continue
+
+            flow = params.get("Flow") or {}
+            if row.get("Name") != "AddPlayBubble" or not flow.get("FlowListName"):
+                continue
+            flow_args = (flow["FlowListName"], flow.get("FlowId"), flow.get("StateId"))
+            if flow_registry is not None:
+                state_key = flow_registry.state_key(*flow_args)
+                if state_key is None:
+                    index.unknown_flows += 1
+                    continue
+            else:
+                state_key = "{}_{}_{}".format(*flow_args)
+
+            bubble = {
+                "action_id": row.get("ActionId"),
+                "entity_ids": entity_ids,
+                "state_key": state_key,
+                "enter_radius": params.get("EnterRadius"),
+                "leave_radius": params.get("LeaveRadius"),
+                "wait_time": params.get("WaitTime"),
+            }
+            index.bubbles.append(bubble)
+            index.by_action[bubble["action_id"]] = bubble
+            index.by_state[state_key].append(bubble)
+            for entity_id in entity_ids:
+                index.by_entity[entity_id].append(bubble)
+        return index
+
+    @classmethod
+    def from_config_dir(cls, config_dir=CONFIG_DIR):
+        try:
+            flow_registry = FlowRegistry.load_or_build(config_dir)
+        except FileNotFoundError:
+            flow_registry = None
+        return cls.from_config(load_config("BubbleData", config_dir), flow_registry)
+
+def load_state_talks(state_keys, config_dir=CONFIG_DIR, first_block=False):
+    """
+    One pass over FlowState, keeping only the talk items of the given StateKeys.
+    Returns {StateKey: [(WhoId or None, TidTalk), ...]} with the lines of all actions.
+    With first_block, lines are taken and numbered exactly as split_dialogue.py does (first_dialog_block,
+    options included as (None, None)), so a bubble line gets the doc_id of the dialogue line it duplicates.
+    """
+    talks = {}
+    for flow_state in load_config("FlowState", config_dir):
+        state_key = flow_state.get("StateKey")
+        if state_key not in state_keys:
+            continue
+        try:
+            actions = json.loads(flow_state.get("Actions") or "[]")
+        except json.JSONDecodeError:
+            continue
+        blocks = []
+        for action in actions:
+            items = []
+            for talk in (action.get("Params") or {}).get("TalkItems") or []:
+                if "TidTalk" in talk:
+                    items.append((talk.get("WhoId"), talk["TidTalk"]))
+                elif "Options" in talk and first_block:
+                    items.append((None, None))
+            blocks.append({"dialogs": items})
+        talks[state_key] = first_dialog_block(blocks) if first_block else [item for block in blocks for item in block["dialogs"]]
+    return talks
+
+def iter_bubble_records(index, talks, text_map):
+    """
+    Yields split-format dialogue records ({"doc_id": "dialogue_<StateKey>_<n>", "text": "<speaker>: <line>"}),
+    the same shape split_dialogue.py produces, with the bubble's ActionId and EntityIds attached.
+    Option lines keep their number but are not emitted.
+    """
+    for state_key, bubbles in index.by_state.items():
+        entity_ids = sorted({entity_id for bubble in bubbles for entity_id in bubble["entity_ids"]})
+        action_ids = [bubble["action_id"] for bubble in bubbles]
+        for i, (who_id, text_key) in enumerate(talks.get(state_key, [])):
+            content = text_map.get(text_key) if text_key else None
+            if not content:
+                continue
+            speaker = text_map.get(f"Speaker_{who_id}_Name", "") if who_id is not None else ""
+            yield {
+                "doc_id": f"dialogue_{state_key}_{i}",
+                "text": f"{speaker}: {content}",
+                "state_key": state_key,
+                "text_keys": [text_key],
+                "bubble": {"action_ids": action_ids, "entity_ids": entity_ids},
+            }
+
+def load_bubble_records(config_dir, text_map_path):
+    """All bubble lines as split-format records, or None if a required file is missing."""
+    index = BubbleIndex.from_config_dir(config_dir)
+    print(f"Indexed {len(index.bubbles)} bubbles on {len(index.by_entity)} entities "
+          f"({len(index.by_state)} flow states, {index.unknown_flows} unknown flows).")
+    try:
+        talks = load_state_talks(set(index.by_state), config_dir, first_block=True)
+        with open(text_map_path, 'r', encoding='utf-8') as f:
+            text_map = json.load(f)
+    except FileNotFoundError as e:
+        print(f"ERROR: Required file not found - {e}")
+        return None
+    return list(iter_bubble_records(index, talks, text_map))
+
+def extract_bubbles(config_dir, text_map_path, output_path):
+    """
+    Writes all bubble lines to output_path. To feed them to the dialogue processor, run
+    split_dialogue.py --bubbles, which merges the lines missing from the split dialogue file.
+    """
+    records = load_bubble_records(config_dir, text_map_path)
+    if records is None:
+        return
+    count = write_jsonl(records, output_path)
+    print(f"Extracted {count} bubble lines to {output_path}")
+
+if __name__ == "__main__":
+    config_directory = "ConfigDB"
+    text_map_file = "TextMap/zh-Hans/MultiText.json"
+    output_file = "WutheringDialog/data/bubbles_zh-Hans.jsonl"
+    extract_bubbles(config_directory, text_map_file, output_file)
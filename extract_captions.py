@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+过场动画字幕提取 - VideoCaption / VideoData / QuestRefVideoConfig
+
+关联方式（全部是预先建好的字典查询）:
+  VideoCaption.CgName          -> 同一段过场动画的所有字幕，按 ShowMoment 排序
+                                  （en / ja / ko 有单独的 ShowMomentEn 等时间轴，整段动画的每一行都非0时才使用，
+                                   不混用两条时间轴）
+  VideoData.CgName             -> CgId 和男/女主版本（GirlOrBoy: 1男 0女）
+  QuestRefVideoConfig.PakName  -> "<CgId>_<0女|1男|2通用>"，由此得到播放该动画的任务
+  CaptionText                  -> TextMap 文本key；{TA} 等性别占位符用 gender_text.py 展开
+
+每种语言输出一个文件，每段过场动画一个文档（doc_id: video_<CgName>），字幕按时间顺序排列:
+  WutheringDialog/data/captions_<lang>.jsonl
+
+文档带 doc_id + text，可以直接交给 rag_diff.py 按内容哈希比对（--diff）；
+每个文档读取的key记录在依赖索引的 captions_<lang> 阶段（dependency_index.py）。
+
+用法:
+  python extract_captions.py [--langs zh-Hans en ja] [--diff]
+"""
+
+import argparse
+import os
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+from dependency_index import config_key, record_stage
+from game_data import CONFIG_DIR, DEFAULT_LANG, TEXT_MAP_DIR, load_config, load_text_map, write_jsonl
+from gender_text import get_expander
+from quest_hierarchy import QuestHierarchy
+from rich_text import clean_text
+
+DEFAULT_OUTPUT_DIR = "WutheringDialog/data"
+# 有独立时间轴的语言 -> VideoCaption 的列后缀
+TIMELINE_SUFFIXES = {"en": "En", "ja": "Ja", "ko": "Ko"}
+GENDER_LABELS = {0: "female", 1: "male", 2: "both"}
+
+
+class CaptionIndex:
+    """三张视频表按 CgName / CgId 建好的索引，与语言无关，所有语言共用一份"""
+
+    def __init__(self, config_dir: str = CONFIG_DIR):
+        self.config_dir = config_dir
+        self.captions: Dict[str, List[dict]] = defaultdict(list)
+        for row in load_config("VideoCaption", config_dir):
+            if row.get("CgName") and row.get("CaptionText"):
+                self.captions[row["CgName"]].append(row)
+
+        self.videos: Dict[str, List[dict]] = defaultdict(list)
+        cg_names = {}
+        for row in load_config("VideoData", config_dir):
+            self.videos[row["CgName"]].append(row)
+            cg_names[row["CgId"]] = row["CgName"]
+
+        self.quests: Dict[str, List[int]] = defaultdict(list)
+        self.quest_refs: Dict[str, List[int]] = defaultdict(list)
+        try:
+            quest_refs = load_config("QuestRefVideoConfig", config_dir)
+        except FileNotFoundError:
+            quest_refs = []
+        for row in quest_refs:
+            cg_id = str(row.get("PakName", "")).split("_")[0]
+            cg_name = cg_names.get(int(cg_id)) if cg_id.isdigit() else None
+            if cg_name is None:
+                continue
+            if row["QuestId"] not in self.quests[cg_name]:
+                self.quests[cg_name].append(row["QuestId"])
+            self.quest_refs[cg_name].append(row["Id"])
+
+    def ordered_captions(self, cg_name: str, lang: str) -> List[dict]:
+        rows = self.captions[cg_name]
+        suffix = TIMELINE_SUFFIXES.get(lang)
+        if not suffix or not all(row.get(f"ShowMoment{suffix}") for row in rows):
+            suffix = ""
+
+        def moment(row):
+            return row.get(f"ShowMoment{suffix}", 0), row.get(f"Duration{suffix}", 0)
+
+        return sorted(({**row, "_moment": moment(row)} for row in rows),
+                      key=lambda row: (row["_moment"][0], row["CaptionId"]))
+
+
+def iter_caption_documents(index: CaptionIndex, text_map: dict, lang: str,
+                           hierarchy: Optional[QuestHierarchy] = None, deps: Optional[dict] = None) -> Iterator[dict]:
+    """逐段过场动画产出文档；deps 为dict时写入 doc_id -> 依赖key"""
+    try:
+        expander = get_expander(index.config_dir)
+    except FileNotFoundError:
+        expander = None
+        print("⚠️  找不到 GenderText.json，性别占位符保持原样")
+    for cg_name in sorted(index.captions):
+        doc_id = f"video_{cg_name}"
+        keys = set()
+        lines = []
+        for row in index.ordered_captions(cg_name, lang):
+            text = text_map.get(row["CaptionText"])
+            keys.add(row["CaptionText"])
+            keys.add(config_key("VideoCaption", row["CaptionId"]))
+            if not text or "存在异常" in text:
+                continue
+            start, duration = row["_moment"]
+            text = clean_text(text)
+            lines.append({"start": start, "duration": duration,
+                          "text": expander.render(text, "both") if expander else text})
+        if not lines:
+            continue
+
+        quest_names = []
+        for quest_id in index.quests.get(cg_name, []):
+            keys.add(config_key("QuestData", quest_id))
+            quest = hierarchy.quest(quest_id) if hierarchy else None
+            if quest and text_map.get(quest["name"] or ""):
+                keys.add(quest["name"])
+                quest_names.append(text_map[quest["name"]])
+        keys.update(config_key("VideoData", video["CgId"]) for video in index.videos.get(cg_name, []))
+        keys.update(config_key("QuestRefVideoConfig", ref_id) for ref_id in index.quest_refs.get(cg_name, []))
+
+        doc_text = f"过场动画: {cg_name}\n"
+        if quest_names:
+            doc_text += f"相关任务: {'、'.join(quest_names)}\n"
+        doc_text += "\n-----字幕-----\n" + "\n".join(line["text"] for line in lines)
+
+        if isinstance(deps, dict):
+            deps[doc_id] = sorted(keys)
+        yield {
+            "doc_id": doc_id,
+            "text": doc_text,
+            "metadata": {
+                "type": "cutscene",
+                "lang": lang,
+                "cg_name": cg_name,
+                "quest_ids": index.quests.get(cg_name, []),
+                "videos": [{"cg_id": v["CgId"], "gender": GENDER_LABELS.get(v.get("GirlOrBoy"), "both")}
+                           for v in index.videos.get(cg_name, [])],
+                "captions": lines,
+            },
+        }
+
+
+def extract_captions(langs: Optional[List[str]] = None, config_dir: str = CONFIG_DIR,
+                     text_map_dir: str = TEXT_MAP_DIR, output_dir: str = DEFAULT_OUTPUT_DIR,
+                     diff: bool = False) -> Dict[str, int]:
+    print("=== 过场动画字幕提取 ===")
+    index = CaptionIndex(config_dir)
+    print(f"过场动画: {len(index.captions)}，字幕: {sum(len(c) for c in index.captions.values())}，"
+          f"关联任务的动画: {len(index.quests)}")
+    try:
+        hierarchy = QuestHierarchy.load_or_build(config_dir=config_dir)
+    except FileNotFoundError:
+        hierarchy = None
+
+    counts = {}
+    os.makedirs(output_dir, exist_ok=True)
+    for lang in langs or [DEFAULT_LANG]:
+        try:
+            text_map = load_text_map(lang, text_map_dir)
+        except FileNotFoundError as e:
+            print(f"⚠️  {lang}: 找不到TextMap，跳过 ({e})")
+            continue
+        output_path = os.path.join(output_dir, f"captions_{lang}.jsonl")
+        deps = {}
+        counts[lang] = write_jsonl(iter_caption_documents(index, text_map, lang, hierarchy, deps), output_path)
+        print(f"✅ {lang}: {counts[lang]} 个文档 -> {output_path}")
+        record_stage(f"captions_{lang}", deps)
+
+        if diff:
+            # 与对话流水线相同的内容哈希比对
+            from rag_diff import diff_rag_split
+            published = os.path.join(output_dir, f"captions_{lang}.published.jsonl")
+            diff_rag_split(output_path, published, os.path.join(output_dir, "rag_changes", f"captions_{lang}"))
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取过场动画字幕")
+    parser.add_argument("--langs", nargs="+", default=[DEFAULT_LANG])
+    parser.add_argument("--config-dir", default=CONFIG_DIR)
+    parser.add_argument("--text-map-dir", default=TEXT_MAP_DIR)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--diff", action="store_true", help="与 captions_<lang>.published.jsonl 比对（rag_diff.py）")
+    args = parser.parse_args()
+
+    extract_captions(args.langs, args.config_dir, args.text_map_dir, args.output_dir, args.diff)
@@ -1,35 +1,81 @@
 import json
 import os
-import re
+import sys
 from collections import defaultdict
 
+from doc_id_registry import DocIdRegistry, DEFAULT_REGISTRY
+from dependency_index import DEFAULT_INDEX, config_key, record_stage
+from game_data import CONFIG_DIR, load_config
+from gender_text import get_expander
+from rich_text import clean_text
+
 MIN_TEXT_LENGTH = 200 # Minimum character count for a valid character document
+KEY_PREFIXES = ("RoleInfo", "FavorRoleInfo", "FavorStory", "FavorWord") # TextMap namespaces used by this extractor
 
-def clean_text(text):
-    """Removes simple HTML-like tags from the text."""
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r'<te[^>]*>', '', text)
-    text = re.sub(r'</te>', '', text)
-    text = re.sub(r'<ano=[^>]*>', '', text)
-    text = re.sub(r'</ano>', '', text)
-    text = text.replace("<br>", "\n")
-    return text.strip()
-
-def process_characters_from_textmap(text_map_path, output_path):
+def load_role_config(config_dir=CONFIG_DIR):
     """
-    Extracts, cleans, and unifies character info, then de-duplicates and filters by length.
+    Reads the character ids from RoleInfo.json and the owning role of every FavorStory/FavorWord
+    text id from FavorStory.json / FavorWord.json (text ids do not always start with the role id).
     """
-    try:
-        with open(text_map_path, 'r', encoding='utf-8') as f:
-            text_map = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Text map file not found at {text_map_path}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {text_map_path}")
-        return
+    role_ids = {str(role['Id']) for role in load_config("RoleInfo", config_dir)}
+    favor_owners = {}
+    for table in ("FavorStory", "FavorWord"):
+        for row in load_config(table, config_dir):
+            for column in ("Title", "Content"):
+                parts = (row.get(column) or "").split('_')
+                if len(parts) >= 3:
+                    favor_owners[f"{parts[0]}_{parts[1]}"] = str(row['RoleId'])
+    return role_ids, favor_owners
+
+def group_character_keys(text_map, role_ids, favor_owners):
+    """
+    Single pass over the text map that buckets every character key straight into
+    {role_id: {"RoleInfo": {field: text}, "FavorRoleInfo": {field: text},
+               "FavorStory": {story_id: {field: text}}, "FavorWord": {word_id: {field: text}}}}.
+    """
+    characters = {}
+    for key, value in text_map.items():
+        parts = key.split('_', 2)
+        if len(parts) != 3 or parts[0] not in KEY_PREFIXES:
+            continue
+        namespace, entry_id, field = parts
+
+        if namespace in ("RoleInfo", "FavorRoleInfo"):
+            role_id = entry_id if entry_id in role_ids else None
+        else:
+            role_id = favor_owners.get(f"{namespace}_{entry_id}")
+            if role_id is None and entry_id[:-2] in role_ids:
+                role_id = entry_id[:-2]
+        if role_id is None:
+            continue
+
+        data = characters.get(role_id)
+        if data is None:
+            data = characters[role_id] = {
+                "RoleInfo": {}, "FavorRoleInfo": {},
+                "FavorStory": defaultdict(dict), "FavorWord": defaultdict(dict),
+                "keys": []
+            }
+        if namespace in ("FavorStory", "FavorWord"):
+            data[namespace][entry_id][field] = value
+        else:
+            data[namespace][field] = value
+        data["keys"].append(key)
+    return characters
+
+def character_dependencies(role_id, data):
+    """
+    Keys a character document was built from, for dependency_index.py.
+    The RoleInfo/FavorRoleInfo wildcards also cover fields added in later versions.
+    """
+    return data["keys"] + [f"RoleInfo_{role_id}_*", f"FavorRoleInfo_{role_id}_*", config_key("RoleInfo", role_id)]
 
+def build_character_records(text_map, role_ids, favor_owners, deps=None):
+    """
+    Groups the character keys of a text map, assembles one document per character,
+    then de-duplicates by unified name and filters by length.
+    If deps is a dict, it receives doc_id -> the keys each kept document depends on.
+    """
     rover_gender_map = {
         "1406": "男", "1408": "女", # 气动
         "1501": "男", "1502": "女", # 衍射
@@ -41,24 +87,16 @@ def process_characters_from_textmap(text_map_path, output_path):
         "游弋蝶", "遁地鼠", "无冠者", "岁光"
     }
 
-    characters_data = defaultdict(dict)
-    key_regex = re.compile(r"^(RoleInfo|FavorRoleInfo|FavorStory|FavorWord)_(\d+)_(\w+)")
-    for key, value in text_map.items():
-        match = key_regex.match(key)
-        if match:
-            full_id_str = match.group(2)
-            if len(full_id_str) >= 4:
-                char_id = full_id_str[:4]
-                characters_data[char_id][key] = value
+    characters_data = group_character_keys(text_map, role_ids, favor_owners)
 
     # --- Step 1: Process all potential characters into a temporary list ---
     processed_records = defaultdict(list)
     for char_id, data in characters_data.items():
-        name = data.get(f"RoleInfo_{char_id}_Name")
+        name = data["RoleInfo"].get("Name")
         if not name or name in blacklist_names:
             continue
         
-        title = data.get(f"RoleInfo_{char_id}_NickName", "")
+        title = data["RoleInfo"].get("NickName", "")
         if "声骸角色" in title:
             continue
 
@@ -74,17 +112,11 @@ def process_characters_from_textmap(text_map_path, output_path):
         if title and "存在异常" not in title:
             doc_text += f"称号: {title}\n"
 
-        bio = data.get(f"FavorRoleInfo_{char_id}_Info")
+        bio = data["FavorRoleInfo"].get("Info")
         if bio:
             doc_text += "\n-----角色资料-----" + clean_text(bio) + "\n"
 
-        stories = defaultdict(dict)
-        story_regex = re.compile(r"FavorStory_(\d+)_(\w+)")
-        for key, value in data.items():
-            match = story_regex.match(key)
-            if match and key.startswith(f"FavorStory_{char_id}"):
-                stories[match.group(1)][match.group(2)] = value
-        
+        stories = data["FavorStory"]
         if stories:
             doc_text += "\n-----角色故事-----"
             for story_id in sorted(stories.keys()):
@@ -93,13 +125,7 @@ def process_characters_from_textmap(text_map_path, output_path):
                 if story_title and story_content:
                     doc_text += f"\n标题: {clean_text(story_title)}\n{clean_text(story_content)}\n"
 
-        words = defaultdict(dict)
-        word_regex = re.compile(r"FavorWord_(\d+)_(\w+)")
-        for key, value in data.items():
-            match = word_regex.match(key)
-            if match and key.startswith(f"FavorWord_{char_id}"):
-                words[match.group(1)][match.group(2)] = value
-
+        words = data["FavorWord"]
         if words:
             doc_text += "\n-----心声-----"
             for word_id in sorted(words.keys()):
@@ -126,16 +152,82 @@ def process_characters_from_textmap(text_map_path, output_path):
         # Apply the minimum length threshold
         if len(best_record['text']) >= MIN_TEXT_LENGTH:
             final_records.append(best_record)
+            if deps is not None:
+                # Every candidate with the same name can change which one wins the de-duplication
+                deps[best_record['doc_id']] = [
+                    key for r in records
+                    for key in character_dependencies(str(r['metadata']['id']), characters_data[str(r['metadata']['id'])])
+                ]
         else:
             print(f"INFO: Discarding character '{name}' due to short text length ({len(best_record['text'])} chars).")
-    # --- Step 3: Write final, clean records to file ---
+    return sorted(final_records, key=lambda r: r['metadata']['id'])
+
+def write_character_records(records, output_path, registry_path=None, version="", config_dir=CONFIG_DIR):
+    """
+    Writes the final character records.
+    With a registry, each character is owned by its RoleInfo id, so it keeps the doc_id it was
+    first given even if it is renamed; version is recorded as the first-seen game version.
+    Stories and voice lines with Rover gender placeholders ({TA}, {哥哥} ...) also get male/female
+    variant records (gender_text.py), written after the registry has fixed the base doc_id.
+    Returns written doc_id -> the doc_id of the record it was built from.
+    """
+    registry = DocIdRegistry(registry_path, version) if registry_path else None
+    try:
+        expander = get_expander(config_dir)
+    except FileNotFoundError:
+        expander = None
+        print("WARNING: ConfigDB/GenderText.json not found, gender placeholders are left as-is.")
+
+    written = {}
     with open(output_path, 'w', encoding='utf-8') as outfile:
-        for record in sorted(final_records, key=lambda r: r['metadata']['id']):
-            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
+        for record in records:
+            if registry is not None:
+                owner = f"character:{record['metadata']['id']}"
+                # Registries written before owners were keyed by id used the display name
+                registry.rename_owner(f"character:{record['metadata']['name']}", owner)
+                record['doc_id'] = registry.assign(owner, record['doc_id'])
+            for output_record in (expander.expand_records([record]) if expander else [record]):
+                outfile.write(json.dumps(output_record, ensure_ascii=False) + '\n')
+                written[output_record['doc_id']] = record['doc_id']
+
+    print(f"Successfully de-duplicated, filtered, and wrote {len(records)} characters to {output_path}")
+    if len(written) > len(records):
+        print(f"Added {len(written) - len(records)} gender variant records.")
+
+    if registry is not None:
+        registry.print_collisions()
+        registry.save()
+    return written
+
+def process_characters_from_textmap(text_map_path, output_path, registry_path=None, config_dir=CONFIG_DIR, version="",
+                                    dependency_path=DEFAULT_INDEX):
+    """
+    Extracts, cleans, and unifies character info, then de-duplicates and filters by length.
+    The keys each document read are recorded as the 'characters' stage of the dependency index.
+    """
+    try:
+        with open(text_map_path, 'r', encoding='utf-8') as f:
+            text_map = json.load(f)
+        role_ids, favor_owners = load_role_config(config_dir)
+    except FileNotFoundError as e:
+        print(f"Error: Required file not found - {e}")
+        return
+    except json.JSONDecodeError:
+        print(f"Error: Could not decode JSON from {text_map_path}")
+        return
 
-    print(f"Successfully de-duplicated, filtered, and wrote {len(final_records)} characters to {output_path}")
+    deps = {}
+    records = build_character_records(text_map, role_ids, favor_owners, deps)
+    original_ids = [record['doc_id'] for record in records]
+    written = write_character_records(records, output_path, registry_path, version, config_dir)
+    if dependency_path:
+        # The registry may have replaced the built doc_ids with stable ones; gender variants share their base's keys
+        base_deps = {record['doc_id']: deps.get(original_id, []) for original_id, record in zip(original_ids, records)}
+        record_stage("characters", {doc_id: base_deps[base_id] for doc_id, base_id in written.items()}, dependency_path)
 
 if __name__ == "__main__":
     text_map_file = "TextMap/zh-Hans/MultiText.json"
     output_file = "WutheringDialog/data/rag_input.jsonl"
-    process_characters_from_textmap(text_map_file, output_file)
+    # Optional argument: the game version recorded as first_seen for newly registered doc_ids
+    game_version = sys.argv[1] if len(sys.argv) > 1 else ""
+    process_characters_from_textmap(text_map_file, output_file, DEFAULT_REGISTRY, version=game_version)
@@ -1,28 +1,59 @@
 
+import argparse
 import json
 import re
 from collections import defaultdict
 
-def clean_text(text):
-    """Removes simple HTML-like tags from the text."""
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r'<[^>]+>', '', text)
-    text = text.replace("<br>", "\n")
-    return text.strip()
+from dependency_index import DEFAULT_INDEX, config_key, record_stage
+from game_data import CONFIG_DIR, load_config, write_jsonl
+from rich_text import clean_text
 
-def extract_enemies(text_map_path, output_path):
+KEY_PREFIXES = ("MonsterInfo",) # TextMap namespaces used by this extractor
+TEXT_FIELDS = ("Name", "UndiscoveredDes", "DiscoveredDes") # MonsterInfo columns holding text keys
+
+def assemble_enemy_record(enemy_id, data, attributes=None):
     """
-    Extracts enemy data from the master text map based on the 'MonsterInfo_' prefix.
+    Assembles one enemy document from its resolved text fields. Returns None for entries with only a name.
     """
-    print(f"Starting to extract enemy data from {text_map_path}...")
-    try:
-        with open(text_map_path, 'r', encoding='utf-8') as f:
-            text_map = json.load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Input file not found at {text_map_path}")
-        return
+    name = data.get("Name")
+    if not name:
+        return None
+
+    # Assemble the document text
+    doc_text = f"敌人名称: {name}\n"
+
+    # Undiscovered Description
+    undisc_desc = data.get("UndiscoveredDes")
+    if undisc_desc:
+        doc_text += f"\n-----基本描述-----\n{clean_text(undisc_desc)}\n"
 
+    # Discovered Description (main info)
+    disc_desc = data.get("DiscoveredDes")
+    if disc_desc:
+        doc_text += f"\n-----详细信息-----\n{clean_text(disc_desc)}\n"
+
+    # Skip entries with only a name
+    if len(doc_text) < (len(name) + 20):
+        return None
+
+    # Create the JSONL record
+    return {
+        "doc_id": f"enemy_{enemy_id}",
+        "text": doc_text.strip(),
+        "metadata": {
+            "source": "Enemy",
+            "type": "敌人",
+            "name": name,
+            "id": int(enemy_id),
+            **(attributes or {})
+        }
+    }
+
+def build_enemy_records(text_map, deps=None):
+    """
+    Builds enemy documents from the 'MonsterInfo_' keys of a text map.
+    If deps is a dict, it receives doc_id -> the text map keys each document depends on.
+    """
     # --- Group data for all enemies based on the MonsterInfo_ prefix ---
     enemies_data = defaultdict(dict)
     key_regex = re.compile(r"MonsterInfo_(\d+)_(\w+)")
@@ -35,48 +66,88 @@ def extract_enemies(text_map_path, output_path):
 
     print(f"Found {len(enemies_data)} potential enemy entries.")
 
-    # --- Process and write each enemy to the output file ---
-    processed_count = 0
-    with open(output_path, 'w', encoding='utf-8') as outfile:
-        for enemy_id, data in sorted(enemies_data.items()):
-            name = data.get("Name")
-            if not name or "test" in name.lower() or "dnt" in name.lower():
-                continue
-
-            # Assemble the document text
-            doc_text = f"敌人名称: {name}\n"
-            
-            # Undiscovered Description
-            undisc_desc = data.get("UndiscoveredDes")
-            if undisc_desc:
-                doc_text += f"\n-----基本描述-----\n{clean_text(undisc_desc)}\n"
-
-            # Discovered Description (main info)
-            disc_desc = data.get("DiscoveredDes")
-            if disc_desc:
-                doc_text += f"\n-----详细信息-----\n{clean_text(disc_desc)}\n"
-
-            # Skip entries with only a name
-            if len(doc_text) < (len(name) + 20):
-                continue
-
-            # Create the JSONL record
-            record = {
-                "doc_id": f"enemy_{enemy_id}",
-                "text": doc_text.strip(),
-                "metadata": {
-                    "source": "Enemy",
-                    "type": "敌人",
-                    "name": name,
-                    "id": int(enemy_id)
-                }
-            }
-            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
-            processed_count += 1
-
-    print(f"Successfully extracted and wrote {processed_count} enemies to {output_path}")
+    # --- Process each enemy into a record ---
+    records = []
+    for enemy_id, data in sorted(enemies_data.items()):
+        name = data.get("Name")
+        if not name or "test" in name.lower() or "dnt" in name.lower():
+            continue
+        record = assemble_enemy_record(enemy_id, data)
+        if record:
+            records.append(record)
+            if deps is not None:
+                deps[record['doc_id']] = [f"MonsterInfo_{enemy_id}_*"]
+
+    return records
+
+def load_monster_rows(config_dir=CONFIG_DIR):
+    """
+    Loads the ConfigDB/MonsterInfo.json rows the game shows, i.e. the monsters with a
+    MonsterHandBook entry. MonsterInfo has no visibility column of its own; without
+    MonsterHandBook.json every row is kept.
+    """
+    monster_rows = load_config("MonsterInfo", config_dir)
+    try:
+        handbook_ids = {row['Id'] for row in load_config("MonsterHandBook", config_dir)}
+    except FileNotFoundError:
+        print("WARNING: ConfigDB/MonsterHandBook.json not found, keeping every MonsterInfo row.")
+        return monster_rows
+    shown = [row for row in monster_rows if row['Id'] in handbook_ids]
+    print(f"{len(shown)} of {len(monster_rows)} MonsterInfo rows have a handbook entry.")
+    return shown
+
+def build_enemy_records_from_config(monster_rows, text_map, deps=None):
+    """
+    Builds enemy documents from the rows of ConfigDB/MonsterInfo.json (see load_monster_rows),
+    resolving each text key with a direct lookup instead of scanning the whole text map.
+    If deps is a dict, it receives doc_id -> the ConfigDB row and text keys each document depends on.
+    """
+    records = []
+    for row in sorted(monster_rows, key=lambda r: r['Id']):
+        data = {field: text_map.get(row.get(field) or "") for field in TEXT_FIELDS}
+        attributes = {
+            "rarity_id": row.get("RarityId"),
+            "element_ids": row.get("ElementIdArray") or []
+        }
+        record = assemble_enemy_record(row['Id'], data, attributes)
+        if record:
+            records.append(record)
+            if deps is not None:
+                deps[record['doc_id']] = [row[field] for field in TEXT_FIELDS if row.get(field)] + [config_key("MonsterInfo", row['Id'])]
+
+    print(f"Resolved {len(records)} of {len(monster_rows)} MonsterInfo rows.")
+    return records
+
+def extract_enemies(text_map_path, output_path, source="textmap", config_dir=CONFIG_DIR, dependency_path=DEFAULT_INDEX):
+    """
+    Extracts enemy data from the master text map, either by scanning the 'MonsterInfo_' prefix
+    or (source="configdb") by joining ConfigDB/MonsterInfo.json against it.
+    The keys each document read are recorded as the 'enemies' stage of the dependency index.
+    """
+    print(f"Starting to extract enemy data from {text_map_path}...")
+    try:
+        with open(text_map_path, 'r', encoding='utf-8') as f:
+            text_map = json.load(f)
+        monster_rows = load_monster_rows(config_dir) if source == "configdb" else None
+    except FileNotFoundError as e:
+        print(f"ERROR: Input file not found - {e}")
+        return
+
+    deps = {}
+    if source == "configdb":
+        records = build_enemy_records_from_config(monster_rows, text_map, deps)
+    else:
+        records = build_enemy_records(text_map, deps)
+    write_jsonl(records, output_path)
+    if dependency_path:
+        record_stage("enemies", deps, dependency_path)
+    print(f"Successfully extracted and wrote {len(records)} enemies to {output_path}")
 
 if __name__ == "__main__":
     text_map_file = "TextMap/zh-Hans/MultiText.json"
     output_file = "WutheringDialog/data/enemies.jsonl"
-    extract_enemies(text_map_file, output_file)
+    parser = argparse.ArgumentParser(description="Extract enemy documents from the text map.")
+    parser.add_argument("--source", choices=["textmap", "configdb"], default="textmap",
+                        help="scan the text map, or walk the ConfigDB table and look up its text keys")
+    args = parser.parse_args()
+    extract_enemies(text_map_file, output_file, args.source)
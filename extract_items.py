@@ -1,28 +1,64 @@
 
+import argparse
 import json
 import re
 from collections import defaultdict
 
-def clean_text(text):
-    """Removes simple HTML-like tags from the text."""
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r'<[^>]+>', '', text)
-    text = text.replace("<br>", "\n")
-    return text.strip()
+from dependency_index import DEFAULT_INDEX, config_key, record_stage
+from game_data import CONFIG_DIR, load_config, write_jsonl
+from rich_text import clean_text
 
-def extract_items(text_map_path, output_path):
+KEY_PREFIXES = ("ItemInfo",) # TextMap namespaces used by this extractor
+TEXT_FIELDS = ("Name", "AttributesDescription", "BgDescription", "ObtainedShowDescription") # ItemInfo columns holding text keys
+
+def assemble_item_record(item_id, data, attributes=None):
     """
-    Extracts item data from the master text map based on the 'ItemInfo_' prefix.
+    Assembles one item document from its resolved text fields. Returns None for items with only a name.
     """
-    print(f"Starting to extract item data from {text_map_path}...")
-    try:
-        with open(text_map_path, 'r', encoding='utf-8') as f:
-            text_map = json.load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Input file not found at {text_map_path}")
-        return
+    name = data.get("Name")
+    if not name:
+        return None
+
+    # Assemble the document text
+    doc_text = f"物品名称: {name}\n"
+    
+    # Functional Description
+    func_desc = data.get("AttributesDescription")
+    if func_desc:
+        doc_text += f"\n-----功能描述-----\n{clean_text(func_desc)}\n"
 
+    # Background Story
+    bg_desc = data.get("BgDescription")
+    if bg_desc and bg_desc != func_desc:
+        doc_text += f"\n-----背景故事-----\n{clean_text(bg_desc)}\n"
+
+    # Obtained Description (if different from the others)
+    obt_desc = data.get("ObtainedShowDescription")
+    if obt_desc and obt_desc != func_desc and obt_desc != bg_desc:
+         doc_text += f"\n-----获取描述-----\n{clean_text(obt_desc)}\n"
+
+    # Skip items with only a name
+    if len(doc_text) < (len(name) + 20):
+        return None
+
+    # Create the JSONL record
+    return {
+        "doc_id": f"item_{item_id}",
+        "text": doc_text.strip(),
+        "metadata": {
+            "source": "Item",
+            "type": "物品",
+            "name": name,
+            "id": int(item_id),
+            **(attributes or {})
+        }
+    }
+
+def build_item_records(text_map, deps=None):
+    """
+    Builds item documents from the 'ItemInfo_' keys of a text map.
+    If deps is a dict, it receives doc_id -> the text map keys each document depends on.
+    """
     # --- Group data for all items based on the ItemInfo_ prefix ---
     items_data = defaultdict(dict)
     key_regex = re.compile(r"ItemInfo_(\d+)_(\w+)")
@@ -35,53 +71,76 @@ def extract_items(text_map_path, output_path):
 
     print(f"Found {len(items_data)} potential item entries.")
 
-    # --- Process and write each item to the output file ---
-    processed_count = 0
-    with open(output_path, 'w', encoding='utf-8') as outfile:
-        for item_id, data in sorted(items_data.items()):
-            name = data.get("Name")
-            if not name or "test" in name.lower() or "dnt" in name.lower():
-                continue
-
-            # Assemble the document text
-            doc_text = f"物品名称: {name}\n"
-            
-            # Functional Description
-            func_desc = data.get("AttributesDescription")
-            if func_desc:
-                doc_text += f"\n-----功能描述-----\n{clean_text(func_desc)}\n"
-
-            # Background Story
-            bg_desc = data.get("BgDescription")
-            if bg_desc and bg_desc != func_desc:
-                doc_text += f"\n-----背景故事-----\n{clean_text(bg_desc)}\n"
-
-            # Obtained Description (if different from the others)
-            obt_desc = data.get("ObtainedShowDescription")
-            if obt_desc and obt_desc != func_desc and obt_desc != bg_desc:
-                 doc_text += f"\n-----获取描述-----\n{clean_text(obt_desc)}\n"
-
-            # Skip items with only a name
-            if len(doc_text) < (len(name) + 20):
-                continue
-
-            # Create the JSONL record
-            record = {
-                "doc_id": f"item_{item_id}",
-                "text": doc_text.strip(),
-                "metadata": {
-                    "source": "Item",
-                    "type": "物品",
-                    "name": name,
-                    "id": int(item_id)
-                }
-            }
-            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
-            processed_count += 1
-
-    print(f"Successfully extracted and wrote {processed_count} items to {output_path}")
+    # --- Process each item into a record ---
+    records = []
+    for item_id, data in sorted(items_data.items()):
+        name = data.get("Name")
+        if not name or "test" in name.lower() or "dnt" in name.lower():
+            continue
+        record = assemble_item_record(item_id, data)
+        if record:
+            records.append(record)
+            if deps is not None:
+                deps[record['doc_id']] = [f"ItemInfo_{item_id}_*"]
+
+    return records
+
+def build_item_records_from_config(item_rows, text_map, deps=None):
+    """
+    Builds item documents from the rows of ConfigDB/ItemInfo.json, resolving each text key
+    with a direct lookup instead of scanning the whole text map. Items the game never lists
+    (ShowInBag = false, or no ShowTypes) are skipped.
+    If deps is a dict, it receives doc_id -> the ConfigDB row and text keys each document depends on.
+    """
+    records = []
+    for row in sorted(item_rows, key=lambda r: r['Id']):
+        if not row.get("ShowInBag", True) or not row.get("ShowTypes", True):
+            continue
+        data = {field: text_map.get(row.get(field) or "") for field in TEXT_FIELDS}
+        attributes = {
+            "quality_id": row.get("QualityId"),
+            "item_type": row.get("ItemType"),
+            "main_type_id": row.get("MainTypeId")
+        }
+        record = assemble_item_record(row['Id'], data, attributes)
+        if record:
+            records.append(record)
+            if deps is not None:
+                deps[record['doc_id']] = [row[field] for field in TEXT_FIELDS if row.get(field)] + [config_key("ItemInfo", row['Id'])]
+
+    print(f"Resolved {len(records)} of {len(item_rows)} ItemInfo rows.")
+    return records
+
+def extract_items(text_map_path, output_path, source="textmap", config_dir=CONFIG_DIR, dependency_path=DEFAULT_INDEX):
+    """
+    Extracts item data from the master text map, either by scanning the 'ItemInfo_' prefix
+    or (source="configdb") by joining ConfigDB/ItemInfo.json against it.
+    The keys each document read are recorded as the 'items' stage of the dependency index.
+    """
+    print(f"Starting to extract item data from {text_map_path}...")
+    try:
+        with open(text_map_path, 'r', encoding='utf-8') as f:
+            text_map = json.load(f)
+        item_rows = load_config("ItemInfo", config_dir) if source == "configdb" else None
+    except FileNotFoundError as e:
+        print(f"ERROR: Input file not found - {e}")
+        return
+
+    deps = {}
+    if source == "configdb":
+        records = build_item_records_from_config(item_rows, text_map, deps)
+    else:
+        records = build_item_records(text_map, deps)
+    write_jsonl(records, output_path)
+    if dependency_path:
+        record_stage("items", deps, dependency_path)
+    print(f"Successfully extracted and wrote {len(records)} items to {output_path}")
 
 if __name__ == "__main__":
     text_map_file = "TextMap/zh-Hans/MultiText.json"
     output_file = "WutheringDialog/data/items.jsonl"
-    extract_items(text_map_file, output_file)
+    parser = argparse.ArgumentParser(description="Extract item documents from the text map.")
+    parser.add_argument("--source", choices=["textmap", "configdb"], default="textmap",
+                        help="scan the text map, or walk the ConfigDB table and look up its text keys")
+    args = parser.parse_args()
+    extract_items(text_map_file, output_file, args.source)
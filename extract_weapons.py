@@ -1,29 +1,52 @@
 
+import argparse
 import json
 import re
 from collections import defaultdict
 
-def clean_text(text):
-    """Removes simple HTML-like tags from the text."""
-    if not isinstance(text, str):
-        return ""
-    # This regex is simplified and might not cover all HTML-like tags.
-    text = re.sub(r'<[^>]+>', '', text)
-    text = text.replace("<br>", "\n")
-    return text.strip()
+from dependency_index import DEFAULT_INDEX, config_key, record_stage
+from game_data import CONFIG_DIR, load_config, write_jsonl
+from rich_text import clean_text
 
-def extract_weapons(text_map_path, output_path):
+KEY_PREFIXES = ("WeaponConf",) # TextMap namespaces used by this extractor
+TEXT_FIELDS = ("WeaponName", "Desc", "AttributesDescription", "BgDescription") # WeaponConf columns holding text keys
+
+def assemble_weapon_record(weapon_id, data, attributes=None):
     """
-    Extracts weapon data from the master text map and saves it to a dedicated file.
+    Assembles one weapon document from its resolved text fields.
     """
-    print(f"Starting to extract weapon data from {text_map_path}...")
-    try:
-        with open(text_map_path, 'r', encoding='utf-8') as f:
-            text_map = json.load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Input file not found at {text_map_path}")
-        return
+    name = data.get("WeaponName")
 
+    # Assemble the document text
+    doc_text = f"武器名称: {name}\n"
+
+    desc = data.get("Desc")
+    if desc:
+        doc_text += f"\n-----技能描述-----\n{clean_text(desc)}\n"
+
+    # Use AttributesDescription for the story, fallback to BgDescription
+    story = data.get("AttributesDescription") or data.get("BgDescription")
+    if story:
+        doc_text += f"\n-----武器故事-----\n{clean_text(story)}\n"
+
+    # Create the JSONL record
+    return {
+        "doc_id": f"weapon_{weapon_id}",
+        "text": doc_text.strip(),
+        "metadata": {
+            "source": "Weapon",
+            "type": "武器",
+            "name": name,
+            "id": int(weapon_id),
+            **(attributes or {})
+        }
+    }
+
+def build_weapon_records(text_map, deps=None):
+    """
+    Builds weapon documents from the 'WeaponConf_' keys of a text map.
+    If deps is a dict, it receives doc_id -> the text map keys each document depends on.
+    """
     # --- Step 1: Identify all valid weapon IDs first ---
     weapon_ids = set()
     id_regex = re.compile(r"WeaponConf_(\d+)_TypeDescription")
@@ -46,43 +69,74 @@ def extract_weapons(text_map_path, output_path):
                 field = match.group(2)
                 weapons_data[weapon_id][field] = value
 
-    # --- Step 3: Process and write each weapon to the output file ---
-    processed_count = 0
-    with open(output_path, 'w', encoding='utf-8') as outfile:
-        for weapon_id, data in sorted(weapons_data.items()):
-            name = data.get("WeaponName")
-            if not name or "test" in name.lower():
-                continue
-
-            # Assemble the document text
-            doc_text = f"武器名称: {name}\n"
-            
-            desc = data.get("Desc")
-            if desc:
-                doc_text += f"\n-----技能描述-----\n{clean_text(desc)}\n"
-
-            # Use AttributesDescription for the story, fallback to BgDescription
-            story = data.get("AttributesDescription") or data.get("BgDescription")
-            if story:
-                doc_text += f"\n-----武器故事-----\n{clean_text(story)}\n"
-
-            # Create the JSONL record
-            record = {
-                "doc_id": f"weapon_{weapon_id}",
-                "text": doc_text.strip(),
-                "metadata": {
-                    "source": "Weapon",
-                    "type": "武器",
-                    "name": name,
-                    "id": int(weapon_id)
-                }
-            }
-            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
-            processed_count += 1
-
-    print(f"Successfully extracted and wrote {processed_count} weapons to {output_path}")
+    # --- Step 3: Process each weapon into a record ---
+    records = []
+    for weapon_id, data in sorted(weapons_data.items()):
+        name = data.get("WeaponName")
+        if not name or "test" in name.lower():
+            continue
+        record = assemble_weapon_record(weapon_id, data)
+        records.append(record)
+        if deps is not None:
+            deps[record['doc_id']] = [f"WeaponConf_{weapon_id}_*"]
+
+    return records
+
+def build_weapon_records_from_config(weapon_rows, text_map, deps=None):
+    """
+    Builds weapon documents from the rows of ConfigDB/WeaponConf.json, resolving each text key
+    with a direct lookup. Hidden weapons (IsShow = false) are skipped.
+    If deps is a dict, it receives doc_id -> the ConfigDB row and text keys each document depends on.
+    """
+    records = []
+    for row in sorted(weapon_rows, key=lambda r: r['ItemId']):
+        if not row.get("IsShow", True):
+            continue
+        data = {field: text_map.get(row.get(field) or "") for field in TEXT_FIELDS}
+        if not data["WeaponName"]:
+            continue
+        attributes = {
+            "quality_id": row.get("QualityId"),
+            "weapon_type": row.get("WeaponType")
+        }
+        record = assemble_weapon_record(row['ItemId'], data, attributes)
+        records.append(record)
+        if deps is not None:
+            deps[record['doc_id']] = [row[field] for field in TEXT_FIELDS if row.get(field)] + [config_key("WeaponConf", row['ItemId'])]
+
+    print(f"Resolved {len(records)} of {len(weapon_rows)} WeaponConf rows.")
+    return records
+
+def extract_weapons(text_map_path, output_path, source="textmap", config_dir=CONFIG_DIR, dependency_path=DEFAULT_INDEX):
+    """
+    Extracts weapon data from the master text map and saves it to a dedicated file.
+    With source="configdb" the weapons are taken from ConfigDB/WeaponConf.json instead of a text map scan.
+    The keys each document read are recorded as the 'weapons' stage of the dependency index.
+    """
+    print(f"Starting to extract weapon data from {text_map_path}...")
+    try:
+        with open(text_map_path, 'r', encoding='utf-8') as f:
+            text_map = json.load(f)
+        weapon_rows = load_config("WeaponConf", config_dir) if source == "configdb" else None
+    except FileNotFoundError as e:
+        print(f"ERROR: Input file not found - {e}")
+        return
+
+    deps = {}
+    if source == "configdb":
+        records = build_weapon_records_from_config(weapon_rows, text_map, deps)
+    else:
+        records = build_weapon_records(text_map, deps)
+    write_jsonl(records, output_path)
+    if dependency_path:
+        record_stage("weapons", deps, dependency_path)
+    print(f"Successfully extracted and wrote {len(records)} weapons to {output_path}")
 
 if __name__ == "__main__":
     text_map_file = "TextMap/zh-Hans/MultiText.json"
     output_file = "WutheringDialog/data/weapons.jsonl"
-    extract_weapons(text_map_file, output_file)
+    parser = argparse.ArgumentParser(description="Extract weapon documents from the text map.")
+    parser.add_argument("--source", choices=["textmap", "configdb"], default="textmap",
+                        help="scan the text map, or walk the ConfigDB table and look up its text keys")
+    args = parser.parse_args()
+    extract_weapons(text_map_file, output_file, args.source)
@@ -0,0 +1,158 @@
+import array
+import json
+import os
+import struct
+import sys
+
+MAGIC = b"WFR1"
+DEFAULT_REGISTRY = "WutheringDialog/data/flow_registry.bin"
+# header: magic, flow list count, flow count, state count, name blob size
+HEADER = struct.Struct("<4sIIII")
+
+
+class FlowRegistry:
+    """
+    Compact registry of every Flow and its states, built from ConfigDB/Flow.json.
+
+    A flow Id such as "剧情_新剧本测试_1" is split into its FlowListName ("剧情_新剧本测试")
+    and FlowId (1). FlowListNames are interned once; each flow is just two integers, and the
+    states of flow i are state_ids[state_offsets[i]:state_offsets[i + 1]].
+    StateKey lookups ("剧情_新剧本测试_1_1" -> flow) are dict lookups, no scanning.
+
+    The binary file is a small header, the NUL-separated FlowListNames and four uint32 arrays,
+    so loading it needs no JSON parsing.
+    """
+
+    def __init__(self):
+        self.list_names = []
+        self.flow_list = array.array("I")
+        self.flow_ids = array.array("I")
+        self.state_offsets = array.array("I", [0])
+        self.state_ids = array.array("I")
+        self._list_index = {}
+        self._flow_index = {}
+        self._state_index = {}
+
+    # --- build ---
+
+    @classmethod
+    def from_flow_config(cls, flows):
+        registry = cls()
+        for flow in flows:
+            flow_name = flow.get("Id")
+            states = flow.get("States")
+            if not flow_name or not states:
+                continue
+            list_name, _, flow_id = flow_name.rpartition("_")
+            if not list_name or not flow_id.isdigit():
+                continue
+            list_idx = registry._list_index.setdefault(list_name, len(registry.list_names))
+            if list_idx == len(registry.list_names):
+                registry.list_names.append(list_name)
+            registry.flow_list.append(list_idx)
+            registry.flow_ids.append(int(flow_id))
+            registry.state_ids.extend(states)
+            registry.state_offsets.append(len(registry.state_ids))
+        registry._build_lookups()
+        return registry
+
+    @classmethod
+    def from_config_dir(cls, config_dir="ConfigDB"):
+        with open(os.path.join(config_dir, "Flow.json"), 'r', encoding='utf-8') as f:
+            return cls.from_flow_config(json.load(f))
+
+    def _build_lookups(self):
+        self._list_index = {name: i for i, name in enumerate(self.list_names)}
+        self._flow_index = {}
+        self._state_index = {}
+        for i in range(len(self.flow_ids)):
+            flow_name = self.flow_name(i)
+            self._flow_index[flow_name] = i
+            for state in self.state_ids[self.state_offsets[i]:self.state_offsets[i + 1]]:
+                self._state_index[f"{flow_name}_{state}"] = i
+
+    # --- serialization ---
+
+    def save(self, path=DEFAULT_REGISTRY):
+        names_blob = "\0".join(self.list_names).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.list_names), len(self.flow_ids), len(self.state_ids), len(names_blob)))
+            f.write(names_blob)
+            for arr in (self.flow_list, self.flow_ids, self.state_offsets, self.state_ids):
+                arr.tofile(f)
+
+    @classmethod
+    def load(cls, path=DEFAULT_REGISTRY):
+        registry = cls()
+        with open(path, "rb") as f:
+            magic, list_count, flow_count, state_count, blob_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a flow registry file")
+            registry.list_names = f.read(blob_size).decode("utf-8").split("\0") if list_count else []
+            registry.state_offsets = array.array("I")
+            for arr, count in ((registry.flow_list, flow_count), (registry.flow_ids, flow_count),
+                               (registry.state_offsets, flow_count + 1), (registry.state_ids, state_count)):
+                arr.fromfile(f, count)
+        registry._build_lookups()
+        return registry
+
+    @classmethod
+    def load_or_build(cls, config_dir="ConfigDB", path=DEFAULT_REGISTRY):
+        """Loads the binary registry, rebuilding it when Flow.json is newer."""
+        flow_file = os.path.join(config_dir, "Flow.json")
+        if os.path.exists(path) and (not os.path.exists(flow_file)
+                                     or os.path.getmtime(path) >= os.path.getmtime(flow_file)):
+            return cls.load(path)
+        registry = cls.from_config_dir(config_dir)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        registry.save(path)
+        return registry
+
+    # --- lookups ---
+
+    def __len__(self):
+        return len(self.flow_ids)
+
+    def flow_name(self, flow_idx):
+        return f"{self.list_names[self.flow_list[flow_idx]]}_{self.flow_ids[flow_idx]}"
+
+    def flow_index(self, flow_name):
+        return self._flow_index.get(flow_name)
+
+    def states(self, flow_name):
+        i = self._flow_index.get(flow_name)
+        if i is None:
+            return []
+        return list(self.state_ids[self.state_offsets[i]:self.state_offsets[i + 1]])
+
+    def flow_of(self, state_key):
+        """"剧情_新剧本测试_1_1" -> "剧情_新剧本测试_1" (None for unknown StateKeys)"""
+        i = self._state_index.get(state_key)
+        return None if i is None else self.flow_name(i)
+
+    def parse_state_key(self, state_key):
+        """"剧情_新剧本测试_1_1" -> ("剧情_新剧本测试", 1, 1)"""
+        i = self._state_index.get(state_key)
+        if i is None:
+            return None
+        return self.list_names[self.flow_list[i]], self.flow_ids[i], int(state_key.rpartition("_")[2])
+
+    def state_key(self, flow_list_name, flow_id, state_id):
+        """(FlowListName, FlowId, StateId) -> StateKey, or None if that state does not exist"""
+        key = f"{flow_list_name}_{flow_id}_{state_id}"
+        return key if key in self._state_index else None
+
+    def state_count(self):
+        return len(self.state_ids)
+
+    def to_state_map(self):
+        """The old flow_map.json layout: {StateKey: flow Id}"""
+        return {state_key: self.flow_name(i) for state_key, i in self._state_index.items()}
+
+
+if __name__ == "__main__":
+    config_directory = sys.argv[1] if len(sys.argv) > 1 else "ConfigDB"
+    registry = FlowRegistry.from_config_dir(config_directory)
+    registry.save(DEFAULT_REGISTRY)
+    print(f"Registered {len(registry)} flows ({len(registry.list_names)} flow lists, "
+          f"{registry.state_count()} states) -> {DEFAULT_REGISTRY} ({os.path.getsize(DEFAULT_REGISTRY):,} bytes)")
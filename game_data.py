@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+游戏数据公共读写函数 - TextMap / ConfigDB 的加载与JSONL输出
+
+各个 extract_* 脚本和处理引擎共用，避免每个脚本各自拼路径、各自读文件。
+"""
+
+import json
+import os
+
+TEXT_MAP_DIR = "TextMap"
+CONFIG_DIR = "ConfigDB"
+DEFAULT_LANG = "zh-Hans"
+
+
+def text_map_path(lang: str = DEFAULT_LANG, text_map_dir: str = TEXT_MAP_DIR) -> str:
+    return os.path.join(text_map_dir, lang, "MultiText.json")
+
+
+def load_text_map(lang: str = DEFAULT_LANG, text_map_dir: str = TEXT_MAP_DIR) -> dict:
+    """加载某个语言的 MultiText.json"""
+    with open(text_map_path(lang, text_map_dir), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_config(table: str, config_dir: str = CONFIG_DIR) -> list:
+    """加载 ConfigDB 中的一张表，例如 load_config("ItemInfo")"""
+    with open(os.path.join(config_dir, f"{table}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_jsonl(records, output_path: str) -> int:
+    """把记录写成JSONL，返回写入条数"""
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as outfile:
+        for record in records:
+            outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+漂泊者性别占位符展开 - 基于 ConfigDB/GenderText.json
+
+剧情、字幕文本中用 {大哥哥} {哥哥} {TA} 等占位符表示随漂泊者性别变化的称呼，
+GenderText 给出每个占位符的男/女两种写法（MaleText / FemaleText），{TA} 对应 他/她。
+
+占位符表在加载时编译成一个正则，一次扫描完成全部替换:
+  render(text, "male")    -> 男主版本
+  render(text, "female")  -> 女主版本
+  render(text, "both")    -> "大哥哥/大姐姐" 合并写法
+{PlayerName} 等其他花括号内容保持不变。没有占位符的文本直接原样返回。
+
+用法:
+  python gender_text.py "<文本>"
+"""
+
+import re
+import sys
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from game_data import CONFIG_DIR, load_config
+
+GENDERS = ("male", "female")
+# 不以 MaleText 本身作占位符名的别名
+PLACEHOLDER_ALIASES = {"TA": "他"}
+
+
+class GenderTextExpander:
+    def __init__(self, pairs: Dict[str, Tuple[str, str]]):
+        """pairs: 占位符名 -> (男性写法, 女性写法)"""
+        self.pairs = dict(pairs)
+        self.table = {
+            "male": {name: male for name, (male, _) in self.pairs.items()},
+            "female": {name: female for name, (_, female) in self.pairs.items()},
+            "both": {name: male if male == female else f"{male}/{female}" for name, (male, female) in self.pairs.items()},
+        }
+        # 长的占位符优先，避免 {哥哥} 抢先匹配 {大哥哥} 的一部分（花括号已经限定了边界，这里只是保险）
+        names = sorted(self.pairs, key=len, reverse=True)
+        self.regex = re.compile(r"\{(" + "|".join(map(re.escape, names)) + r")\}") if names else None
+
+    @classmethod
+    def from_config(cls, config_dir: str = CONFIG_DIR) -> "GenderTextExpander":
+        pairs = {}
+        for row in load_config("GenderText", config_dir):
+            male, female = row.get("MaleText"), row.get("FemaleText")
+            if male and female:
+                pairs[male] = (male, female)
+        for alias, target in PLACEHOLDER_ALIASES.items():
+            if target in pairs:
+                pairs[alias] = pairs[target]
+        return cls(pairs)
+
+    def has_placeholders(self, text) -> bool:
+        return isinstance(text, str) and "{" in text and self.regex is not None \
+            and self.regex.search(text) is not None
+
+    def render(self, text, gender: str = "both"):
+        if not self.has_placeholders(text):
+            return text
+        table = self.table[gender]
+        return self.regex.sub(lambda m: table[m.group(1)], text)
+
+    def variants(self, text) -> Dict[str, str]:
+        """{"male": ..., "female": ...}；没有占位符时返回空字典"""
+        if not self.has_placeholders(text):
+            return {}
+        return {gender: self.render(text, gender) for gender in GENDERS}
+
+    def expand_records(self, records: Iterable[dict], field: str = "text", id_field: str = "doc_id") -> Iterator[dict]:
+        """
+        逐条输出记录。含占位符的记录先输出合并写法（"他/她"），再各输出一条男/女版本，
+        变体的 doc_id 加上 #male / #female 后缀并带 "gender" 字段；其余记录原样输出。
+        """
+        for record in records:
+            text = record.get(field)
+            if not self.has_placeholders(text):
+                yield record
+                continue
+            yield dict(record, **{field: self.render(text, "both")})
+            for gender in GENDERS:
+                variant = dict(record, **{field: self.render(text, gender)}, gender=gender)
+                if record.get(id_field) is not None:
+                    variant[id_field] = f"{record[id_field]}#{gender}"
+                yield variant
+
+
+_default_expander: Optional[GenderTextExpander] = None
+
+
+def get_expander(config_dir: str = CONFIG_DIR) -> GenderTextExpander:
+    """进程内共享的默认实例（GenderText 只加载一次）"""
+    global _default_expander
+    if _default_expander is None:
+        _default_expander = GenderTextExpander.from_config(config_dir)
+    return _default_expander
+
+
+if __name__ == "__main__":
+    expander = get_expander()
+    print(f"占位符: {', '.join('{' + name + '}' for name in expander.pairs)}")
+    if len(sys.argv) > 1:
+        text = " ".join(sys.argv[1:])
+        for gender in ("male", "female", "both"):
+            print(f"{gender:6s} {expander.render(text, gender)}")
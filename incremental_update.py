@@ -6,6 +6,11 @@ import json
 import shutil
 from datetime import datetime
 
+from jsonl_blocks import open_jsonl, resolve_path
+
+# complete_dialogue_processor.py 总是写出原始 .jsonl；之前的结果可能只剩压缩版本
+PROCESSED_FILE = "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+
 def incremental_update():
     """增量更新脚本 - 处理游戏更新后的新数据"""
     
@@ -13,8 +18,8 @@ def incremental_update():
     print(f"更新时间: {datetime.now()}")
     
     # 1. 检查原始数据是否有更新
-    original_file = "WutheringDialog/data/dialogs_zh-Hans.split.jsonl"
-    processed_file = "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+    original_file = resolve_path("WutheringDialog/data/dialogs_zh-Hans.split.jsonl")
+    processed_file = resolve_path(PROCESSED_FILE)
     
     if not os.path.exists(original_file):
         print(f"❌ 原始数据文件不存在: {original_file}")
@@ -38,19 +43,19 @@ def incremental_update():
         print("✅ 原始数据没有更新，无需处理")
         return True
     
-    # 3. 备份当前结果
-    backup_name = f"WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    # 3. 备份当前结果（保留实际的扩展名，压缩版本备份后仍是压缩文件）
+    backup_name = f"{processed_file}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     shutil.copy2(processed_file, backup_name)
     print(f"✅ 已备份当前结果到: {backup_name}")
     
     # 4. 检查原始数据行数
     original_lines = 0
-    with open(original_file, 'r', encoding='utf-8') as f:
+    with open_jsonl(original_file) as f:
         for _ in f:
             original_lines += 1
     
     processed_lines = 0
-    with open(processed_file, 'r', encoding='utf-8') as f:
+    with open_jsonl(processed_file) as f:
         for _ in f:
             processed_lines += 1
     
@@ -75,9 +80,9 @@ def incremental_update():
         if result.returncode == 0:
             print("✅ 处理完成")
             
-            # 6. 验证新结果
+            # 6. 验证新结果（刚写出的原始 .jsonl，不是旧的压缩版本）
             new_lines = 0
-            with open(processed_file, 'r', encoding='utf-8') as f:
+            with open_jsonl(PROCESSED_FILE) as f:
                 for _ in f:
                     new_lines += 1
             
@@ -96,8 +101,10 @@ def incremental_update():
             
         else:
             print(f"❌ 处理失败: {result.stderr}")
-            # 恢复备份
+            # 恢复备份；备份来自压缩版本时，删掉处理失败时写了一半的原始文件
             shutil.copy2(backup_name, processed_file)
+            if processed_file != PROCESSED_FILE and os.path.exists(PROCESSED_FILE):
+                os.remove(PROCESSED_FILE)
             print("✅ 已恢复备份")
             return False
             
@@ -110,14 +117,14 @@ def incremental_update():
 
 def quality_check():
     """快速质量检查"""
-    processed_file = "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+    processed_file = resolve_path(PROCESSED_FILE)
     
     total_lines = 0
     unknown_count = 0
     null_quest_id = 0
     empty_quest_name = 0
     
-    with open(processed_file, 'r', encoding='utf-8') as f:
+    with open_jsonl(processed_file) as f:
         for line in f:
             total_lines += 1
             data = json.loads(line.strip())
@@ -167,6 +174,8 @@ def check_config_updates():
             print(f"{description}: {size:,} bytes, 修改时间: {datetime.fromtimestamp(mtime)}")
         else:
             print(f"❌ {description}: 文件不存在")
+    
+    print("💡 逐key比较两个版本: python incremental_update.py diff <旧版本根目录>")
 
 if __name__ == "__main__":
     import sys
@@ -176,7 +185,10 @@ if __name__ == "__main__":
             check_config_updates()
         elif sys.argv[1] == "quality":
             quality_check()
+        elif sys.argv[1] == "diff" and len(sys.argv) > 2:
+            from data_diff import diff_snapshots
+            diff_snapshots(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else ".")
         else:
-            print("用法: python incremental_update.py [check|quality]")
+            print("用法: python incremental_update.py [check|quality|diff <旧版本根目录> [新版本根目录]]")
     else:
         incremental_update()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分块压缩的JSONL - 可流式读取，也可按doc_id随机访问
+
+文件由若干独立压缩的块拼接而成（每块默认1000行）:
+  xxx.jsonl.zst   安装了 zstandard 时使用zstd，每块一个zstd frame
+  xxx.jsonl.gz    否则使用gzip，每块一个gzip member（任何gzip工具都能直接解压整个文件）
+旁边的索引文件 xxx.jsonl.zst.idx / xxx.jsonl.gz.idx (JSON):
+  {"codec": ..., "blocks": [[字节偏移, 字节长度, 行数], ...], "docs": {doc_id: [块号, 块内行号]}}
+
+按doc_id读取时只解压一个块；整体读取时逐块流式解压。
+按doc_id读取时如果原始 .jsonl 比压缩版本新，会先重新压缩，保证不读到旧记录。
+流水线中的读取脚本统一使用 open_jsonl()，原始 .jsonl 不存在时自动找压缩版本。
+
+用法:
+  python jsonl_blocks.py compress <file.jsonl> [--block-lines 1000]
+  python jsonl_blocks.py get <file.jsonl[.zst|.gz]> <doc_id>
+  python jsonl_blocks.py cat <file.jsonl[.zst|.gz]>
+"""
+
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+from contextlib import contextmanager, redirect_stdout
+from typing import Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstandard 是可选依赖
+    zstandard = None
+
+DEFAULT_BLOCK_LINES = 1000
+CODEC_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+ID_FIELDS = ("doc_id", "title")
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def codec_of(path: str) -> Optional[str]:
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return None
+
+
+def resolve_path(path: str) -> str:
+    """原始文件存在就用原始文件，否则依次尝试 .zst / .gz 压缩版本"""
+    if os.path.exists(path):
+        return path
+    for suffix in CODEC_SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+
+def resolve_indexed_path(path: str) -> str:
+    """
+    随机访问只能用带索引的压缩文件: 给的是原始 .jsonl 时找旁边带 .idx 的 .zst / .gz。
+    原始 .jsonl 比压缩版本新（流水线重新写出了原始文件）时先重新压缩，避免读到旧记录。
+    """
+    codec = codec_of(path)
+    if codec is not None:
+        plain = path[:-len(CODEC_SUFFIXES[codec])]
+        return _refresh_if_stale(path, plain, codec)
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if os.path.exists(path + suffix + ".idx"):
+            return _refresh_if_stale(path + suffix, path, codec)
+    raise FileNotFoundError(f"没有找到 {path} 的分块压缩版本（先运行 python jsonl_blocks.py compress {path}）")
+
+
+def _refresh_if_stale(compressed: str, plain: str, codec: str) -> str:
+    if not os.path.exists(plain) or not os.path.exists(compressed):
+        return compressed
+    index_path = compressed + ".idx"
+    built = min(os.path.getmtime(compressed), os.path.getmtime(index_path)) if os.path.exists(index_path) else 0
+    if os.path.getmtime(plain) <= built:
+        return compressed
+    print(f"⚠️  {plain} 比 {compressed} 新，重新压缩", file=sys.stderr)
+    block_lines = DEFAULT_BLOCK_LINES
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            blocks = json.load(f).get("blocks") or []
+        if blocks:
+            block_lines = blocks[0][2]
+    except (OSError, ValueError):
+        pass
+    # 压缩过程的输出不能混进 get / cat 的标准输出
+    with redirect_stdout(sys.stderr):
+        return compress_file(plain, block_lines, codec)
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("读取 .zst 文件需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+def _record_id(line: str) -> Optional[str]:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    for field in ID_FIELDS:
+        if record.get(field):
+            return str(record[field])
+    return None
+
+
+class BlockWriter:
+    """逐行写入，攒满一块就压缩落盘，关闭时写出索引"""
+
+    def __init__(self, path: str, block_lines: int = DEFAULT_BLOCK_LINES, codec: Optional[str] = None):
+        self.codec = codec or codec_of(path) or default_codec()
+        suffix = CODEC_SUFFIXES[self.codec]
+        self.path = path if path.endswith(suffix) else path + suffix
+        self.block_lines = block_lines
+        self.blocks: List[list] = []
+        self.docs = {}
+        self._pending: List[str] = []
+        self._file = open(self.path, "wb")
+
+    def write(self, record):
+        """record 可以是dict，也可以是已经序列化好的一行JSON"""
+        line = record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+        line = line.rstrip("\n")
+        doc_id = (record.get("doc_id") or record.get("title")) if isinstance(record, dict) else _record_id(line)
+        if doc_id is not None and str(doc_id) not in self.docs:
+            self.docs[str(doc_id)] = [len(self.blocks), len(self._pending)]
+        self._pending.append(line)
+        if len(self._pending) >= self.block_lines:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        payload = _compress(self.codec, ("\n".join(self._pending) + "\n").encode("utf-8"))
+        self.blocks.append([self._file.tell(), len(payload), len(self._pending)])
+        self._file.write(payload)
+        self._pending = []
+
+    def close(self):
+        self._flush()
+        self._file.close()
+        with open(self.path + ".idx", "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "codec": self.codec, "blocks": self.blocks, "docs": self.docs},
+                      f, ensure_ascii=False, separators=(",", ":"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BlockReader:
+    """基于索引的随机访问"""
+
+    def __init__(self, path: str):
+        self.path = resolve_indexed_path(path)
+        with open(self.path + ".idx", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.codec = index["codec"]
+        self.blocks = index["blocks"]
+        self.docs = index["docs"]
+
+    def __len__(self) -> int:
+        return sum(block[2] for block in self.blocks)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.docs
+
+    def read_block(self, block_no: int) -> List[str]:
+        offset, length, _ = self.blocks[block_no]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return _decompress(self.codec, data).decode("utf-8").splitlines()
+
+    def get_line(self, doc_id: str) -> Optional[str]:
+        location = self.docs.get(doc_id)
+        if location is None:
+            return None
+        return self.read_block(location[0])[location[1]]
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        line = self.get_line(doc_id)
+        return json.loads(line) if line is not None else None
+
+
+@contextmanager
+def open_jsonl(path: str):
+    """
+    以文本方式打开JSONL，可以像普通文件一样逐行迭代。
+    path 可以是原始 .jsonl（不存在时自动找 .zst / .gz），也可以直接是压缩文件。
+    """
+    path = resolve_path(path)
+    codec = codec_of(path)
+    if codec is None:
+        with open(path, "r", encoding="utf-8") as f:
+            yield f
+    elif codec == "gzip":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield f
+    else:
+        if zstandard is None:
+            raise RuntimeError("读取 .zst 文件需要安装 zstandard: pip install zstandard")
+        with open(path, "rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            with io.TextIOWrapper(reader, encoding="utf-8") as f:
+                yield f
+
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    with open_jsonl(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def compress_file(input_path: str, block_lines: int = DEFAULT_BLOCK_LINES, codec: Optional[str] = None) -> str:
+    """把已有的JSONL转换成分块压缩格式，返回输出路径"""
+    with open(input_path, "r", encoding="utf-8") as infile, \
+         BlockWriter(input_path, block_lines, codec) as writer:
+        for line in infile:
+            if line.strip():
+                writer.write(line)
+    original = os.path.getsize(input_path)
+    compressed = os.path.getsize(writer.path)
+    print(f"✅ {input_path} -> {writer.path}")
+    print(f"   {original:,} -> {compressed:,} bytes ({compressed / max(original, 1) * 100:.1f}%)，"
+          f"{len(writer.blocks)} 块，{len(writer.docs):,} 个doc_id")
+    return writer.path
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "compress" and len(sys.argv) > 2:
+        lines = int(sys.argv[sys.argv.index("--block-lines") + 1]) if "--block-lines" in sys.argv else DEFAULT_BLOCK_LINES
+        compress_file(sys.argv[2], lines)
+    elif command == "get" and len(sys.argv) > 3:
+        line = BlockReader(sys.argv[2]).get_line(sys.argv[3])
+        print(line if line is not None else f"❌ 没有找到doc_id: {sys.argv[3]}")
+    elif command == "cat" and len(sys.argv) > 2:
+        with open_jsonl(sys.argv[2]) as f:
+            for line in f:
+                sys.stdout.write(line)
+    else:
+        print("用法: python jsonl_blocks.py [compress <file.jsonl>|get <file> <doc_id>|cat <file>]")
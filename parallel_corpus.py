@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多语言平行语料 - 按文本key把所有语言对齐成一张表
+
+TextMap 有13种语言，但 de/es/fr 等语言只有少量表，zh-Hans/en/ja 最完整。
+本脚本逐表处理（同一时间内存中只有一张表的各语言版本），按key对齐后写出:
+  corpus.tsv      列式表格: key, table, speaker, zh-Hans, en, ja, ...
+                  （制表符和换行转义为 \\t \\n，可直接批量导入翻译记忆库或双语RAG）
+  coverage.json   每种语言（以及每张表）的覆盖率统计
+
+只按字符串key对齐（TextMap/<lang>/MultiText.json 里的 RoleInfo_1102_Name ...）。
+TextMap/<lang>/<表名>.json 这类数字key的分表按各语言自己的行序编号，同一个数字在
+不同语言里不是同一句话（SubtitleText 的 1 在 zh-Hans 是“凌阳”，en/ja 是“散華”），
+无法对齐，只在 coverage.json 的 unaligned 里列出行数，不写入语料。
+
+ConfigDB/FlowState.json 存在时，对话文本会带上说话人（对应语言的 Speaker_<id>_Name）。
+
+用法:
+  python parallel_corpus.py [--base zh-Hans] [--langs zh-Hans en ja ...] [--output-dir DIR] [--format tsv|jsonl]
+  python parallel_corpus.py --check [--probe RoleInfo_1102_Name ...]   只检查已知key在各语言是否对得上
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from game_data import CONFIG_DIR, DEFAULT_LANG, TEXT_MAP_DIR, load_config
+
+DEFAULT_OUTPUT_DIR = "WutheringDialog/data/parallel_corpus"
+# 分表里夹杂的key名本身（例如 "Speaker_7_Name"），不是需要翻译的文本
+KEY_LIKE_REGEX = re.compile(r"^[A-Za-z][A-Za-z0-9]*(_[A-Za-z0-9]+)+$")
+# 对齐检查用的已知key：每种语言都应当有非空、且不等于key本身的文本
+ALIGNMENT_PROBES = ("RoleInfo_1102_Name",)
+
+
+def list_languages(text_map_dir: str = TEXT_MAP_DIR) -> List[str]:
+    return sorted(d for d in os.listdir(text_map_dir) if os.path.isdir(os.path.join(text_map_dir, d)))
+
+
+def list_tables(text_map_dir: str, base_lang: str) -> List[str]:
+    base_dir = os.path.join(text_map_dir, base_lang)
+    return sorted(f[:-5] for f in os.listdir(base_dir) if f.endswith(".json"))
+
+
+def load_table(text_map_dir: str, lang: str, table: str) -> Dict[str, str]:
+    path = os.path.join(text_map_dir, lang, f"{table}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, dict) else {}
+
+
+def is_numbered_table(data: Dict[str, str]) -> bool:
+    """数字key的分表：key是各语言自己的行号，不能跨语言对齐"""
+    return bool(data) and all(key.isdigit() for key in data)
+
+
+def check_alignment(langs: Optional[List[str]] = None, text_map_dir: str = TEXT_MAP_DIR,
+                    probes=ALIGNMENT_PROBES, table: str = "MultiText") -> bool:
+    """检查已知key在每种语言里都取到了自己的文本；任何一种语言缺失或取回key名本身都算失败"""
+    langs = langs or list_languages(text_map_dir)
+    columns = {lang: load_table(text_map_dir, lang, table) for lang in langs}
+    present = [lang for lang in langs if columns[lang]]
+    if not present:
+        print(f"⚠️  没有任何语言有 {table}.json，无法检查对齐")
+        return False
+    ok = True
+    for probe in probes:
+        print(f"{probe}:")
+        for lang in present:
+            text = columns[lang].get(probe)
+            good = isinstance(text, str) and text.strip() and text != probe
+            ok = ok and bool(good)
+            print(f"  {'✅' if good else '❌'} {lang:8s} {text if good else '(缺失)'}")
+    return ok
+
+
+def load_speaker_keys(config_dir: str = CONFIG_DIR) -> Dict[str, str]:
+    """从 FlowState 建立 对话文本key -> 说话人文本key 的映射；没有 FlowState 时返回空表"""
+    try:
+        flow_states = load_config("FlowState", config_dir)
+    except FileNotFoundError:
+        return {}
+    speakers = {}
+    for flow in flow_states:
+        try:
+            actions = json.loads(flow["Actions"])
+        except (KeyError, TypeError, json.JSONDecodeError):
+            continue
+        for action in actions:
+            for talk in (action.get("Params") or {}).get("TalkItems") or []:
+                if "TidTalk" in talk and "WhoId" in talk:
+                    speakers[talk["TidTalk"]] = f"Speaker_{talk['WhoId']}_Name"
+    return speakers
+
+
+def escape_cell(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\r", "\\r").replace("\n", "\\n")
+
+
+def build_parallel_corpus(langs: Optional[List[str]] = None, base_lang: str = DEFAULT_LANG,
+                          text_map_dir: str = TEXT_MAP_DIR, config_dir: str = CONFIG_DIR,
+                          output_dir: str = DEFAULT_OUTPUT_DIR, output_format: str = "tsv") -> dict:
+    print("=== 多语言平行语料 ===")
+    start = time.time()
+    langs = langs or list_languages(text_map_dir)
+    # 基准语言放在第一列
+    langs = [base_lang] + [lang for lang in langs if lang != base_lang]
+    tables = list_tables(text_map_dir, base_lang)
+    unaligned = {}
+    speaker_keys = load_speaker_keys(config_dir)
+    print(f"语言: {', '.join(langs)}")
+    print(f"表: {len(tables)}，说话人映射: {len(speaker_keys):,}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"corpus.{output_format}")
+    total = 0
+    filled = defaultdict(int)
+    table_stats = {}
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        if output_format == "tsv":
+            out.write("\t".join(["key", "table", "speaker"] + langs) + "\n")
+
+        for table in tables:
+            base = load_table(text_map_dir, base_lang, table)
+            if not base:
+                continue
+            if is_numbered_table(base):
+                unaligned[table] = len(base)
+                continue
+            columns = [base] + [load_table(text_map_dir, lang, table) for lang in langs[1:]]
+            table_total = 0
+            table_filled = defaultdict(int)
+
+            for raw_key, base_text in base.items():
+                if not isinstance(base_text, str) or not base_text.strip():
+                    continue
+                texts = [column.get(raw_key) or "" for column in columns]
+                if KEY_LIKE_REGEX.match(base_text) and all(t in ("", base_text) for t in texts):
+                    continue
+                key = raw_key
+
+                speaker = ""
+                speaker_key = speaker_keys.get(raw_key)
+                if speaker_key:
+                    speaker = base.get(speaker_key) or ""
+
+                table_total += 1
+                for lang, text in zip(langs, texts):
+                    if text.strip():
+                        table_filled[lang] += 1
+
+                if output_format == "tsv":
+                    out.write("\t".join([escape_cell(key), table, escape_cell(speaker)]
+                                        + [escape_cell(t) for t in texts]) + "\n")
+                else:
+                    record = {"key": key, "table": table, "speaker": speaker}
+                    record.update({lang: text for lang, text in zip(langs, texts)})
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            total += table_total
+            for lang, count in table_filled.items():
+                filled[lang] += count
+            table_stats[table] = {"rows": table_total, **{lang: table_filled[lang] for lang in langs}}
+
+    coverage = {
+        "base_lang": base_lang,
+        "rows": total,
+        "languages": {lang: {"filled": filled[lang], "coverage": round(filled[lang] / total, 4) if total else 0.0}
+                      for lang in langs},
+        "tables": table_stats,
+        "unaligned": unaligned,
+    }
+    if "MultiText" in table_stats:
+        coverage["aligned_probes"] = check_alignment(langs, text_map_dir)
+    with open(os.path.join(output_dir, "coverage.json"), "w", encoding="utf-8") as f:
+        json.dump(coverage, f, ensure_ascii=False, indent=1)
+
+    if unaligned:
+        print(f"⚠️  跳过 {len(unaligned)} 张数字key分表（{sum(unaligned.values()):,} 行），各语言行号不对应，无法对齐")
+    if not table_stats:
+        print(f"⚠️  {base_lang} 下没有字符串key的表（MultiText.json），语料为空")
+    print(f"对齐文本: {total:,} 条 -> {output_path}")
+    print("语言覆盖率:")
+    for lang in langs:
+        print(f"  {lang:8s} {filled[lang]:>8,}  {coverage['languages'][lang]['coverage'] * 100:5.1f}%")
+    print(f"✅ 完成 ({time.time() - start:.2f}s)")
+    return coverage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按文本key对齐所有语言的TextMap")
+    parser.add_argument("--base", default=DEFAULT_LANG, help="基准语言，只输出基准语言有文本的key")
+    parser.add_argument("--langs", nargs="+", help="要对齐的语言，默认TextMap下全部语言")
+    parser.add_argument("--text-map-dir", default=TEXT_MAP_DIR)
+    parser.add_argument("--config-dir", default=CONFIG_DIR)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--format", choices=["tsv", "jsonl"], default="tsv")
+    parser.add_argument("--check", action="store_true", help="只检查 --probe 的key在各语言是否对齐")
+    parser.add_argument("--probe", nargs="+", default=list(ALIGNMENT_PROBES))
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check_alignment(args.langs, args.text_map_dir, args.probe) else 1)
+    build_parallel_corpus(args.langs, args.base, args.text_map_dir, args.config_dir, args.output_dir, args.format)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务进度图 - 任务前置关系、任务→剧情Flow关系的一次性构建与快速查询
+
+数据来源:
+  QuestData.json           ProvideType.Conditions 中的 PreQuest / PreChildQuest 前置条件，
+                           ChapterId，以及任务数据里出现的所有 Flow
+  QuestTreeNode.json       主线任务树 PreNode -> 节点 的先后关系
+  PlotHandBookConfig.json  剧情回顾中任务包含的 Flow（按剧情顺序）
+  QuestNodeData.json       子任务节点中的 Flow（文件存在时才使用）
+
+构建结果保存为 quest_graph.json:
+  quests       任务id（按id排序，下标即内部编号）
+  chapter_ids  任务所属章节（QuestChapter的Id，没有为0）
+  story_rank   拓扑排序后的剧情顺序
+  pre_offsets / pre_targets  前置任务的CSR邻接表（存的是内部编号）
+  flow_names   所有Flow名称
+  flow_offsets / flow_targets  任务 -> Flow 的CSR邻接表
+
+用法:
+  python quest_graph.py build
+  python quest_graph.py order [章节id]
+  python quest_graph.py flows <章节id>
+  python quest_graph.py ancestors <任务id>
+  python quest_graph.py descendants <任务id>
+  python quest_graph.py sort-dialogs [输入] [输出]   按剧情顺序重排 complete_final 对话
+"""
+
+import heapq
+import json
+import os
+import sys
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from game_data import CONFIG_DIR, load_config
+
+DEFAULT_GRAPH = "WutheringDialog/data/quest_graph.json"
+SOURCE_TABLES = ("QuestData", "QuestTreeNode", "PlotHandBookConfig", "QuestNodeData")
+
+
+def _walk_flows(obj, found: List[str]):
+    """递归收集任务数据中所有 {"FlowListName": ...} 的Flow名称"""
+    if isinstance(obj, dict):
+        flow_name = obj.get("FlowListName")
+        if flow_name:
+            found.append(flow_name)
+        for value in obj.values():
+            _walk_flows(value, found)
+    elif isinstance(obj, list):
+        for value in obj:
+            _walk_flows(value, found)
+
+
+def _to_csr(lists: List[List[int]]):
+    offsets = [0]
+    targets = []
+    for items in lists:
+        targets.extend(items)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def build_quest_graph(config_dir: str = CONFIG_DIR, output_path: str = DEFAULT_GRAPH) -> "QuestGraph":
+    """读取配置表，建立前置边和Flow边，拓扑排序后保存"""
+    print("=== 构建任务进度图 ===")
+    quests = {}
+    prerequisites = defaultdict(list)
+    flows = defaultdict(list)
+
+    # 1. QuestData: 前置条件、章节、任务内出现的Flow
+    for row in load_config("QuestData", config_dir):
+        try:
+            data = json.loads(row["Data"])
+        except (json.JSONDecodeError, TypeError):
+            continue
+        quest_id = data.get("Id", row.get("QuestId"))
+        quests[quest_id] = data.get("ChapterId", 0) or 0
+
+        for condition in (data.get("ProvideType") or {}).get("Conditions") or []:
+            if condition.get("Type") == "PreQuest" and condition.get("PreQuest"):
+                prerequisites[quest_id].append(condition["PreQuest"])
+            elif condition.get("Type") == "PreChildQuest":
+                pre_quest = (condition.get("PreChildQuest") or {}).get("QuestId")
+                if pre_quest:
+                    prerequisites[quest_id].append(pre_quest)
+        _walk_flows(data, flows[quest_id])
+
+    # 2. QuestTreeNode: 主线任务树的节点顺序
+    tree_nodes = {node["Id"]: node for node in load_config("QuestTreeNode", config_dir)}
+    for node in tree_nodes.values():
+        for pre_node_id in node.get("PreNode") or []:
+            pre_node = tree_nodes.get(pre_node_id)
+            if not pre_node:
+                continue
+            for quest_id in node.get("QuestArray") or []:
+                prerequisites[quest_id].extend(pre_node.get("QuestArray") or [])
+
+    # 3. PlotHandBookConfig: 剧情回顾中的Flow（剧情顺序，排在最前）
+    for row in load_config("PlotHandBookConfig", config_dir):
+        found = []
+        try:
+            _walk_flows(json.loads(row.get("Data") or "[]"), found)
+        except json.JSONDecodeError:
+            continue
+        flows[row["QuestId"]] = found + flows[row["QuestId"]]
+
+    # 4. QuestNodeData: 子任务节点中的Flow（可选）
+    try:
+        for row in load_config("QuestNodeData", config_dir):
+            try:
+                quest_id = int(row.get("Key", "").split("_")[0])
+                _walk_flows(json.loads(row.get("Data") or "{}"), flows[quest_id])
+            except (ValueError, json.JSONDecodeError):
+                continue
+    except FileNotFoundError:
+        print("ℹ️  QuestNodeData.json 不存在，跳过子任务节点的Flow")
+
+    # 只出现在前置条件或剧情回顾里的任务也要有节点
+    for quest_id in list(prerequisites) + list(flows):
+        quests.setdefault(quest_id, 0)
+    for pres in list(prerequisites.values()):
+        for pre in pres:
+            quests.setdefault(pre, 0)
+
+    quest_ids = sorted(quests)
+    index = {quest_id: i for i, quest_id in enumerate(quest_ids)}
+    pre_lists = [sorted({index[p] for p in prerequisites.get(q, []) if p != q}) for q in quest_ids]
+
+    flow_index: Dict[str, int] = {}
+    flow_lists = []
+    for quest_id in quest_ids:
+        seen = []
+        for flow_name in flows.get(quest_id, []):
+            idx = flow_index.setdefault(flow_name, len(flow_index))
+            if idx not in seen:
+                seen.append(idx)
+        flow_lists.append(seen)
+
+    pre_offsets, pre_targets = _to_csr(pre_lists)
+    flow_offsets, flow_targets = _to_csr(flow_lists)
+    graph = QuestGraph({
+        "version": 1,
+        "quests": quest_ids,
+        "chapter_ids": [quests[q] for q in quest_ids],
+        "story_rank": [],
+        "pre_offsets": pre_offsets,
+        "pre_targets": pre_targets,
+        "flow_names": list(flow_index),
+        "flow_offsets": flow_offsets,
+        "flow_targets": flow_targets,
+    })
+    graph.story_rank = graph._topological_rank()
+
+    graph.save(output_path)
+    print(f"任务: {len(quest_ids):,}，前置边: {len(pre_targets):,}，Flow: {len(flow_index):,}，任务-Flow边: {len(flow_targets):,}")
+    print(f"✅ 已保存: {output_path}")
+    return graph
+
+
+class QuestGraph:
+    """quest_graph.json 的内存视图，所有查询都基于整数下标"""
+
+    def __init__(self, data: dict):
+        self.quests: List[int] = data["quests"]
+        self.chapter_ids: List[int] = data["chapter_ids"]
+        self.story_rank: List[int] = data["story_rank"]
+        self.pre_offsets: List[int] = data["pre_offsets"]
+        self.pre_targets: List[int] = data["pre_targets"]
+        self.flow_names: List[str] = data["flow_names"]
+        self.flow_offsets: List[int] = data["flow_offsets"]
+        self.flow_targets: List[int] = data["flow_targets"]
+
+        self.index = {quest_id: i for i, quest_id in enumerate(self.quests)}
+        # 反向边（后续任务）在加载时计算，不占用文件空间
+        self.post_lists: List[List[int]] = [[] for _ in self.quests]
+        for i in range(len(self.quests)):
+            for pre in self.pre_targets[self.pre_offsets[i]:self.pre_offsets[i + 1]]:
+                self.post_lists[pre].append(i)
+        self.flow_to_quests: Dict[str, List[int]] = defaultdict(list)
+        for i in range(len(self.quests)):
+            for flow_idx in self.flow_targets[self.flow_offsets[i]:self.flow_offsets[i + 1]]:
+                self.flow_to_quests[self.flow_names[flow_idx]].append(self.quests[i])
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GRAPH) -> "QuestGraph":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def load_or_build(cls, path: str = DEFAULT_GRAPH, config_dir: str = CONFIG_DIR) -> "QuestGraph":
+        """图文件不存在或比配置表旧时重新构建"""
+        if os.path.exists(path):
+            graph_mtime = os.path.getmtime(path)
+            sources = [os.path.join(config_dir, f"{table}.json") for table in SOURCE_TABLES]
+            if all(not os.path.exists(s) or os.path.getmtime(s) <= graph_mtime for s in sources):
+                return cls.load(path)
+        return build_quest_graph(config_dir, path)
+
+    def save(self, path: str = DEFAULT_GRAPH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": 1,
+            "quests": self.quests,
+            "chapter_ids": self.chapter_ids,
+            "story_rank": self.story_rank,
+            "pre_offsets": self.pre_offsets,
+            "pre_targets": self.pre_targets,
+            "flow_names": self.flow_names,
+            "flow_offsets": self.flow_offsets,
+            "flow_targets": self.flow_targets,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _topological_rank(self) -> List[int]:
+        """Kahn拓扑排序，同层按 (章节, 任务id) 排序；环上的任务按id顺序接在最后"""
+        in_degree = [self.pre_offsets[i + 1] - self.pre_offsets[i] for i in range(len(self.quests))]
+        heap = [(self.chapter_ids[i], self.quests[i], i) for i, d in enumerate(in_degree) if d == 0]
+        heapq.heapify(heap)
+        rank = [-1] * len(self.quests)
+        order = 0
+        while heap:
+            _, _, i = heapq.heappop(heap)
+            rank[i] = order
+            order += 1
+            for post in self.post_lists[i]:
+                in_degree[post] -= 1
+                if in_degree[post] == 0:
+                    heapq.heappush(heap, (self.chapter_ids[post], self.quests[post], post))
+        for i in sorted((i for i, r in enumerate(rank) if r < 0), key=lambda i: self.quests[i]):
+            rank[i] = order
+            order += 1
+        return rank
+
+    def _walk(self, quest_id: int, upward: bool) -> List[int]:
+        start = self.index.get(quest_id)
+        if start is None:
+            return []
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            nexts = self.pre_targets[self.pre_offsets[i]:self.pre_offsets[i + 1]] if upward else self.post_lists[i]
+            for j in nexts:
+                if j not in seen:
+                    seen.add(j)
+                    queue.append(j)
+        seen.discard(start)
+        return [self.quests[i] for i in sorted(seen, key=lambda i: self.story_rank[i])]
+
+    # ---------- 查询 ----------
+
+    def __contains__(self, quest_id: int) -> bool:
+        return quest_id in self.index
+
+    def rank_of(self, quest_id: int) -> Optional[int]:
+        i = self.index.get(quest_id)
+        return None if i is None else self.story_rank[i]
+
+    def chapter_of(self, quest_id: int) -> Optional[int]:
+        i = self.index.get(quest_id)
+        return (self.chapter_ids[i] or None) if i is not None else None
+
+    def prerequisites(self, quest_id: int) -> List[int]:
+        i = self.index.get(quest_id)
+        if i is None:
+            return []
+        return [self.quests[j] for j in self.pre_targets[self.pre_offsets[i]:self.pre_offsets[i + 1]]]
+
+    def ancestors(self, quest_id: int) -> List[int]:
+        """所有直接或间接的前置任务，按剧情顺序"""
+        return self._walk(quest_id, upward=True)
+
+    def descendants(self, quest_id: int) -> List[int]:
+        """所有直接或间接依赖该任务的后续任务，按剧情顺序"""
+        return self._walk(quest_id, upward=False)
+
+    def story_order(self, chapter_id: Optional[int] = None) -> List[int]:
+        """按剧情顺序排列的任务id，可限定章节"""
+        indexes = range(len(self.quests))
+        if chapter_id is not None:
+            indexes = [i for i in indexes if self.chapter_ids[i] == chapter_id]
+        return [self.quests[i] for i in sorted(indexes, key=lambda i: self.story_rank[i])]
+
+    def flows_of(self, quest_id: int) -> List[str]:
+        i = self.index.get(quest_id)
+        if i is None:
+            return []
+        return [self.flow_names[f] for f in self.flow_targets[self.flow_offsets[i]:self.flow_offsets[i + 1]]]
+
+    def chapter_flows(self, chapter_id: int) -> List[str]:
+        """某章节包含的所有Flow，按剧情顺序去重"""
+        result = []
+        seen = set()
+        for quest_id in self.story_order(chapter_id):
+            for flow_name in self.flows_of(quest_id):
+                if flow_name not in seen:
+                    seen.add(flow_name)
+                    result.append(flow_name)
+        return result
+
+    def quests_of_flow(self, flow_name: str) -> List[int]:
+        return self.flow_to_quests.get(flow_name, [])
+
+    def flow_rank(self, flow_name: str) -> Optional[int]:
+        """Flow所属任务中最靠前的剧情顺序，用于按叙事顺序排列对话"""
+        ranks = [self.rank_of(q) for q in self.quests_of_flow(flow_name)]
+        return min(ranks) if ranks else None
+
+
+def sort_dialogs(graph: QuestGraph, input_file: str, output_file: str):
+    """按任务的剧情顺序重排 complete_final 对话，未映射任务的对话保持原顺序排在最后"""
+    with open(input_file, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+
+    def sort_key(item):
+        position, line = item
+        quest_id = json.loads(line).get("quest_id")
+        rank = graph.rank_of(quest_id) if quest_id is not None else None
+        return (rank is None, rank if rank is not None else 0, position)
+
+    ordered = sorted(enumerate(lines), key=sort_key)
+    with open(output_file, "w", encoding="utf-8") as f:
+        for _, line in ordered:
+            f.write(line if line.endswith("\n") else line + "\n")
+    print(f"✅ 已按剧情顺序写出 {len(ordered):,} 条对话: {output_file}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "build":
+        build_quest_graph()
+    elif command == "order":
+        graph = QuestGraph.load_or_build()
+        chapter = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        for quest_id in graph.story_order(chapter):
+            print(quest_id)
+    elif command == "flows" and len(sys.argv) > 2:
+        for flow_name in QuestGraph.load_or_build().chapter_flows(int(sys.argv[2])):
+            print(flow_name)
+    elif command in ("ancestors", "descendants") and len(sys.argv) > 2:
+        graph = QuestGraph.load_or_build()
+        quest_id = int(sys.argv[2])
+        result = graph.ancestors(quest_id) if command == "ancestors" else graph.descendants(quest_id)
+        print(f"{quest_id} 的{'前置' if command == 'ancestors' else '后续'}任务 ({len(result)}):")
+        for q in result:
+            print(f"  {q} (章节: {graph.chapter_of(q) or '-'})")
+    elif command == "sort-dialogs":
+        input_file = sys.argv[2] if len(sys.argv) > 2 else "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+        output_file = sys.argv[3] if len(sys.argv) > 3 else "WutheringDialog/data/dialogs_zh-Hans.story_order.jsonl"
+        sort_dialogs(QuestGraph.load_or_build(), input_file, output_file)
+    else:
+        print("用法: python quest_graph.py [build|order [章节id]|flows <章节id>|ancestors <任务id>|descendants <任务id>|sort-dialogs [输入] [输出]]")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务层级索引 - 任务 → (章节, 幕, 小节) 的一次性构建与O(1)查询
+
+数据来源:
+  QuestData.json         任务名/描述的TextMap key（TidName / TidDesc）、ChapterId、任务类型
+  QuestChapter.json      章节文本key（ChapterNum / ActName / ChapterName / SectionNum）
+                         注意部分章节的key带后缀（QuestChapter_8_ChapterNum_new），不能按规则拼接
+  QuestType.json         任务类型 -> 主类型
+  QuestMainType.json     主类型名称key
+  QuestTreeChapter.json  任务树章节（名称 / 地区）
+  QuestTreeNode.json     任务树节点包含的任务（QuestArray）
+  QuestReviewTab / QuestReviewTree / QuestReviewLine / QuestReviewNode
+                         剧情回顾：每个任务树章节下按顺序排列的回顾线和节点
+
+索引只保存TextMap的key，不保存文本，任何语言都可以使用。
+结果保存为 quest_hierarchy.json。
+
+QuestData 里只有约一成的任务配置了 ChapterId，其余任务的章节按以下顺序回退（chapter_source 记录来源）:
+  config  QuestData.ChapterId
+  tree    同一任务树节点、再沿 PreNode 向前的节点里，第一个配置了 ChapterId 的任务
+  parent  通过 Children / Reference / WeakReference 引用了本任务（q_<id>）的上级任务，逐级向上
+  range   旧版按 QuestId 区间推断的章节（LEGACY_CHAPTER_RANGES）
+coverage 命令对比旧版映射（ChapterId，否则区间）检查覆盖率有没有下降。
+
+用法:
+  python quest_hierarchy.py build
+  python quest_hierarchy.py show <任务id>
+  python quest_hierarchy.py review <任务树章节id>
+  python quest_hierarchy.py coverage
+"""
+
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+from game_data import CONFIG_DIR, load_config
+
+DEFAULT_HIERARCHY = "WutheringDialog/data/quest_hierarchy.json"
+SOURCE_TABLES = ("QuestData", "QuestChapter", "QuestType", "QuestMainType", "QuestTreeChapter", "QuestTreeNode",
+                 "QuestReviewTab", "QuestReviewTree", "QuestReviewLine", "QuestReviewNode")
+CHAPTER_FIELDS = ("ChapterNum", "ActName", "ChapterName", "SectionNum")
+INDEX_VERSION = 2
+# 旧版 infer_chapter_id 的 QuestId 区间: (起, 止) -> ChapterId，只在其他来源都没有章节时使用
+LEGACY_CHAPTER_RANGES = (
+    (139000000, 140000000, 1),  # 世界之初
+    (135000000, 136000000, 2),  # 瑝珑第一章
+    (140000000, 141000000, 3),  # 其他章节
+    (114000000, 115000000, 2),  # 瑝珑第一章（吟霖线等）
+)
+QUEST_REFERENCE_FIELDS = ("Children", "Reference", "WeakReference")
+
+
+def legacy_chapter_id(quest_id: int) -> Optional[int]:
+    for start, end, chapter_id in LEGACY_CHAPTER_RANGES:
+        if start <= quest_id < end:
+            return chapter_id
+    return None
+
+
+def _quest_parents(quest_data: Dict[int, dict]) -> Dict[int, List[int]]:
+    """任务 -> 引用了它的上级任务（QuestData 中形如 "q_<id>" 的引用）"""
+    parents: Dict[int, List[int]] = {}
+    for quest_id, data in quest_data.items():
+        for field in QUEST_REFERENCE_FIELDS:
+            for ref in data.get(field) or []:
+                match = re.fullmatch(r"q_(\d+)", str(ref))
+                if match and int(match.group(1)) != quest_id:
+                    children = parents.setdefault(int(match.group(1)), [])
+                    if quest_id not in children:
+                        children.append(quest_id)
+    return parents
+
+
+def _resolve_chapters(quests: Dict[int, dict], tree_node_rows: Dict[int, dict],
+                      parents: Dict[int, List[int]], chapters: Dict[int, dict]):
+    """给没有配置 ChapterId 的任务补上章节，并记录来源"""
+    configured = {quest_id: quest["chapter_id"] for quest_id, quest in quests.items() if quest["chapter_id"]}
+
+    def from_tree(node_id):
+        seen = set()
+        while node_id and node_id in tree_node_rows and node_id not in seen:
+            seen.add(node_id)
+            node = tree_node_rows[node_id]
+            for quest_id in node.get("QuestArray") or []:
+                if quest_id in configured:
+                    return configured[quest_id]
+            node_id = (node.get("PreNode") or [None])[0]
+        return None
+
+    def from_parents(quest_id):
+        seen, pending = {quest_id}, list(parents.get(quest_id, ()))
+        while pending:
+            parent_id = pending.pop(0)
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+            if parent_id in configured:
+                return configured[parent_id]
+            pending.extend(parents.get(parent_id, ()))
+        return None
+
+    for quest_id, quest in quests.items():
+        if quest["chapter_id"]:
+            quest["chapter_source"] = "config"
+            continue
+        for source, chapter_id in (("tree", lambda: from_tree(quest["tree_node_id"])),
+                                   ("parent", lambda: from_parents(quest_id)),
+                                   ("range", lambda: legacy_chapter_id(quest_id))):
+            chapter_id = chapter_id()
+            if chapter_id in chapters:
+                quest["chapter_id"] = chapter_id
+                quest["chapter_source"] = source
+                break
+        else:
+            quest["chapter_source"] = None
+
+
+def _ordered_review_nodes(line: dict, nodes: Dict[int, dict]) -> List[int]:
+    """沿 StartNodeId -> SuccessorNodeId 走一条回顾线（遇到环或其他线的节点就停下）"""
+    ordered = []
+    node_id = line.get("StartNodeId")
+    while node_id and node_id in nodes and node_id not in ordered \
+            and nodes[node_id].get("QuestLine") == line["Id"]:
+        ordered.append(node_id)
+        node_id = nodes[node_id].get("SuccessorNodeId")
+    # 没有被串起来的节点按 PosIndex 接在后面
+    rest = sorted((n for n in nodes.values() if n.get("QuestLine") == line["Id"] and n["Id"] not in ordered),
+                  key=lambda n: (n.get("PosIndex", 0), n["Id"]))
+    return ordered + [n["Id"] for n in rest]
+
+
+def build_quest_hierarchy(config_dir: str = CONFIG_DIR, output_path: str = DEFAULT_HIERARCHY) -> "QuestHierarchy":
+    print("=== 构建任务层级索引 ===")
+
+    def optional(table):
+        try:
+            return load_config(table, config_dir)
+        except FileNotFoundError:
+            return []
+
+    chapters = {row["Id"]: {field.lower(): row.get(field) or None for field in CHAPTER_FIELDS}
+                for row in load_config("QuestChapter", config_dir)}
+    main_type_names = {row["Id"]: row.get("MainTypeName") for row in optional("QuestMainType")}
+    type_main = {row["Id"]: row.get("MainId") for row in optional("QuestType")}
+    tree_chapters = {row["Id"]: {"name": row.get("Name"), "region": row.get("RegionName")}
+                     for row in optional("QuestTreeChapter")}
+
+    tree_nodes = {}
+    tree_node_rows = {}
+    quest_tree_node = {}
+    for row in optional("QuestTreeNode"):
+        tree_nodes[row["Id"]] = {"chapter_id": row.get("ChapterId"), "name": row.get("Name")}
+        tree_node_rows[row["Id"]] = row
+        for quest_id in row.get("QuestArray") or []:
+            quest_tree_node.setdefault(quest_id, row["Id"])
+
+    quests = {}
+    quest_data = {}
+    for row in load_config("QuestData", config_dir):
+        try:
+            data = json.loads(row["Data"])
+        except (KeyError, TypeError, json.JSONDecodeError):
+            continue
+        quest_id = data["Id"]
+        quest_data[quest_id] = data
+        quests[quest_id] = {
+            "name": data.get("TidName") or None,
+            "desc": data.get("TidDesc") or None,
+            "main_type": main_type_names.get(type_main.get(data.get("Type"), data.get("Type"))),
+            "chapter_id": data.get("ChapterId") if data.get("ChapterId") in chapters else None,
+            "tree_node_id": quest_tree_node.get(quest_id),
+        }
+    # 只出现在任务树里的任务（QuestData 中没有）也保留层级
+    for quest_id, node_id in quest_tree_node.items():
+        quests.setdefault(quest_id, {"name": None, "desc": None, "main_type": None,
+                                     "chapter_id": None, "tree_node_id": node_id})
+    _resolve_chapters(quests, tree_node_rows, _quest_parents(quest_data), chapters)
+
+    review_nodes = {row["Id"]: row for row in optional("QuestReviewNode")}
+    review_lines = {row["Id"]: row for row in optional("QuestReviewLine")}
+    review_trees = {row["Id"]: row for row in optional("QuestReviewTree")}
+    reviews = {}
+    for tab in optional("QuestReviewTab"):
+        tree = review_trees.get(tab.get("QuestTree"))
+        if tree is None:
+            continue
+        lines = [review_lines[line_id] for line_id in tree.get("QuestLines") or [] if line_id in review_lines]
+        lines.sort(key=lambda line: (line.get("DisplayOrder", 0), line["Id"]))
+        reviews[tab["QuestTree"]] = {
+            "tab_name": tab.get("TabName"),
+            "lines": [[{"title": review_nodes[n].get("Title"), "brief": review_nodes[n].get("Brief"),
+                        "desc": review_nodes[n].get("Desc")} for n in _ordered_review_nodes(line, review_nodes)]
+                      for line in lines],
+        }
+
+    hierarchy = QuestHierarchy({"quests": quests, "chapters": chapters, "tree_chapters": tree_chapters,
+                                "tree_nodes": tree_nodes, "reviews": reviews})
+    hierarchy.save(output_path)
+    print(f"任务: {len(quests)}，章节: {len(chapters)}，任务树节点: {len(tree_nodes)}，剧情回顾: {len(reviews)}")
+    sources = {}
+    for quest in quests.values():
+        sources[quest["chapter_source"]] = sources.get(quest["chapter_source"], 0) + 1
+    print("章节来源: " + "，".join(f"{source or '无'} {count}" for source, count in sorted(
+        sources.items(), key=lambda item: -item[1])))
+    print(f"✅ 已保存: {output_path}")
+    return hierarchy
+
+
+class QuestHierarchy:
+    """quest_hierarchy.json 的内存视图"""
+
+    def __init__(self, data: dict):
+        # JSON 的key只能是字符串，加载时还原成int
+        self.quests: Dict[int, dict] = {int(k): v for k, v in data["quests"].items()}
+        self.chapters: Dict[int, dict] = {int(k): v for k, v in data["chapters"].items()}
+        self.tree_chapters: Dict[int, dict] = {int(k): v for k, v in data["tree_chapters"].items()}
+        self.tree_nodes: Dict[int, dict] = {int(k): v for k, v in data["tree_nodes"].items()}
+        self.reviews: Dict[int, dict] = {int(k): v for k, v in data["reviews"].items()}
+        self.version = data.get("version", INDEX_VERSION)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_HIERARCHY) -> "QuestHierarchy":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def load_or_build(cls, path: str = DEFAULT_HIERARCHY, config_dir: str = CONFIG_DIR) -> "QuestHierarchy":
+        """索引不存在、格式版本不同或比配置表旧时重新构建"""
+        if os.path.exists(path):
+            index_mtime = os.path.getmtime(path)
+            sources = [os.path.join(config_dir, f"{table}.json") for table in SOURCE_TABLES]
+            if all(not os.path.exists(s) or os.path.getmtime(s) <= index_mtime for s in sources):
+                hierarchy = cls.load(path)
+                if hierarchy.version == INDEX_VERSION:
+                    return hierarchy
+        return build_quest_hierarchy(config_dir, path)
+
+    def save(self, path: str = DEFAULT_HIERARCHY):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "quests": self.quests, "chapters": self.chapters,
+                       "tree_chapters": self.tree_chapters, "tree_nodes": self.tree_nodes, "reviews": self.reviews},
+                      f, ensure_ascii=False, indent=1)
+
+    def __contains__(self, quest_id: int) -> bool:
+        return quest_id in self.quests
+
+    def quest(self, quest_id: int) -> Optional[dict]:
+        return self.quests.get(quest_id)
+
+    def chapter_of(self, quest_id: int) -> Optional[int]:
+        """任务的章节（按 config / tree / parent / range 回退）；索引里没有的任务只按区间推断"""
+        quest = self.quests.get(quest_id)
+        if quest is None:
+            chapter_id = legacy_chapter_id(quest_id)
+            return chapter_id if chapter_id in self.chapters else None
+        return quest["chapter_id"]
+
+    def chapter(self, chapter_id: Optional[int]) -> Optional[dict]:
+        return self.chapters.get(chapter_id)
+
+    def path(self, quest_id: int) -> Optional[dict]:
+        """
+        任务的完整层级（全部是TextMap key，缺失为None）:
+          chapter  章节序号（ChapterNum），没有章节时用任务树章节名
+          act      幕名（ActName / ChapterName）
+          section  小节（SectionNum），没有时用任务名
+        """
+        quest = self.quests.get(quest_id)
+        if quest is None:
+            return None
+        chapter = self.chapters.get(quest["chapter_id"]) or {}
+        node = self.tree_nodes.get(quest["tree_node_id"]) or {}
+        tree_chapter = self.tree_chapters.get(node.get("chapter_id")) or {}
+        return {
+            "chapter": chapter.get("chapternum") or tree_chapter.get("name"),
+            "act": chapter.get("chaptername") or chapter.get("actname") or tree_chapter.get("region"),
+            "section": chapter.get("sectionnum") or quest["name"],
+            "quest_name": quest["name"],
+            "quest_desc": quest["desc"],
+            "main_type": quest["main_type"],
+            "chapter_id": quest["chapter_id"],
+            "tree_chapter_id": node.get("chapter_id"),
+            "tree_node": node.get("name"),
+        }
+
+    def review(self, tree_chapter_id: int) -> Optional[dict]:
+        return self.reviews.get(tree_chapter_id)
+
+    def coverage(self) -> dict:
+        """
+        与旧版映射（配置的 ChapterId，否则 QuestId 区间）逐个任务比较:
+          lost     旧版有章节、现在没有
+          changed  两边都有章节但不同
+          gained   旧版没有、现在有
+        """
+        report = {"baseline": 0, "current": 0, "lost": [], "changed": [], "gained": []}
+        for quest_id, quest in sorted(self.quests.items()):
+            if quest.get("chapter_source") == "config":
+                baseline = quest["chapter_id"]
+            else:
+                baseline = legacy_chapter_id(quest_id)
+                baseline = baseline if baseline in self.chapters else None
+            current = quest["chapter_id"]
+            report["baseline"] += baseline is not None
+            report["current"] += current is not None
+            if baseline and not current:
+                report["lost"].append(quest_id)
+            elif baseline and current != baseline:
+                report["changed"].append([quest_id, baseline, current, quest.get("chapter_source")])
+            elif current and not baseline:
+                report["gained"].append([quest_id, current, quest.get("chapter_source")])
+        return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "build":
+        build_quest_hierarchy()
+    elif command == "show" and len(sys.argv) > 2:
+        quest_path = QuestHierarchy.load_or_build().path(int(sys.argv[2]))
+        print(json.dumps(quest_path, ensure_ascii=False, indent=2) if quest_path else f"❌ 未知任务: {sys.argv[2]}")
+    elif command == "review" and len(sys.argv) > 2:
+        review = QuestHierarchy.load_or_build().review(int(sys.argv[2]))
+        print(json.dumps(review, ensure_ascii=False, indent=2) if review else f"❌ 没有剧情回顾: {sys.argv[2]}")
+    elif command == "coverage":
+        result = QuestHierarchy.load_or_build().coverage()
+        print(f"有章节的任务: 旧版映射 {result['baseline']}，当前 {result['current']}")
+        print(f"丢失 {len(result['lost'])}，不同 {len(result['changed'])}，新增 {len(result['gained'])}")
+        for quest_id in result["lost"]:
+            print(f"  丢失: {quest_id}")
+        for quest_id, baseline, current, source in result["changed"]:
+            print(f"  不同: {quest_id} 旧版 {baseline} -> {current} ({source})")
+        if result["lost"]:
+            sys.exit(1)
+    else:
+        print("用法: python quest_hierarchy.py [build|show <任务id>|review <任务树章节id>|coverage]")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RAG文档增量比对 - 只把真正变化的文档交给LightRAG重新embedding
+
+LightRAG按文档内容哈希判断是否需要重新embedding，split_rag_input.py 每次都会重写整个
+rag_input_split.jsonl。本脚本按 doc_id + 内容哈希 比较新旧两个版本，输出三个变更集:
+  added.jsonl    新增的文档（完整记录）
+  updated.jsonl  内容变化的文档（完整记录）
+  deleted.jsonl  已删除的文档（doc_id + 旧哈希）
+  summary.json   统计信息
+
+用法:
+  python rag_diff.py <新split文件> [已发布的split文件] [--output-dir DIR] [--publish]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+
+DEFAULT_PUBLISHED = "WutheringDialog/data/rag_input_split.published.jsonl"
+DEFAULT_OUTPUT_DIR = "WutheringDialog/data/rag_changes"
+
+
+def content_hash(text: str) -> str:
+    """与LightRAG一致，使用内容的md5作为哈希"""
+    return hashlib.md5(text.strip().encode("utf-8")).hexdigest()
+
+
+def iter_records(path: str) -> Iterator[Tuple[str, str, str]]:
+    """逐行读取JSONL，产出 (doc_id, 内容哈希, 原始行)"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️  {path} 第 {line_num} 行JSON解析错误，已跳过")
+                continue
+            doc_id = record.get("doc_id")
+            if not doc_id:
+                continue
+            yield doc_id, content_hash(record.get("text", "")), line
+
+
+def load_hashes(path: str) -> Dict[str, str]:
+    """只保留 doc_id -> 哈希，不在内存中保存旧文本"""
+    hashes = {}
+    if not os.path.exists(path):
+        return hashes
+    for doc_id, digest, _ in iter_records(path):
+        hashes[doc_id] = digest
+    return hashes
+
+
+def diff_rag_split(new_path: str, published_path: str = DEFAULT_PUBLISHED,
+                   output_dir: str = DEFAULT_OUTPUT_DIR) -> Dict[str, int]:
+    """比较新旧split文件，写出 add/update/delete 三个变更集"""
+    print("=== RAG文档增量比对 ===")
+    print(f"新文件: {new_path}")
+    print(f"已发布: {published_path}")
+
+    if not os.path.exists(new_path):
+        print(f"❌ 新文件不存在: {new_path}")
+        return {}
+
+    old_hashes = load_hashes(published_path)
+    if not old_hashes:
+        print("ℹ️  没有已发布版本，所有文档都视为新增")
+
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "duplicate": 0}
+    seen = set()
+
+    with open(os.path.join(output_dir, "added.jsonl"), "w", encoding="utf-8") as added, \
+         open(os.path.join(output_dir, "updated.jsonl"), "w", encoding="utf-8") as updated:
+        for doc_id, digest, line in iter_records(new_path):
+            if doc_id in seen:
+                # 重复的doc_id会让LightRAG互相覆盖，只保留第一条
+                stats["duplicate"] += 1
+                print(f"⚠️  重复的doc_id: {doc_id}")
+                continue
+            seen.add(doc_id)
+
+            old_digest = old_hashes.get(doc_id)
+            if old_digest is None:
+                added.write(line + "\n")
+                stats["added"] += 1
+            elif old_digest != digest:
+                updated.write(line + "\n")
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+
+    with open(os.path.join(output_dir, "deleted.jsonl"), "w", encoding="utf-8") as deleted:
+        for doc_id, digest in old_hashes.items():
+            if doc_id not in seen:
+                deleted.write(json.dumps({"doc_id": doc_id, "content_hash": digest}, ensure_ascii=False) + "\n")
+                stats["deleted"] += 1
+
+    summary = {
+        "new_file": new_path,
+        "published_file": published_path,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        **stats,
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"新增: {stats['added']:,}")
+    print(f"更新: {stats['updated']:,}")
+    print(f"删除: {stats['deleted']:,}")
+    print(f"未变化: {stats['unchanged']:,}")
+    if stats["duplicate"]:
+        print(f"⚠️  重复doc_id: {stats['duplicate']:,}")
+    print(f"变更集目录: {output_dir}")
+    return stats
+
+
+def publish(new_path: str, published_path: str = DEFAULT_PUBLISHED):
+    """把新文件登记为已发布版本，作为下次比对的基准"""
+    shutil.copy2(new_path, published_path)
+    print(f"✅ 已发布: {published_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG文档增量比对")
+    parser.add_argument("new_file")
+    parser.add_argument("published_file", nargs="?", default=DEFAULT_PUBLISHED)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--publish", action="store_true", help="比对完成后把新文件登记为已发布版本")
+    args = parser.parse_args()
+
+    result = diff_rag_split(args.new_file, args.published_file, args.output_dir)
+    if result and args.publish:
+        publish(args.new_file, args.published_file)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地BM25检索服务 - 不依赖外部LightRAG即可检索RAG文档
+
+数据源（默认每类文档只取一个来源，避免同一角色被索引多次而扭曲BM25统计）:
+  rag_input_split.jsonl                   角色（细粒度拆分后的版本）
+  final_output/output/<物品|武器|敌人|成就>  其余实体
+  dialogs_zh-Hans.complete_final.jsonl    处理后的对话
+显式传入多个来源时，按 doc_id 去重，先出现的为准。
+
+索引目录结构:
+  meta.json     文档表 (doc_id, 来源文件, 字节偏移, 文档长度, type/name/group) + 词表 (词项 -> 倒排起点, df)
+  postings.bin  倒排表，uint32 (文档序号, 词频) 交替存放，按词项连续排列
+
+用法:
+  python rag_search.py build [输入文件...]
+  python rag_search.py query "今州令尹" --type 角色 --top-k 5
+  python rag_search.py serve --port 8765
+      GET /search?q=今州令尹&type=角色&name=散华&group=战斗的记忆&k=5
+"""
+
+import argparse
+import glob
+import json
+import math
+import mmap
+import os
+import time
+from array import array
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from cjk_tokenizer import tokenize
+
+DEFAULT_INPUTS = [
+    "WutheringDialog/data/rag_input_split.jsonl",
+    "final_output/output/items.jsonl",
+    "final_output/output/weapons.jsonl",
+    "final_output/output/enemies.jsonl",
+    "final_output/output/achievements.jsonl",
+    "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl",
+]
+DEFAULT_INDEX_DIR = "WutheringDialog/data/rag_search.index"
+
+INDEX_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# split后的记录没有metadata，按doc_id前缀推断类型
+DOC_ID_PREFIX_TYPES = {
+    "character": "角色",
+    "item": "物品",
+    "weapon": "武器",
+    "enemy": "敌人",
+    "achievement": "成就",
+    "dialogue": "对话",
+}
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """展开通配符，去掉不存在的文件"""
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def infer_metadata(record: Dict) -> Dict[str, str]:
+    """取出用于过滤的 type/name/group 字段"""
+    metadata = record.get("metadata") or {}
+    doc_id = record.get("doc_id", "")
+    prefix, _, rest = doc_id.partition("_")
+
+    doc_type = metadata.get("type") or DOC_ID_PREFIX_TYPES.get(prefix, "")
+    name = metadata.get("name")
+    if name is None:
+        # split格式: {type}_{name}_{子标题}
+        name = rest.rsplit("_", 1)[0] if "_" in rest else rest
+    return {
+        "type": doc_type,
+        "name": str(name),
+        "group": str(metadata.get("group", "")),
+    }
+
+
+def build_search_index(inputs: List[str], index_dir: str = DEFAULT_INDEX_DIR) -> bool:
+    """扫描所有输入文件一次，写出紧凑的磁盘倒排索引"""
+    print("=== 建立BM25检索索引 ===")
+
+    sources = expand_inputs(inputs)
+    if not sources:
+        print(f"❌ 没有找到输入文件: {inputs}")
+        return False
+
+    start = time.time()
+    docs = []
+    seen_doc_ids = set()
+    term_postings = defaultdict(list)
+    total_length = 0
+
+    for source_idx, path in enumerate(sources):
+        count = 0
+        duplicates = 0
+        with open(path, "rb") as f:
+            offset = 0
+            for raw_line in f:
+                line_offset = offset
+                offset += len(raw_line)
+                try:
+                    record = json.loads(raw_line)
+                except json.JSONDecodeError:
+                    continue
+
+                text = record.get("text", "")
+                if not text:
+                    continue
+                doc_id = record.get("doc_id", "")
+                if doc_id:
+                    if doc_id in seen_doc_ids:
+                        duplicates += 1
+                        continue
+                    seen_doc_ids.add(doc_id)
+
+                tokens = tokenize(text)
+                doc_idx = len(docs)
+                meta = infer_metadata(record)
+                docs.append([doc_id, source_idx, line_offset, len(tokens),
+                             meta["type"], meta["name"], meta["group"]])
+                total_length += len(tokens)
+
+                for term, tf in Counter(tokens).items():
+                    term_postings[term].append((doc_idx, tf))
+                count += 1
+        print(f"  {path}: {count:,} 个文档" + (f"，跳过 {duplicates:,} 个重复doc_id" if duplicates else ""))
+
+    postings = array("I")
+    vocab = {}
+    for term in sorted(term_postings):
+        entries = term_postings[term]
+        vocab[term] = [len(postings) // 2, len(entries)]
+        for doc_idx, tf in entries:
+            postings.append(doc_idx)
+            postings.append(tf)
+
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, "postings.bin"), "wb") as f:
+        postings.tofile(f)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "sources": [os.path.abspath(p) for p in sources],
+        "avgdl": total_length / len(docs) if docs else 0.0,
+        "docs": docs,
+        "vocab": vocab,
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"✅ 已索引 {len(docs):,} 个文档，{len(vocab):,} 个词项")
+    print(f"倒排表大小: {os.path.getsize(os.path.join(index_dir, 'postings.bin')):,} bytes")
+    print(f"耗时: {time.time() - start:.2f}s")
+    return True
+
+
+class RagSearchIndex:
+    """BM25检索器 - 倒排表通过mmap按需读取"""
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"索引版本不匹配: {meta.get('version')}，请重新运行 build")
+
+        self.sources = meta["sources"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self.docs = meta["docs"]
+        self.vocab = meta["vocab"]
+
+        postings_path = os.path.join(index_dir, "postings.bin")
+        self._postings_file = open(postings_path, "rb")
+        if os.path.getsize(postings_path) > 0:
+            self._mmap = mmap.mmap(self._postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.postings = memoryview(self._mmap).cast("I")
+        else:
+            self._mmap = None
+            self.postings = memoryview(array("I"))
+
+    def close(self):
+        self.postings.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._postings_file.close()
+
+    def _accept(self, doc, doc_type, name, group) -> bool:
+        if doc_type is not None and doc[4] != doc_type:
+            return False
+        if name is not None and doc[5] != name:
+            return False
+        if group is not None and doc[6] != group:
+            return False
+        return True
+
+    def search(self, query: str, top_k: int = 10, doc_type: Optional[str] = None,
+               name: Optional[str] = None, group: Optional[str] = None) -> List[Dict]:
+        """BM25打分，metadata过滤后返回前top_k个文档"""
+        n_docs = len(self.docs)
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            entry = self.vocab.get(term)
+            if not entry:
+                continue
+            start, df = entry
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for i in range(start * 2, (start + df) * 2, 2):
+                doc_idx = self.postings[i]
+                doc = self.docs[doc_idx]
+                if not self._accept(doc, doc_type, name, group):
+                    continue
+                tf = self.postings[i + 1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc[3] / self.avgdl)
+                scores[doc_idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [dict(self.read_document(doc_idx), score=round(score, 4)) for doc_idx, score in ranked]
+
+    def read_document(self, doc_idx: int) -> Dict:
+        """按偏移量从源文件读回原始记录"""
+        doc = self.docs[doc_idx]
+        with open(self.sources[doc[1]], "rb") as f:
+            f.seek(doc[2])
+            return json.loads(f.readline())
+
+
+def make_handler(index: RagSearchIndex):
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                self.send_error(404, "only /search is supported")
+                return
+
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            query = params.get("q", "")
+            try:
+                top_k = int(params.get("k", 10))
+            except ValueError:
+                self.send_error(400, "k must be an integer")
+                return
+
+            start = time.time()
+            results = index.search(query, top_k, params.get("type"), params.get("name"), params.get("group"))
+            body = json.dumps({
+                "query": query,
+                "took_ms": round((time.time() - start) * 1000, 2),
+                "results": results,
+            }, ensure_ascii=False).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return SearchHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地BM25检索服务")
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_parser = subparsers.add_parser("build", help="建立索引")
+    build_parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS)
+    build_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+
+    query_parser = subparsers.add_parser("query", help="命令行检索")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    query_parser.add_argument("--top-k", type=int, default=10)
+    query_parser.add_argument("--type")
+    query_parser.add_argument("--name")
+    query_parser.add_argument("--group")
+
+    serve_parser = subparsers.add_parser("serve", help="启动本地HTTP检索服务")
+    serve_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_search_index(args.inputs, args.index_dir)
+    elif args.command == "query":
+        index = RagSearchIndex(args.index_dir)
+        start = time.time()
+        results = index.search(args.query, args.top_k, args.type, args.name, args.group)
+        took = time.time() - start
+        for result in results:
+            preview = result.get("text", "").replace("\n", " ")[:80]
+            print(f"[{result['score']:.3f}] {result.get('doc_id')}: {preview}")
+        print(f"\n命中 {len(results)} 条，耗时 {took * 1000:.1f}ms")
+        index.close()
+    elif args.command == "serve":
+        index = RagSearchIndex(args.index_dir)
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        print(f"🔍 检索服务已启动: http://{args.host}:{args.port}/search?q=...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n检索服务已停止")
+        finally:
+            server.server_close()
+            index.close()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+富文本标记清洗 - 各 extract_* 脚本共用的 clean_text
+
+游戏文本中的标记:
+  <te href=ID>词</te>        术语链接
+  <ano=注音>词</ano>         注音（日文版的振假名）
+  <color=#59b4d3>词</color>  颜色
+  <size=20>词</size>         字号
+  <br>                       换行
+  以及 <b> <u> <i> <s> <subnode> <a> 等
+
+原来每个脚本对每个字符串跑好几遍 re.sub，每一遍都生成一个新字符串。
+这里用一个编译好的正则一次扫描完成全部替换，并对结果做缓存（角色故事、心声、
+物品描述里有大量重复文本）。
+"""
+
+import re
+from functools import lru_cache
+
+TAG_REGEX = re.compile(r"<(/?)([A-Za-z]+)([^>]*)>")
+
+
+@lru_cache(maxsize=65536)
+def _normalize(text: str, keep_annotations: bool) -> str:
+    readings = []
+
+    def replace(match):
+        closing, tag, attrs = match.groups()
+        tag = tag.lower()
+        if tag == "br":
+            return "\n"
+        if tag == "ano" and keep_annotations:
+            if not closing:
+                readings.append(attrs.lstrip("= ").strip())
+                return ""
+            if readings:
+                reading = readings.pop()
+                return f"({reading})" if reading else ""
+        return ""
+
+    return TAG_REGEX.sub(replace, text).strip()
+
+
+def clean_text(text, keep_annotations: bool = False) -> str:
+    """
+    去掉富文本标记，<br> 转成换行。
+    keep_annotations=True 时保留注音，例如 "<ano=タンツー>糖醋</ano>" -> "糖醋(タンツー)"
+    """
+    if not isinstance(text, str):
+        return ""
+    if "<" not in text:
+        return text.strip()
+    return _normalize(text, keep_annotations)
+
+
+if __name__ == "__main__":
+    samples = [
+        "隶属于<te href=12>今州</te>边庭的<color=#59b4d3>令尹近卫</color>。<br>第二行",
+        "<ano=タンツー>糖醋</ano>タレ",
+    ]
+    for sample in samples:
+        print(repr(clean_text(sample)), repr(clean_text(sample, keep_annotations=True)))
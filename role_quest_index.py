@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+角色任务索引 - 把 RoleQuest、RoleInfo、QuestData 和 任务→Flow 关系一次性连接起来
+
+数据来源:
+  QuestData.json    Type=3（角色任务）的任务，以及其中的 RoleId 别名（"yinlin" ...）和 ChapterId
+  RoleQuest.json    RoleId -> QuestId -> QuestName
+  RoleInfo.json     RoleId -> 角色名key（RoleInfo_<id>_Name）
+  quest_graph.json  任务包含的Flow（quest_graph.py）
+
+RoleQuest 和 QuestData 同时出现的任务可以学到 别名 -> RoleId 的对应关系（yinlin -> 1302），
+同一别名的其他角色任务也能关联到角色。新版本加入的角色任务不需要手动维护分类表。
+
+索引只保存TextMap的key，不保存文本，任何语言都可以使用:
+  quests  {任务id: {"role_id", "role_alias", "role_name_key", "quest_name_key", "chapter_id"}}
+  flows   {Flow名称: 任务id}
+
+用法:
+  python role_quest_index.py build
+  python role_quest_index.py show <Flow名称|任务id>
+"""
+
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+from game_data import CONFIG_DIR, load_config
+from quest_graph import DEFAULT_GRAPH, QuestGraph
+
+DEFAULT_INDEX = "WutheringDialog/data/role_quest_index.json"
+SOURCE_TABLES = ("QuestData", "RoleQuest", "RoleInfo")
+ROLE_QUEST_TYPE = 3
+
+
+def build_role_quest_index(config_dir: str = CONFIG_DIR, output_path: str = DEFAULT_INDEX,
+                           graph_path: str = DEFAULT_GRAPH) -> "RoleQuestIndex":
+    print("=== 构建角色任务索引 ===")
+    role_names = {role["Id"]: role["Name"] for role in load_config("RoleInfo", config_dir)}
+    role_quest_rows = {row["QuestId"]: row for row in load_config("RoleQuest", config_dir)}
+
+    quest_data = {}
+    for row in load_config("QuestData", config_dir):
+        try:
+            data = json.loads(row["Data"])
+        except (KeyError, TypeError, json.JSONDecodeError):
+            continue
+        quest_data[data["Id"]] = data
+
+    # 同一个任务既有 RoleQuest.RoleId 又有 QuestData.RoleId 别名时，记下别名对应的角色
+    alias_roles: Dict[str, int] = {}
+    for quest_id, row in role_quest_rows.items():
+        alias = (quest_data.get(quest_id) or {}).get("RoleId")
+        if isinstance(alias, str) and row["RoleId"] in role_names:
+            alias_roles[alias] = row["RoleId"]
+
+    quest_ids = set(role_quest_rows)
+    quest_ids.update(quest_id for quest_id, data in quest_data.items() if data.get("Type") == ROLE_QUEST_TYPE)
+
+    quests = {}
+    for quest_id in sorted(quest_ids):
+        data = quest_data.get(quest_id) or {}
+        row = role_quest_rows.get(quest_id) or {}
+        alias = data.get("RoleId") if isinstance(data.get("RoleId"), str) else None
+        role_id = row.get("RoleId") or alias_roles.get(alias)
+        quests[quest_id] = {
+            "role_id": role_id,
+            "role_alias": alias,
+            "role_name_key": role_names.get(role_id),
+            "quest_name_key": row.get("QuestName") or data.get("TidName"),
+            "chapter_id": data.get("ChapterId") or 0,
+        }
+
+    graph = QuestGraph.load_or_build(graph_path, config_dir)
+    flows = {}
+    for quest_id in quests:
+        for flow_name in graph.flows_of(quest_id):
+            flows.setdefault(flow_name, quest_id)
+
+    index = RoleQuestIndex({"quests": quests, "flows": flows, "alias_roles": alias_roles})
+    index.save(output_path)
+    print(f"角色任务: {len(quests)}，关联角色: {sum(1 for q in quests.values() if q['role_id'])}，"
+          f"Flow: {len(flows)}，别名: {len(alias_roles)}")
+    print(f"✅ 已保存: {output_path}")
+    return index
+
+
+class RoleQuestIndex:
+    """role_quest_index.json 的内存视图，按任务id或Flow名称直接查询"""
+
+    def __init__(self, data: dict):
+        # JSON 的key只能是字符串，加载时还原成int
+        self.quests: Dict[int, dict] = {int(k): v for k, v in data["quests"].items()}
+        self.flows: Dict[str, int] = data["flows"]
+        self.alias_roles: Dict[str, int] = data.get("alias_roles", {})
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX) -> "RoleQuestIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def load_or_build(cls, path: str = DEFAULT_INDEX, config_dir: str = CONFIG_DIR) -> "RoleQuestIndex":
+        """索引不存在或比配置表 / 任务图旧时重新构建"""
+        if os.path.exists(path):
+            index_mtime = os.path.getmtime(path)
+            sources = [os.path.join(config_dir, f"{table}.json") for table in SOURCE_TABLES] + [DEFAULT_GRAPH]
+            if all(not os.path.exists(s) or os.path.getmtime(s) <= index_mtime for s in sources):
+                return cls.load(path)
+        return build_role_quest_index(config_dir, path)
+
+    def save(self, path: str = DEFAULT_INDEX):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "quests": self.quests, "flows": self.flows, "alias_roles": self.alias_roles},
+                      f, ensure_ascii=False, indent=1)
+
+    def __contains__(self, quest_id: int) -> bool:
+        return quest_id in self.quests
+
+    def quest_of_flow(self, flow_name: str) -> Optional[int]:
+        return self.flows.get(flow_name)
+
+    def get(self, quest_id: Optional[int]) -> Optional[dict]:
+        return self.quests.get(quest_id)
+
+    def lookup(self, flow_name: str, quest_id: Optional[int] = None) -> Optional[dict]:
+        """先按任务id，再按Flow名称查找角色任务"""
+        entry = self.quests.get(quest_id)
+        if entry is None:
+            quest_id = self.flows.get(flow_name)
+            entry = self.quests.get(quest_id)
+        return dict(entry, quest_id=quest_id) if entry else None
+
+    def quests_of_role(self, role_id: int) -> List[int]:
+        return [quest_id for quest_id, entry in self.quests.items() if entry["role_id"] == role_id]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "build":
+        build_role_quest_index()
+    elif command == "show" and len(sys.argv) > 2:
+        index = RoleQuestIndex.load_or_build()
+        target = sys.argv[2]
+        entry = index.lookup(target, int(target) if target.isdigit() else None)
+        print(json.dumps(entry, ensure_ascii=False, indent=2) if entry else f"❌ 不是角色任务: {target}")
+    else:
+        print("用法: python role_quest_index.py [build|show <Flow名称|任务id>]")
@@ -1,13 +1,61 @@
 
 import json
 import os
+import sys
 
-def split_dialogue_file(input_path, output_path):
-    """Splits dialogue records into single-sentence records."""
+from game_data import CONFIG_DIR, text_map_path
+from gender_text import get_expander
+from jsonl_blocks import open_jsonl
+
+def dialog_text_keys(dialog_line):
+    """TextMap keys of one dialog line: its TidTalk, or the TidTalkOption of every option."""
+    tid = dialog_line.get('tid')
+    if isinstance(tid, list):
+        return tid
+    return [tid] if tid else []
+
+def first_dialog_block(actions):
+    """
+    The dialog lines that become records: only the first action with a non-empty 'dialogs' list.
+    Lines are numbered by their position in that list (options included), giving dialogue_<title>_<i>.
+    """
+    for action in actions:
+        dialogs = action.get('dialogs')
+        if isinstance(dialogs, list) and dialogs:
+            return dialogs
+    return []
+
+def merge_bubble_records(new_records, config_dir=CONFIG_DIR, text_map_file=None):
+    """
+    Adds NPC bubble lines (extract_bubbles.py) that are not already among the split records.
+    A bubble line is a duplicate if its doc_id or its (StateKey, TidTalk) pair is already present.
+    """
+    from extract_bubbles import load_bubble_records
+
+    bubble_records = load_bubble_records(config_dir, text_map_file or text_map_path())
+    if bubble_records is None:
+        return 0
+    existing_ids = {record['doc_id'] for record in new_records}
+    existing_keys = {(record.get('state_key'), key) for record in new_records for key in record.get('text_keys') or []}
+    merged = 0
+    for record in bubble_records:
+        if record['doc_id'] in existing_ids or any((record['state_key'], key) in existing_keys for key in record['text_keys']):
+            continue
+        new_records.append(record)
+        existing_ids.add(record['doc_id'])
+        merged += 1
+    print(f"Merged {merged} of {len(bubble_records)} bubble lines.")
+    return merged
+
+def split_dialogue_file(input_path, output_path, with_bubbles=False, config_dir=CONFIG_DIR):
+    """
+    Splits dialogue records into single-sentence records.
+    With with_bubbles, NPC bubble lines missing from the dialogue file are merged in as well.
+    """
     print(f"Starting to split dialogue file: {input_path}...")
     
     try:
-        with open(input_path, 'r', encoding='utf-8') as infile:
+        with open_jsonl(input_path) as infile:
             lines = infile.readlines()
     except FileNotFoundError:
         print(f"ERROR: Input file not found at {input_path}")
@@ -27,34 +75,47 @@ def split_dialogue_file(input_path, output_path):
         original_title = record.get('title', 'unknown_title')
         actions = record.get('actions', [])
 
-        for action in actions:
-            dialogs = action.get('dialogs')
-            if isinstance(dialogs, list) and dialogs:
-                # Found a dialog block, now split it
-                for i, dialog_line in enumerate(dialogs):
-                    role = dialog_line.get('role', '旁白') # Default to Narrator
-                    content = dialog_line.get('content', '')
-
-                    # Create a new record for each line of dialogue
-                    new_doc_id = f"dialogue_{original_title}_{i}"
-                    new_text = f"{role}: {content}"
-                    
-                    new_record = {
-                        "doc_id": new_doc_id,
-                        "text": new_text
-                    }
-                    new_records.append(new_record)
-                
-                # We only process the first valid dialog block found in an action list
-                break
+        # Only the first dialog block of a record is split (see first_dialog_block)
+        for i, dialog_line in enumerate(first_dialog_block(actions)):
+            role = dialog_line.get('role', '旁白') # Default to Narrator
+            content = dialog_line.get('content', '')
+
+            # Create a new record for each line of dialogue
+            new_doc_id = f"dialogue_{original_title}_{i}"
+            new_text = f"{role}: {content}"
+            
+            # The source FlowState and TextMap keys, used for the dependency index
+            new_record = {
+                "doc_id": new_doc_id,
+                "text": new_text,
+                "state_key": original_title,
+                "text_keys": dialog_text_keys(dialog_line)
+            }
+            new_records.append(new_record)
+    split_count = len(new_records)
+
+    # Bubble lines are merged here rather than appended afterwards, so re-running the split keeps them
+    if with_bubbles:
+        merge_bubble_records(new_records, config_dir)
+
+    # Lines with Rover gender placeholders ({TA}, {大哥哥} ...) also get male/female variant records
+    try:
+        expander = get_expander(config_dir)
+    except FileNotFoundError:
+        expander = None
+        print("WARNING: ConfigDB/GenderText.json not found, gender placeholders are left as-is.")
 
     # Write all the new, fine-grained records to the output file
     try:
+        written = 0
         with open(output_path, 'w', encoding='utf-8') as outfile:
-            for record in new_records:
+            for record in (expander.expand_records(new_records) if expander else new_records):
                 outfile.write(json.dumps(record, ensure_ascii=False) + '\n')
+                written += 1
         
-        print(f"Successfully split {total_original_records} dialogue records into {len(new_records)} single-sentence records.")
+        print(f"Successfully split {total_original_records} dialogue records into {split_count} single-sentence records.")
+        if written > len(new_records):
+            print(f"Added {written - len(new_records)} gender variant records.")
         print(f"New file created at: {output_path}")
 
     except Exception as e:
@@ -63,4 +124,5 @@ def split_dialogue_file(input_path, output_path):
 if __name__ == "__main__":
     input_file = "WutheringDialog/data/dialogs_zh-Hans.enriched.jsonl"
     output_file = "WutheringDialog/data/dialogs_zh-Hans.split.jsonl"
-    split_dialogue_file(input_file, output_file)
+    # --bubbles also merges NPC bubble lines (ConfigDB/BubbleData.json) missing from the dialogue file
+    split_dialogue_file(input_file, output_file, with_bubbles="--bubbles" in sys.argv[1:])
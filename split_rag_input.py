@@ -3,22 +3,38 @@ import re
 import os
 import sys
 
+from dependency_index import DEFAULT_INDEX, DependencyIndex
+from doc_id_registry import DocIdRegistry
+from jsonl_blocks import open_jsonl
+
 def sanitize_for_id(text):
     """Sanitizes a string to be used as a part of a doc_id."""
     sanitized = re.sub(r'[\s\\/:*?"<>|]+', '_', text)
     return sanitized.strip('_')
 
-def split_rag_file(input_path, output_path):
-    """Splits a coarse-grained RAG input file into fine-grained records."""
+def split_rag_file(input_path, output_path, registry_path=None, version="", dependency_path=DEFAULT_INDEX):
+    """
+    Splits a coarse-grained RAG input file into fine-grained records.
+    When registry_path is given, doc_ids are assigned through the persistent
+    DocIdRegistry so they stay stable across game versions and collisions are reported;
+    version is recorded as the first-seen game version of newly registered doc_ids.
+    Each fine-grained record inherits the dependencies of its source document, recorded as
+    the 'split' stage of the dependency index.
+    """
     print(f"Starting to split {input_path}...")
     
     try:
-        with open(input_path, 'r', encoding='utf-8') as infile:
+        with open_jsonl(input_path) as infile:
             lines = infile.readlines()
     except FileNotFoundError:
         print(f"ERROR: Input file not found at {input_path}")
         return
 
+    registry = DocIdRegistry(registry_path, version) if registry_path else None
+    seen_owners = set()
+    index = DependencyIndex(dependency_path) if dependency_path else None
+    deps = {}
+
     new_records = []
     for line in lines:
         try:
@@ -63,6 +79,18 @@ def split_rag_file(input_path, output_path):
                 sub_id_part = sanitize_for_id("资料")
 
             new_doc_id = f"{entity_type_en}_{entity_name}_{sub_id_part}"
+            if registry is not None:
+                # The owner is keyed by the stable source id, not the (renameable) entity name
+                owner = f"{original_doc_id}/{sub_id_part}"
+                occurrence = 1
+                while owner in seen_owners:
+                    occurrence += 1
+                    owner = f"{original_doc_id}/{sub_id_part}#{occurrence}"
+                seen_owners.add(owner)
+                new_doc_id = registry.assign(owner, new_doc_id)
+
+            if index is not None:
+                deps[new_doc_id] = index.dependencies_of(original_doc_id)
             new_records.append({
                 "doc_id": new_doc_id,
                 "text": part
@@ -77,11 +105,24 @@ def split_rag_file(input_path, output_path):
         print(f"New file created at: {output_path}")
     except Exception as e:
         print(f"ERROR: Failed to write to output file: {e}")
+        return
+
+    if registry is not None:
+        registry.print_collisions()
+        registry.save()
+        print(f"Registered {registry.new_count} new doc_ids ({len(registry)} total) in {registry_path}")
+
+    if index is not None:
+        index.update_stage("split", deps)
+        index.save()
+        print(f"Dependency index updated: split ({len(deps)} documents) -> {dependency_path}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python split_rag_input.py <input_file_path> <output_file_path>")
+    if len(sys.argv) not in (3, 4, 5):
+        print("Usage: python split_rag_input.py <input_file_path> <output_file_path> [doc_id_registry_path] [game_version]")
     else:
         input_file = sys.argv[1]
         output_file = sys.argv[2]
-        split_rag_file(input_file, output_file)
\ No newline at end of file
+        registry_file = sys.argv[3] if len(sys.argv) >= 4 else None
+        game_version = sys.argv[4] if len(sys.argv) == 5 else ""
+        split_rag_file(input_file, output_file, registry_file, game_version)
\ No newline at end of file
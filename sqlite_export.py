@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ConfigDB + TextMap 导出为一个 SQLite 数据库，排查问题时直接写SQL，不用每次重新加载全部JSON
+
+  ConfigDB/<表>.json        -> 同名表，列类型来自 config_schema.infer_table_schema
+                               list/dict 列写成JSON文本；整列都是JSON字符串的列（QuestData.Data、
+                               BubbleData.Params 等）压缩成标准JSON，可以直接用 json_extract 查询
+  TextMap/<lang>/<文件>.json -> text_map(lang, source, key, text)，source 为文件名（MultiText 或分表名）
+  _columns                   -> 每张表每一列的类型，以及是否为JSON列
+
+Id / QuestId / Key 列自动建索引。整个导出是一个事务（executemany 批量插入），
+先写到临时文件，成功后再替换旧库。
+
+查询示例:
+  python sqlite_export.py query "SELECT QuestId, json_extract(Data, '$.TidName') FROM QuestData LIMIT 5"
+  python sqlite_export.py query "SELECT lang, text FROM text_map WHERE key = 'RoleInfo_1102_Name'"
+
+用法:
+  python sqlite_export.py export [--db PATH] [--langs zh-Hans en ...] [--tables QuestData ...]
+  python sqlite_export.py query "<SQL>" [--db PATH]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from config_schema import infer_table_schema
+from game_data import CONFIG_DIR, TEXT_MAP_DIR, load_config
+from parallel_corpus import list_languages, list_tables, load_table
+
+DEFAULT_DB = "WutheringDialog/data/wuthering.db"
+INDEX_COLUMNS = ("Id", "QuestId", "Key")
+# 推断出的取值类型 -> SQLite 列类型（混合类型的列不声明类型）
+COLUMN_TYPES = {"int": "INTEGER", "bool": "INTEGER", "float": "REAL", "str": "TEXT", "list": "TEXT", "dict": "TEXT"}
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def column_type(types: List[str]) -> str:
+    declared = {COLUMN_TYPES[t] for t in types if t in COLUMN_TYPES}
+    if declared == {"INTEGER", "REAL"}:
+        return "REAL"
+    return declared.pop() if len(declared) == 1 else ""
+
+
+def json_string_columns(rows: List[dict], fields: Dict[str, List[str]]) -> List[str]:
+    """只含字符串、且每个非空值都是JSON对象/数组的列"""
+    columns = []
+    for name, types in fields.items():
+        if "str" not in types or set(types) - {"str", "null", "missing"}:
+            continue
+        found = False
+        for row in rows:
+            value = row.get(name)
+            if not value:
+                continue
+            if value[0] not in "[{":
+                break
+            try:
+                json.loads(value)
+            except json.JSONDecodeError:
+                break
+            found = True
+        else:
+            if found:
+                columns.append(name)
+    return columns
+
+
+def export_config_table(conn: sqlite3.Connection, table: str, rows: List[dict]) -> int:
+    schema = infer_table_schema(rows)
+    fields = schema["fields"]
+    json_columns = set(json_string_columns(rows, fields))
+
+    columns_sql = ", ".join(f"{quote(name)} {column_type(types)}".rstrip() for name, types in fields.items())
+    conn.execute(f"CREATE TABLE {quote(table)} ({columns_sql})")
+    conn.executemany("INSERT INTO _columns VALUES (?, ?, ?, ?)",
+                     [(table, name, "|".join(types), int(name in json_columns or "list" in types or "dict" in types))
+                      for name, types in fields.items()])
+
+    def convert(name, value):
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        if name in json_columns and value:
+            return json.dumps(json.loads(value), ensure_ascii=False, separators=(",", ":"))
+        return value
+
+    names = list(fields)
+    placeholders = ", ".join("?" * len(names))
+    conn.executemany(f"INSERT INTO {quote(table)} VALUES ({placeholders})",
+                     (tuple(convert(name, row.get(name)) for name in names) for row in rows))
+
+    for name in INDEX_COLUMNS:
+        if name in fields:
+            conn.execute(f"CREATE INDEX {quote(f'idx_{table}_{name}')} ON {quote(table)} ({quote(name)})")
+    return len(rows)
+
+
+def export_text_map(conn: sqlite3.Connection, text_map_dir: str, lang: str) -> int:
+    count = 0
+    for source in list_tables(text_map_dir, lang):
+        texts = load_table(text_map_dir, lang, source)
+        conn.executemany("INSERT INTO text_map VALUES (?, ?, ?, ?)",
+                         ((lang, source, key, text) for key, text in texts.items() if isinstance(text, str)))
+        count += len(texts)
+    return count
+
+
+def export_database(db_path: str = DEFAULT_DB, config_dir: str = CONFIG_DIR, text_map_dir: str = TEXT_MAP_DIR,
+                    langs: Optional[List[str]] = None, tables: Optional[List[str]] = None):
+    print("=== 导出 SQLite 数据库 ===")
+    start = time.time()
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = db_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path, isolation_level=None)
+    # 临时文件失败了直接丢弃，不需要日志
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        conn.execute("BEGIN")
+        conn.execute("CREATE TABLE _columns (table_name TEXT, column_name TEXT, types TEXT, is_json INTEGER)")
+        conn.execute("CREATE TABLE text_map (lang TEXT, source TEXT, key TEXT, text TEXT, "
+                     "PRIMARY KEY (lang, source, key)) WITHOUT ROWID")
+
+        table_names = tables or sorted(f[:-len(".json")] for f in os.listdir(config_dir) if f.endswith(".json"))
+        row_count = 0
+        skipped = []
+        for table in table_names:
+            try:
+                rows = load_config(table, config_dir)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                skipped.append(f"{table} ({e.__class__.__name__})")
+                continue
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                skipped.append(f"{table} (不是行列表)")
+                continue
+            if not any(rows):
+                skipped.append(f"{table} (空表)")
+                continue
+            row_count += export_config_table(conn, table, rows)
+        print(f"ConfigDB: {len(table_names) - len(skipped)} 张表，{row_count:,} 行 ({time.time() - start:.1f}s)")
+        for table in skipped:
+            print(f"  ⚠️  跳过 {table}")
+
+        for lang in langs or list_languages(text_map_dir):
+            count = export_text_map(conn, text_map_dir, lang)
+            print(f"TextMap {lang}: {count:,} 条")
+        conn.execute("CREATE INDEX idx_text_map_key ON text_map (key, lang)")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+
+    os.replace(temp_path, db_path)
+    size = os.path.getsize(db_path) / 1024 / 1024
+    print(f"✅ 已保存: {db_path} ({size:.1f} MB, {time.time() - start:.1f}s)")
+
+
+def run_query(sql: str, db_path: str = DEFAULT_DB, limit: int = 50):
+    if not os.path.exists(db_path):
+        print(f"❌ 找不到数据库: {db_path}（先运行 python sqlite_export.py export）")
+        return
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(sql)
+        if cursor.description:
+            print("\t".join(column[0] for column in cursor.description))
+        count = 0
+        for row in cursor:
+            if count < limit:
+                print("\t".join("" if value is None else str(value) for value in row))
+            count += 1
+        if count > limit:
+            print(f"... 共 {count} 行，只显示前 {limit} 行")
+    except sqlite3.Error as e:
+        print(f"❌ SQL错误: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 ConfigDB 和 TextMap 导出为 SQLite 数据库")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="重新生成数据库")
+    export_parser.add_argument("--db", default=DEFAULT_DB)
+    export_parser.add_argument("--config-dir", default=CONFIG_DIR)
+    export_parser.add_argument("--text-map-dir", default=TEXT_MAP_DIR)
+    export_parser.add_argument("--langs", nargs="+", help="默认TextMap下全部语言")
+    export_parser.add_argument("--tables", nargs="+", help="默认ConfigDB下全部表")
+
+    query_parser = subparsers.add_parser("query", help="执行一条只读SQL")
+    query_parser.add_argument("sql")
+    query_parser.add_argument("--db", default=DEFAULT_DB)
+    query_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_database(args.db, args.config_dir, args.text_map_dir, args.langs, args.tables)
+    else:
+        run_query(args.sql, args.db, args.limit)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配置表对话提取 - FlowState 以外、散落在各个 ConfigDB 表里的对话类文本
+
+每个来源只需要在 TABLE_SOURCES 里声明:
+  table    ConfigDB 表名
+  keys     组成 doc_id 的主键列
+  fields   存放文本key的列（值可以是单个key，也可以是key列表，列表按顺序展开成多行）
+  meta     原样带进 metadata 的列（可选）
+  flow     (FlowListName列, FlowId列, StateId列)，文本在 FlowState 的对话里（可选）
+
+一次运行里所有来源并发处理，共用同一份 TextMap 和一次 FlowState 扫描，
+输出统一格式的 JSONL:
+  {"doc_id": "<来源>_<主键>", "text": ..., "metadata": {"source", "table", 主键/meta 列, "fields": {列: 文本}}}
+
+用法:
+  python table_dialogues.py [--only spring_chat entrust_finish ...] [--lang zh-Hans]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dependency_index import config_key, record_stage
+from extract_bubbles import load_state_talks
+from game_data import CONFIG_DIR, DEFAULT_LANG, TEXT_MAP_DIR, load_config, load_text_map, write_jsonl
+from rich_text import clean_text
+
+DEFAULT_OUTPUT = "WutheringDialog/data/table_dialogues_{lang}.jsonl"
+
+# Chat.Name（频道名）、TrainRoleDialog.Dialog（RoleInfo_<id>_Name）、PlotGuest.Name（角色名）
+# 都只是名称，不是对话文本，这几张表不作为来源
+TABLE_SOURCES = {
+    "spring_chat": {"table": "SpringChat", "keys": ("Id",), "fields": ("ContentList",), "meta": ("PosList",)},
+    "phantom_battle": {"table": "PhantomBattleDialog", "keys": ("Id",), "fields": (),
+                       "flow": ("PlotName", "FlowId", "StateId")},
+    "entrust_finish": {"table": "EntrustFinishDialog", "keys": ("Id",),
+                       "fields": ("UpDialog", "UnchangedDialog", "UpDialogGirl", "UnchangedDialogGirl"),
+                       "meta": ("EntrustId", "Level")},
+}
+
+
+def state_key_of(row: dict, spec: dict) -> Optional[str]:
+    columns = spec.get("flow")
+    if not columns or any(row.get(c) is None for c in columns):
+        return None
+    return "_".join(str(row[c]) for c in columns)
+
+
+def build_source_records(source: str, spec: dict, rows: List[dict], text_map: dict,
+                         talks: Dict[str, list], deps: Optional[dict] = None) -> List[dict]:
+    """按声明把一张表的行转换成文档；deps 为dict时写入 doc_id -> 依赖key"""
+    records = []
+    for row in rows:
+        key_values = [row.get(column) for column in spec["keys"]]
+        doc_id = f"{source}_{'_'.join(map(str, key_values))}"
+        keys = {config_key(spec["table"], key_values[0])}
+        fields = {}
+        lines = []
+
+        for field in spec["fields"]:
+            value = row.get(field)
+            text_keys = value if isinstance(value, list) else [value]
+            texts = []
+            for text_key in text_keys:
+                if not isinstance(text_key, str) or not text_key:
+                    continue
+                keys.add(text_key)
+                text = text_map.get(text_key)
+                if text:
+                    texts.append(clean_text(text))
+            if texts:
+                fields[field] = texts if isinstance(value, list) else texts[0]
+                lines.extend(texts)
+
+        state_key = state_key_of(row, spec)
+        if state_key:
+            for who_id, text_key in talks.get(state_key, []):
+                keys.add(text_key)
+                text = text_map.get(text_key)
+                if not text:
+                    continue
+                speaker = text_map.get(f"Speaker_{who_id}_Name", "") if who_id is not None else ""
+                lines.append(f"{speaker}: {clean_text(text)}" if speaker else clean_text(text))
+            fields["state_key"] = state_key
+
+        if not lines:
+            continue
+        metadata = {"source": source, "table": spec["table"]}
+        metadata.update({column: row.get(column) for column in spec["keys"] + spec.get("meta", ())})
+        metadata["fields"] = fields
+        if isinstance(deps, dict):
+            deps[doc_id] = sorted(keys)
+        records.append({"doc_id": doc_id, "text": "\n".join(lines), "metadata": metadata})
+    return records
+
+
+def extract_table_dialogues(sources: Optional[List[str]] = None, lang: str = DEFAULT_LANG,
+                            config_dir: str = CONFIG_DIR, text_map_dir: str = TEXT_MAP_DIR,
+                            output_path: Optional[str] = None) -> Dict[str, int]:
+    print("=== 配置表对话提取 ===")
+    start = time.time()
+    sources = list(sources or TABLE_SOURCES)
+    output_path = output_path or DEFAULT_OUTPUT.format(lang=lang)
+
+    # 各来源的表并发加载
+    with ThreadPoolExecutor(max_workers=len(sources) + 1) as pool:
+        text_map_future = pool.submit(load_text_map, lang, text_map_dir)
+        row_futures = {source: pool.submit(load_config, TABLE_SOURCES[source]["table"], config_dir)
+                       for source in sources}
+        tables = {}
+        for source, future in row_futures.items():
+            try:
+                tables[source] = future.result()
+            except FileNotFoundError as e:
+                print(f"⚠️  {source}: 找不到配置表，跳过 ({e})")
+        try:
+            text_map = text_map_future.result()
+        except FileNotFoundError as e:
+            text_map = None
+            print(f"⚠️  找不到TextMap，跳过提取 ({e})")
+    if text_map is None:
+        return {}
+
+    # 引用剧情Flow的来源共用一次 FlowState 扫描
+    state_keys = {state_key_of(row, TABLE_SOURCES[source])
+                  for source, rows in tables.items() if TABLE_SOURCES[source].get("flow") for row in rows}
+    state_keys.discard(None)
+    talks = {}
+    if state_keys:
+        try:
+            talks = load_state_talks(state_keys, config_dir)
+        except FileNotFoundError as e:
+            print(f"⚠️  找不到FlowState，Flow类来源只输出表内文本 ({e})")
+
+    deps = {}
+    with ThreadPoolExecutor(max_workers=len(tables) or 1) as pool:
+        futures = {source: pool.submit(build_source_records, source, TABLE_SOURCES[source], rows, text_map, talks, deps)
+                   for source, rows in tables.items()}
+        results = {source: future.result() for source, future in futures.items()}
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_jsonl((record for source in sources for record in results.get(source, [])), output_path)
+    record_stage("table_dialogues", deps)
+
+    counts = {source: len(records) for source, records in results.items()}
+    for source, count in counts.items():
+        print(f"  {source:16s} {TABLE_SOURCES[source]['table']:22s} {count:>6,} 条")
+    print(f"✅ {sum(counts.values()):,} 条 -> {output_path} ({time.time() - start:.2f}s)")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取配置表中的对话类文本")
+    parser.add_argument("--only", nargs="+", choices=list(TABLE_SOURCES), help="只处理指定来源")
+    parser.add_argument("--lang", default=DEFAULT_LANG)
+    parser.add_argument("--config-dir", default=CONFIG_DIR)
+    parser.add_argument("--text-map-dir", default=TEXT_MAP_DIR)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    extract_table_dialogues(args.only, args.lang, args.config_dir, args.text_map_dir, args.output)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+常驻进程 - 把 TextMap / ConfigDB / 处理结果留在内存里，通过 Unix socket 回答查询
+
+check_sample / debug_mapping_issue / test_matching 之类的小脚本每次都要重新加载 MultiText 和 ConfigDB，
+真正的查询只要几毫秒。守护进程第一次用到某个资源时加载（ConfigDB 表用 config_schema.load_typed），
+之后一直保留；后台线程定时检查文件修改时间，只重新加载变化了的资源，并用依赖索引
+（dependency_index.py）列出受影响的文档。
+
+协议: 每个连接发送一行JSON请求 {"cmd": ..., 参数...}，返回一行JSON {"ok": true, "result": ...}
+      或 {"ok": false, "error": ...}。
+
+命令:
+  status                              已加载的资源、最近的重新加载记录
+  text      key=<key> [lang=en]       TextMap 文本
+  find      query=<子串> [lang] [limit] 按文本内容查key
+  row       table=<表> key=<主键>      ConfigDB 行（按 Id / QuestId / Key 列）
+  quest     quest_id=<id> [lang]      任务层级（quest_hierarchy.py）并解析成文本
+  doc       doc_id=<doc_id>           处理结果中的一条对话
+  quest_docs quest_id=<id> [limit]    处理结果中某个任务的对话
+  stale     keys=<k1,k2,...>          依赖这些key的文档
+  reload                              立即检查一次文件变化
+  reprocess                           用内存中的数据重新运行 complete_dialogue_processor
+  shutdown
+
+用法:
+  python warm_daemon.py serve [--socket PATH] [--interval 2]
+  python warm_daemon.py <命令> [参数=值 ...]        例如 python warm_daemon.py text key=RoleInfo_1102_Name lang=en
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config_schema import load_typed
+from dependency_index import DEFAULT_INDEX, DependencyIndex, config_key
+from game_data import CONFIG_DIR, DEFAULT_LANG, TEXT_MAP_DIR, load_text_map, text_map_path
+from jsonl_blocks import iter_jsonl, resolve_path
+from quest_hierarchy import DEFAULT_HIERARCHY, SOURCE_TABLES, QuestHierarchy
+
+DEFAULT_SOCKET = "WutheringDialog/data/warm_daemon.sock"
+DEFAULT_DATASET = "WutheringDialog/data/dialogs_zh-Hans.complete_final.jsonl"
+DEFAULT_SPLIT = "WutheringDialog/data/dialogs_zh-Hans.split.jsonl"
+KEY_COLUMNS = ("Id", "QuestId", "Key", "StateKey")
+
+
+class WarmState:
+    """
+    按名字管理的常驻资源:
+      text:<lang>   TextMap dict
+      table:<表名>  ConfigDB 行对象列表，另建 主键 -> 行 的索引
+      hierarchy     QuestHierarchy
+      dataset       处理结果 doc_id -> 记录，另建 quest_id -> doc_id 的索引
+    """
+
+    def __init__(self, config_dir: str = CONFIG_DIR, text_map_dir: str = TEXT_MAP_DIR,
+                 dataset_path: str = DEFAULT_DATASET, index_path: str = DEFAULT_INDEX):
+        self.config_dir = config_dir
+        self.text_map_dir = text_map_dir
+        self.dataset_path = dataset_path
+        self.index_path = index_path
+        self.lock = threading.RLock()
+        self.reprocess_lock = threading.Lock()  # 同一时间只跑一次 reprocess
+        self.data: Dict[str, object] = {}
+        self.indexes: Dict[str, dict] = {}
+        self.signatures: Dict[str, Tuple] = {}
+        self.reloads = deque(maxlen=20)
+        self.started = time.time()
+
+    def _source(self, name: str) -> Tuple[List[str], Callable[[], object]]:
+        kind, _, arg = name.partition(":")
+        if kind == "text":
+            return [text_map_path(arg, self.text_map_dir)], lambda: load_text_map(arg, self.text_map_dir)
+        if kind == "table":
+            return [os.path.join(self.config_dir, f"{arg}.json")], lambda: load_typed(arg, self.config_dir)
+        if kind == "hierarchy":
+            paths = [os.path.join(self.config_dir, f"{table}.json") for table in SOURCE_TABLES]
+            return paths + [DEFAULT_HIERARCHY], lambda: QuestHierarchy.load_or_build(config_dir=self.config_dir)
+        if kind == "dataset":
+            return [resolve_path(self.dataset_path)], lambda: {r["doc_id"]: r for r in iter_jsonl(self.dataset_path)}
+        raise ValueError(f"未知资源: {name}")
+
+    @staticmethod
+    def _signature(paths: List[str]) -> Tuple:
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+    def get(self, name: str):
+        with self.lock:
+            if name not in self.data:
+                self._load(name)
+            return self.data[name]
+
+    def _load(self, name: str):
+        paths, loader = self._source(name)
+        signature = self._signature(paths)
+        value = loader()
+        self.data[name] = value
+        self.signatures[name] = signature
+        self._build_index(name, value)
+
+    def _build_index(self, name: str, value):
+        if name.startswith("table:") and value:
+            column = next((c for c in KEY_COLUMNS if c in value[0]), None)
+            self.indexes[name] = {row[column]: row for row in value} if column else {}
+        elif name == "dataset":
+            by_quest = defaultdict(list)
+            for doc_id, record in value.items():
+                if record.get("quest_id") is not None:
+                    by_quest[record["quest_id"]].append(doc_id)
+            self.indexes[name] = by_quest
+
+    def _changed_keys(self, name: str, old, new) -> List[str]:
+        """两次加载之间变化的依赖key（dependency_index.py 的写法）"""
+        if name.startswith("text:"):
+            return [key for key in old.keys() | new.keys() if old.get(key) != new.get(key)]
+        if name.startswith("table:"):
+            table = name.partition(":")[2]
+            old_rows = self.indexes.get(name, {})
+            column = next((c for c in KEY_COLUMNS if new and c in new[0]), None)
+            if column is None:
+                # 没有主键列时整表作为通配key，invalidate 会匹配这张表下记录的所有key
+                return [config_key(table, "*")]
+            new_rows = {row[column]: row for row in new}
+            return [config_key(table, key) for key in old_rows.keys() | new_rows.keys()
+                    if key not in old_rows or key not in new_rows
+                    or old_rows[key].to_dict() != new_rows[key].to_dict()]
+        return []
+
+    def check_reload(self) -> List[dict]:
+        """重新加载文件有变化的资源，返回本次的重新加载记录"""
+        events = []
+        with self.lock:
+            for name in list(self.data):
+                paths, loader = self._source(name)
+                signature = self._signature(paths)
+                if signature == self.signatures.get(name):
+                    continue
+                start = time.time()
+                old = self.data[name]
+                try:
+                    new = loader()
+                except (OSError, ValueError) as e:
+                    # 文件正在写入时可能读到半截，下一轮再试
+                    events.append({"resource": name, "error": str(e)})
+                    continue
+                changed = self._changed_keys(name, old, new)
+                self.data[name] = new
+                self.signatures[name] = signature
+                self._build_index(name, new)
+                stale = DependencyIndex(self.index_path).invalidate(changed) if changed else []
+                event = {"resource": name, "time": time.strftime("%H:%M:%S"), "changed_keys": len(changed),
+                         "stale_docs": len(stale), "stale_sample": stale[:20],
+                         "took_ms": round((time.time() - start) * 1000, 1)}
+                self.reloads.append(event)
+                events.append(event)
+                print(f"🔄 {name}: {len(changed)} 个key变化，{len(stale)} 个文档需要重建")
+        return events
+
+    # ---- 查询 ----
+
+    def status(self) -> dict:
+        with self.lock:
+            resources = {name: len(value) if hasattr(value, "__len__") else len(getattr(value, "quests", ()))
+                         for name, value in self.data.items()}
+        return {"uptime_s": round(time.time() - self.started, 1), "pid": os.getpid(),
+                "resources": resources, "reloads": list(self.reloads)}
+
+    def text(self, key: str, lang: str = DEFAULT_LANG) -> Optional[str]:
+        return self.get(f"text:{lang}").get(str(key))
+
+    def find(self, query: str, lang: str = DEFAULT_LANG, limit: int = 20) -> List[dict]:
+        query = str(query)
+        results = []
+        for key, text in self.get(f"text:{lang}").items():
+            if isinstance(text, str) and query in text:
+                results.append({"key": key, "text": text})
+                if len(results) >= limit:
+                    break
+        return results
+
+    def row(self, table: str, key) -> Optional[dict]:
+        self.get(f"table:{table}")
+        row = self.indexes[f"table:{table}"].get(key)
+        if row is None and isinstance(key, str) and key.isdigit():
+            row = self.indexes[f"table:{table}"].get(int(key))
+        return row.to_dict() if row is not None else None
+
+    def quest(self, quest_id: int, lang: str = DEFAULT_LANG) -> Optional[dict]:
+        path = self.get("hierarchy").path(quest_id)
+        if path is None:
+            return None
+        text_map = self.get(f"text:{lang}")
+        return {field: text_map.get(value, value) if isinstance(value, str) else value
+                for field, value in path.items()}
+
+    def doc(self, doc_id: str) -> Optional[dict]:
+        return self.get("dataset").get(doc_id)
+
+    def quest_docs(self, quest_id: int, limit: int = 50) -> List[dict]:
+        dataset = self.get("dataset")
+        return [dataset[doc_id] for doc_id in self.indexes["dataset"].get(quest_id, [])[:limit]]
+
+    def stale(self, keys) -> List[str]:
+        if isinstance(keys, str):
+            keys = keys.split(",")
+        return DependencyIndex(self.index_path).invalidate(keys)
+
+    def reprocess(self, input_file: str = DEFAULT_SPLIT) -> dict:
+        """
+        用内存中的表和TextMap运行 complete_dialogue_processor（不再重新读文件）。
+        处理过程不持有 self.lock（资源重新加载时整体替换，拿到的引用不会被改写），其他查询照常响应；
+        结果先写到临时文件，最后在锁内替换数据集并重新加载。
+        """
+        from complete_dialogue_processor import CompleteDialogueProcessor
+        from dependency_index import TrackingTextMap, record_stage
+        from role_quest_index import RoleQuestIndex
+
+        if not self.reprocess_lock.acquire(blocking=False):
+            raise RuntimeError("reprocess 正在运行")
+        temp_path = self.dataset_path + ".tmp"
+        try:
+            start = time.time()
+            processor = CompleteDialogueProcessor()
+            processor.plot_handbook_config = self.get("table:PlotHandBookConfig")
+            processor.quest_node_data = self.get("table:QuestNodeData")
+            processor.textmap_data = TrackingTextMap(self.get(f"text:{DEFAULT_LANG}"))
+            processor.quest_hierarchy = self.get("hierarchy")
+            try:
+                processor.role_quest_index = RoleQuestIndex.load_or_build(config_dir=self.config_dir)
+            except FileNotFoundError:
+                processor.role_quest_index = None
+            processor.build_comprehensive_mapping()
+            processor.process_dialogue_data(input_file, temp_path)
+
+            with self.lock:
+                os.replace(temp_path, self.dataset_path)
+                record_stage("dialogue", processor.dependencies, self.index_path)
+                self.check_reload()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)  # 处理失败时写了一半的临时文件
+            self.reprocess_lock.release()
+        return {"stats": processor.stats, "output": self.dataset_path, "took_s": round(time.time() - start, 2)}
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, state: WarmState):
+        self.state = state
+        super().__init__(socket_path, DaemonHandler)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    COMMANDS = ("status", "text", "find", "row", "quest", "doc", "quest_docs", "stale", "reprocess")
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        start = time.time()
+        try:
+            request = json.loads(line)
+            command = request.pop("cmd", "")
+            state = self.server.state
+            if command == "shutdown":
+                response = {"ok": True, "result": "bye"}
+            elif command == "reload":
+                response = {"ok": True, "result": state.check_reload()}
+            elif command in self.COMMANDS:
+                response = {"ok": True, "result": getattr(state, command)(**request)}
+            else:
+                response = {"ok": False, "error": f"未知命令: {command}"}
+        except Exception as e:
+            # 任何异常都要回复，不能让客户端读到空连接
+            command = None
+            response = {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+        response["took_ms"] = round((time.time() - start) * 1000, 2)
+        self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        self.wfile.flush()
+        if command == "shutdown":
+            # 响应写出之后再关闭；shutdown() 会等待 serve_forever 退出，必须在另一个线程里调用
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+def watch(state: WarmState, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            state.check_reload()
+        except Exception as e:
+            # 监视线程退出后就再也不会重新加载，任何异常都只记录下来，下一轮继续
+            print(f"⚠️  检查文件变化失败: {e.__class__.__name__}: {e}")
+
+
+def serve(socket_path: str = DEFAULT_SOCKET, interval: float = 2.0, preload: Optional[List[str]] = None,
+          state: Optional[WarmState] = None):
+    state = state or WarmState()
+    if os.path.exists(socket_path):
+        try:
+            request("status", socket_path)
+            print(f"❌ 守护进程已经在运行: {socket_path}")
+            return
+        except OSError:
+            os.remove(socket_path)  # 上次异常退出留下的socket文件
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    for name in preload or []:
+        start = time.time()
+        try:
+            state.get(name)
+        except Exception as e:
+            # 资源缺失不影响启动，第一次查询时会再报错
+            print(f"⚠️  预加载 {name} 失败: {e.__class__.__name__}: {e}")
+            continue
+        print(f"  预加载 {name} ({time.time() - start:.1f}s)")
+
+    stop = threading.Event()
+    threading.Thread(target=watch, args=(state, interval, stop), daemon=True).start()
+    server = DaemonServer(socket_path, state)
+    print(f"🔥 守护进程已启动: {socket_path} (pid {os.getpid()}，每 {interval}s 检查文件变化)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("守护进程已退出")
+
+
+def request(cmd: str, socket_path: str = DEFAULT_SOCKET, timeout: Optional[float] = None, **args):
+    """发送一个请求并返回 result；守护进程没有运行时抛出 OSError，命令失败时抛出 RuntimeError"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({"cmd": cmd, **args}, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line.strip():
+        raise RuntimeError("守护进程没有返回响应")
+    try:
+        response = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"无效的响应: {e}")
+    if not isinstance(response, dict) or not response.get("ok"):
+        raise RuntimeError(response.get("error") if isinstance(response, dict) else f"无效的响应: {response!r}")
+    return response["result"]
+
+
+def parse_value(value: str):
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        parser = argparse.ArgumentParser(description="启动常驻查询进程")
+        parser.add_argument("serve")
+        parser.add_argument("--socket", default=DEFAULT_SOCKET)
+        parser.add_argument("--interval", type=float, default=2.0, help="检查文件变化的间隔（秒）")
+        parser.add_argument("--preload", nargs="*", default=[f"text:{DEFAULT_LANG}"],
+                            help="启动时加载的资源，例如 text:zh-Hans table:QuestData hierarchy dataset")
+        args = parser.parse_args()
+        serve(args.socket, args.interval, args.preload)
+    elif len(sys.argv) > 1:
+        socket_file = os.environ.get("WARM_DAEMON_SOCKET", DEFAULT_SOCKET)
+        params = dict(arg.split("=", 1) for arg in sys.argv[2:] if "=" in arg)
+        try:
+            result = request(sys.argv[1], socket_file, **{k: parse_value(v) for k, v in params.items()})
+        except OSError as e:
+            print(f"❌ 连接不上守护进程 ({e})，先运行 python warm_daemon.py serve")
+            sys.exit(1)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)